@@ -1,7 +1,29 @@
+import functools
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-import google.generativeai as genai
 from datetime import datetime
-import json
+
+from ayurveda import config
+from ayurveda.backends import backend_from_env
+from ayurveda.consultation import consultation_prefix
+from ayurveda.data import HEALTH_PROBLEMS, HERBS_DATABASE, QUESTIONS, concern_index
+from ayurveda.generation import GenerationStats
+from ayurveda.herb_index import estimate_tokens
+from ayurveda.knowledge_base import get_knowledge_base
+from ayurveda.local_planner import build_local_plan
+from ayurveda.plan_cache import CachedPlan, profile_hash
+from ayurveda.prompts import PROMPT_TEMPLATE_VERSION, build_prompt
+from ayurveda.rendering import herb_grid_html, plan_card_markdown
+from ayurveda.router import AllModelsFailed
+from ayurveda.scheduler import SchedulerBusy
+from ayurveda.scoring import calculate_wellness_score
+from ayurveda.sections import SECTIONS, SectionedPlanner, build_section_prompt, section_key, sections_independent_of
+from ayurveda.session_store import SESSION_KEYS, valid_session_id
+from ayurveda.storage import owner_key
+from ayurveda.styles import APP_CSS
 
 # Page setup
 st.set_page_config(
@@ -12,172 +34,129 @@ st.set_page_config(
 )
 
 # PROFESSIONAL CSS THEME
-st.markdown("""
-<style>
-    :root {
-        --primary: #2E8B57;
-        --secondary: #FF7F50;
-        --accent: #8B4513;
-        --light: #F5F5DC;
-        --dark: #2F4F4F;
-    }
-    
-    .main-header {
-        font-size: 3rem;
-        color: var(--primary);
-        text-align: center;
-        margin-bottom: 1rem;
-        font-weight: bold;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    .step-card {
-        background: linear-gradient(135deg, #ffffff 0%, #f8fff8 100%);
-        padding: 30px;
-        border-radius: 20px;
-        border-left: 6px solid var(--primary);
-        margin: 20px 0;
-        box-shadow: 0 8px 25px rgba(46, 139, 87, 0.15);
-    }
-    
-    .question-title {
-        color: var(--dark);
-        font-size: 1.3rem;
-        font-weight: 600;
-        margin-bottom: 15px;
-    }
-    
-    .recommendation-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 30px;
-        border-radius: 20px;
-        margin: 25px 0;
-        box-shadow: 0 10px 30px rgba(102, 126, 234, 0.3);
-    }
-    
-    .herb-card {
-        background: rgba(255,255,255,0.15);
-        padding: 20px;
-        border-radius: 15px;
-        margin: 15px 0;
-        border: 1px solid rgba(255,255,255,0.3);
-    }
-    
-    .progress-bar {
-        background: linear-gradient(90deg, var(--primary), var(--secondary));
-        height: 8px;
-        border-radius: 10px;
-        margin: 20px 0;
-    }
-    
-    .sidebar-header {
-        background: linear-gradient(135deg, var(--primary), #3CB371);
-        color: white;
-        padding: 20px;
-        border-radius: 15px;
-        margin-bottom: 20px;
-        text-align: center;
-    }
-    
-    .health-tag {
-        background: var(--primary);
-        color: white;
-        padding: 5px 15px;
-        border-radius: 20px;
-        margin: 5px;
-        display: inline-block;
-        font-size: 0.9rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
-# COMPREHENSIVE AYURVEDIC DATABASE
-HEALTH_PROBLEMS = [
-    "Stress & Anxiety", "Insomnia & Sleep Issues", "Low Immunity", "Digestive Problems",
-    "Joint Pain & Inflammation", "Skin Issues (Acne/Eczema)", "Low Energy & Fatigue",
-    "Brain Fog & Poor Memory", "Weight Management", "High Blood Pressure",
-    "Diabetes & Blood Sugar", "Respiratory Issues (Asthma/Allergies)", "Hair Loss",
-    "Hormonal Imbalance", "PCOS & Women's Health", "Menstrual Cramps", 
-    "Low Libido", "Poor Circulation", "High Cholesterol", "Liver Health",
-    "Kidney Health", "Constipation", "Acidity & GERD", "Migraines & Headaches",
-    "Eye Strain & Vision", "Dental & Gum Health", "Seasonal Allergies",
-    "Weak Bones & Osteoporosis", "Thyroid Issues", "Chronic Fatigue Syndrome"
-]
-
-HERBS_DATABASE = {
-    "Ashwagandha": {
-        "benefits": ["Stress reduction", "Energy boost", "Immune support", "Sleep quality"],
-        "dosage": "300-500mg twice daily",
-        "best_time": "Morning and evening with warm milk",
-        "safety": "Avoid in pregnancy, thyroid issues, sedatives"
-    },
-    "Turmeric": {
-        "benefits": ["Anti-inflammatory", "Joint health", "Immunity", "Skin glow"],
-        "dosage": "500mg with black pepper twice daily", 
-        "best_time": "With meals",
-        "safety": "Avoid with gallbladder issues, blood thinners"
-    },
-    "Brahmi": {
-        "benefits": ["Memory enhancement", "Focus", "Anxiety relief", "Brain function"],
-        "dosage": "300mg twice daily",
-        "best_time": "Morning and afternoon",
-        "safety": "Generally safe, no known contraindications"
-    },
-    "Triphala": {
-        "benefits": ["Digestion", "Detoxification", "Constipation", "Antioxidant"],
-        "dosage": "1-2g at bedtime", 
-        "best_time": "Before sleep with warm water",
-        "safety": "Avoid in diarrhea, pregnancy"
-    },
-    "Giloy": {
-        "benefits": ["Immunity booster", "Fever reducer", "Energy", "Detox"],
-        "dosage": "500mg once daily",
-        "best_time": "Morning with warm water",
-        "safety": "Avoid in autoimmune diseases"
-    },
-    "Tulsi (Holy Basil)": {
-        "benefits": ["Respiratory health", "Stress relief", "Immunity", "Cold & cough"],
-        "dosage": "500mg twice daily",
-        "best_time": "Morning and evening",
-        "safety": "Generally safe"
-    },
-    "Shatavari": {
-        "benefits": ["Hormonal balance", "Women's health", "Energy", "Lactation"],
-        "dosage": "500mg twice daily",
-        "best_time": "With milk or warm water",
-        "safety": "Avoid in estrogen-sensitive conditions"
-    },
-    "Ginger": {
-        "benefits": ["Digestion", "Nausea relief", "Inflammation", "Cold"],
-        "dosage": "1-2g daily as tea or powder",
-        "best_time": "With meals or as needed",
-        "safety": "Avoid with gallstones, blood thinners"
-    },
-    "Amla (Indian Gooseberry)": {
-        "benefits": ["Immunity", "Vitamin C source", "Hair health", "Anti-aging"],
-        "dosage": "1-2g daily",
-        "best_time": "Morning empty stomach",
-        "safety": "Generally safe"
-    },
-    "Neem": {
-        "benefits": ["Skin health", "Blood purification", "Dental health", "Immunity"],
-        "dosage": "500mg once daily",
-        "best_time": "Morning with water",
-        "safety": "Avoid in pregnancy, diabetes medications"
-    }
-}
-
-# Initialize Gemini with error handling
-gemini_connected = False
-try:
-    if 'GEMINI_API_KEY' in st.secrets:
-        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-        gemini_connected = True
-    else:
-        st.sidebar.error("❌ GEMINI_API_KEY not found in secrets.toml")
-except Exception as e:
-    st.sidebar.error(f"❌ Gemini config failed: {e}")
+# Generation backend: Gemini, or the local fake with AYURVEDA_BACKEND=fake
+@st.cache_resource
+def get_backend():
+    return backend_from_env()
+
+generation_backend = get_backend()
+
+# Gemini API key (the SDK itself is only imported when a plan is generated)
+gemini_api_key = None
+if generation_backend.requires_api_key:
+    try:
+        if 'GEMINI_API_KEY' in st.secrets:
+            gemini_api_key = st.secrets["GEMINI_API_KEY"]
+        else:
+            st.sidebar.error("❌ GEMINI_API_KEY not found in secrets.toml")
+    except Exception as e:
+        st.sidebar.error(f"❌ Gemini config failed: {e}")
+gemini_connected = gemini_api_key is not None or not generation_backend.requires_api_key
+
+# Plan cache shared by every session in this process
+@st.cache_resource
+def get_plan_cache():
+    return config.plan_cache_from_env()
+
+plan_cache = get_plan_cache()
+
+# Near-identical profiles share a plan; only the name is filled in per user
+@st.cache_resource
+def get_similarity_cache():
+    return config.similarity_cache_from_env(PROMPT_TEMPLATE_VERSION)
+
+similarity_cache = get_similarity_cache()
+
+# Time-to-first-token / total-time samples across sessions
+@st.cache_resource
+def get_generation_stats():
+    return GenerationStats()
+
+generation_stats = get_generation_stats()
+
+# One router per process: remembers the healthy model across reruns and sessions
+@st.cache_resource
+def get_model_router():
+    return config.router_from_env(generation_backend)
+
+model_router = get_model_router()
+
+# For prompts that carry their own instructions (plan sections, chat summaries): no cached prefix
+@st.cache_resource
+def get_plain_router():
+    return config.router_from_env(generation_backend, context_cache=False) if config.CONTEXT_CACHE else model_router
+
+plain_router = get_plain_router()
+
+# Section-by-section plans: only sections whose answers changed are regenerated
+@st.cache_resource
+def get_section_planner():
+    return SectionedPlanner(plain_router, plan_cache)
+
+section_planner = get_section_planner()
+
+# Follow-up chat: its own static prefix in the context cache, summaries written off the script thread
+@st.cache_resource
+def get_consultation_router():
+    if config.CONTEXT_CACHE:
+        return config.router_from_env(generation_backend, cache_prefix=consultation_prefix())
+    return model_router
+
+@st.cache_resource
+def get_chat_summarizer():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="chat-summary")
+
+consultation_router = get_consultation_router()
+chat_summarizer = get_chat_summarizer()
+
+# Stage/attempt/token metrics (Prometheus on AYURVEDA_METRICS_PORT, JSON lines on AYURVEDA_METRICS_LOG)
+@st.cache_resource
+def get_metrics():
+    return config.metrics_from_env()
+
+metrics = get_metrics()
+
+# Saved plans (SQLite, AYURVEDA_PLAN_DB); writes happen on a background thread
+@st.cache_resource
+def get_plan_store():
+    return config.plan_store_from_env()
+
+plan_store = get_plan_store()
+
+# One RPM/TPM budget and fair queue for every session in this process
+@st.cache_resource
+def get_quota_scheduler():
+    return config.scheduler_from_env()
+
+quota_scheduler = get_quota_scheduler()
+
+# Plans started in the background while the user answers the last step
+@st.cache_resource
+def get_speculator():
+    return config.speculator_from_env()
+
+speculator = get_speculator()
+
+# Session checkpoints shared by every worker (AYURVEDA_SESSION_STORE); None keeps sessions in memory
+@st.cache_resource
+def get_session_store():
+    return config.session_store_from_env()
+
+session_store = get_session_store()
+
+# Reconnect: any worker rehydrates the session named by ?sid= from its last checkpoint.
+# An id without a checkpoint is never adopted (a planted link must not name a new session).
+if 'session_id' not in st.session_state:
+    requested_sid = st.query_params.get("sid") if session_store is not None else None
+    restored = session_store.load(requested_sid) if valid_session_id(requested_sid) else None
+    for key, value in (restored or {}).items():
+        if key in SESSION_KEYS:
+            st.session_state[key] = value
+    st.session_state.session_id = requested_sid if restored else uuid.uuid4().hex
+    if session_store is not None:
+        st.query_params["sid"] = st.session_state.session_id
 
 # Initialize session state
 if 'user_data' not in st.session_state:
@@ -186,6 +165,144 @@ if 'current_step' not in st.session_state:
     st.session_state.current_step = 0
 if 'show_results' not in st.session_state:
     st.session_state.show_results = False
+if 'assessment_runs' not in st.session_state:
+    st.session_state.assessment_runs = 0
+    st.session_state.assessment_cpu_s = 0.0
+
+# Reruns and CPU per completed assessment (this session's script thread only)
+run_cpu_start = time.thread_time()
+
+# Partial reruns for self-contained widgets (plain call on older Streamlit)
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda fn: fn)
+
+def plan_owner():
+    """Whose saved plans this session sees: the signed-in user, else this session's id."""
+    user = getattr(st, "user", None)
+    if user is not None and user.get("is_logged_in"):
+        identity = user.get("sub") or user.get("email")
+        if identity:
+            return owner_key("user", identity)
+    return owner_key("session", st.session_state.session_id)
+
+def checkpoint_session():
+    """Queue this session's state for the session store (unchanged state is skipped)."""
+    if session_store is not None:
+        session_store.save(st.session_state.session_id, {key: st.session_state[key] for key in SESSION_KEYS})
+
+def submit_step(step_delta, finish=False):
+    """Form callback: store the submitted step's answers, then move to the next step."""
+    step = st.session_state.current_step
+    for key in QUESTIONS[step]['questions']:
+        widget_key = f"{key}_{step}"
+        if widget_key in st.session_state:
+            st.session_state.user_data[key] = st.session_state[widget_key]
+    st.session_state.current_step = min(max(step + step_delta, 0), len(QUESTIONS) - 1)
+    if finish:
+        st.session_state.show_results = True
+        metrics.inc("ayurveda_assessments_completed_total")
+        metrics.inc("ayurveda_assessment_reruns_total", st.session_state.assessment_runs)
+        metrics.inc("ayurveda_assessment_cpu_seconds_total", st.session_state.assessment_cpu_s)
+    checkpoint_session()
+
+def plan_cache_key(user_data, sectioned):
+    """Plan cache key for these answers; sectioned and whole-prompt plans are cached apart."""
+    return profile_hash(user_data, f"{PROMPT_TEMPLATE_VERSION}:sections" if sectioned else PROMPT_TEMPLATE_VERSION)
+
+# The last step is a form, so its answers are unknown until it is submitted; only
+# sections that none of them feed into can be written ahead without guessing
+SPECULATIVE_SECTIONS = sections_independent_of(QUESTIONS[-1]['questions'])
+
+def speculation_key(user_data):
+    """A speculative run is identified by the cache keys of the sections it writes."""
+    return ",".join(section_key(spec, user_data) for spec in SPECULATIVE_SECTIONS)
+
+def speculate_plan(user_data):
+    """Write the sections the last step cannot change into the section cache on a background thread."""
+    session_id = st.session_state.session_id
+    key = speculation_key(user_data)
+    if speculator.has(session_id, key):
+        return
+    # Reserved before queueing: while the ticket waits, the results page joins these sections instead of paying twice
+    reservation = section_planner.reserve(user_data, only=[spec.key for spec in SPECULATIVE_SECTIONS])
+    if not reservation:
+        return
+    try:
+        ticket = quota_scheduler.submit(
+            session_id,
+            sum(estimate_tokens(build_section_prompt(spec, user_data)) for spec in SECTIONS if spec.key in reservation.keys)
+            + config.EXPECTED_RESPONSE_TOKENS,
+            requests=len(reservation),
+        )
+    except SchedulerBusy:
+        section_planner.release(reservation)
+        return  # never spend scarce quota on a guess
+
+    def give_up():
+        quota_scheduler.cancel(ticket)
+        section_planner.release(reservation)
+
+    def run():
+        try:
+            return quota_scheduler.run(ticket, functools.partial(section_planner.generate, user_data, reserved=reservation))
+        finally:
+            give_up()
+
+    generation_backend.configure(gemini_api_key)
+    if not speculator.start(session_id, key, run, on_cancel=give_up):
+        give_up()
+
+def summarize_consultation(session_id, prompt):
+    """Summary call for a background thread; it waits its turn in the shared quota like any request.
+
+    The summary prompt has its own instructions, so it goes through the plain
+    router rather than the one holding the consultation prefix.
+    """
+    ticket = quota_scheduler.submit(session_id, estimate_tokens(prompt) + config.CHAT_SUMMARY_TOKENS)
+    try:
+        return quota_scheduler.run(ticket, lambda: plain_router.generate(prompt)).text
+    finally:
+        quota_scheduler.cancel(ticket)
+
+@fragment
+def render_progress_tracker():
+    st.markdown("### 📊 Assessment Progress")
+    progress = (st.session_state.current_step + 1) / 5
+    st.markdown(f'<div class="progress-bar" style="width: {progress * 100}%"></div>', unsafe_allow_html=True)
+    st.write(f"Step {st.session_state.current_step + 1} of 5")
+
+@fragment
+def render_quick_health_check():
+    st.markdown("### 🔍 Quick Health Check")
+    quick_concern = st.selectbox("Common Concerns:", ["Select"] + HEALTH_PROBLEMS[:10])
+    
+    if quick_concern != "Select":
+        st.info(f"Focusing on: {quick_concern}")
+        if 'main_health_concerns' not in st.session_state.user_data:
+            st.session_state.user_data['main_health_concerns'] = []
+        if quick_concern not in st.session_state.user_data['main_health_concerns']:
+            st.session_state.user_data['main_health_concerns'].append(quick_concern)
+
+def show_more_herbs(count=None):
+    """Reference guide callback: show ``count`` more herbs, or reset to the first page."""
+    shown = st.session_state.get("herb_guide_shown", config.REFERENCE_GUIDE_LIMIT)
+    st.session_state.herb_guide_shown = shown + count if count else config.REFERENCE_GUIDE_LIMIT
+
+@fragment
+def render_reference_guide():
+    """Herb cards as one grid payload; "Show more" and the filter rerun only this fragment."""
+    with metrics.span("render_reference_guide"), st.expander("🌿 Herb Reference Guide (Click to Expand)"):
+        st.markdown("### Common Ayurvedic Herbs & Their Uses")
+        knowledge_base = get_knowledge_base()
+        herb_filter = st.text_input(
+            "Filter by benefit (e.g. sleep, immunity):", key="herb_filter", on_change=show_more_herbs
+        )
+        guide_herbs = knowledge_base.search(herb_filter) if herb_filter else knowledge_base.names
+        shown = st.session_state.setdefault("herb_guide_shown", config.REFERENCE_GUIDE_LIMIT)
+        st.markdown(herb_grid_html(guide_herbs[:shown], HERBS_DATABASE), unsafe_allow_html=True)
+        if len(guide_herbs) > shown:
+            st.caption(f"Showing {shown} of {len(guide_herbs)} herbs — filter to narrow down.")
+            more = min(config.REFERENCE_GUIDE_LIMIT, len(guide_herbs) - shown)
+            st.button(f"Show {more} more herbs", on_click=show_more_herbs, args=(more,))
 
 # SIDEBAR - Professional Dashboard
 with st.sidebar:
@@ -195,185 +312,126 @@ with st.sidebar:
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Connection Status
-    if gemini_connected:
+    if not generation_backend.requires_api_key:
+        st.warning(f"🧪 Using {generation_backend.name} backend (no API calls)")
+    elif gemini_connected:
         st.success("✅ Gemini AI Connected")
     else:
         st.error("❌ AI Not Connected")
         st.info("Add Gemini API key to secrets.toml")
     
+    # Generation Mode
+    refine_with_llm = st.toggle("🤖 Refine with Gemini", value=True)
+    stream_plan_enabled = st.toggle("⚡ Stream plan as it's written", value=True)
+    sectioned_plan_enabled = st.toggle("🧩 Build plan section by section", value=config.SECTIONED_PLANS)
+    speculative_plan_enabled = st.toggle("🔮 Start my plan on the last step", value=config.SPECULATIVE_PLANS)
+    
     # Progress Tracker
-    st.markdown("### 📊 Assessment Progress")
-    progress = (st.session_state.current_step + 1) / 5
-    st.markdown(f'<div class="progress-bar" style="width: {progress * 100}%"></div>', unsafe_allow_html=True)
-    st.write(f"Step {st.session_state.current_step + 1} of 5")
+    render_progress_tracker()
+    
+    # Returning user: reopen the last saved plan instead of regenerating it
+    if not st.session_state.show_results:
+        saved_plan = plan_store.latest_for_user(plan_owner())
+        if saved_plan:
+            st.markdown("### 📂 Your Saved Plan")
+            st.caption(f"Saved on {datetime.fromtimestamp(saved_plan.created_at):%d %b %Y, %H:%M}")
+            if st.button("Open Saved Plan", use_container_width=True):
+                st.session_state.user_data = dict(saved_plan.profile)
+                st.session_state.show_results = True
+                st.rerun()
     
     # Quick Health Check
-    st.markdown("### 🔍 Quick Health Check")
-    quick_concern = st.selectbox("Common Concerns:", ["Select"] + HEALTH_PROBLEMS[:10])
-    
-    if quick_concern != "Select":
-        st.info(f"Focusing on: {quick_concern}")
-        if 'main_health_concerns' not in st.session_state.user_data:
-            st.session_state.user_data['main_health_concerns'] = []
-        if quick_concern not in st.session_state.user_data['main_health_concerns']:
-            st.session_state.user_data['main_health_concerns'].append(quick_concern)
+    render_quick_health_check()
 
 # MAIN CONTENT
 st.markdown('<div class="main-header">🌿 Ayurvedic AI Wellness Assessment</div>', unsafe_allow_html=True)
 
-# Professional Question Flow
-questions = [
-    {
-        "step": 1,
-        "title": "👤 Personal Profile",
-        "icon": "👤",
-        "questions": {
-            "name": "What's your full name?",
-            "age": "What's your age?",
-            "weight": "What's your weight (kg)?",
-            "height": "What's your height (cm)?",
-            "gender": "What's your gender?"
-        }
-    },
-    {
-        "step": 2, 
-        "title": "🎯 Health Assessment",
-        "icon": "🎯",
-        "questions": {
-            "main_health_concerns": "Select your main health concerns:",
-            "symptom_severity": "Rate your symptom severity (1-10):",
-            "duration": "How long have you had these symptoms?",
-            "previous_treatments": "What treatments have you tried?"
-        }
-    },
-    {
-        "step": 3,
-        "title": "😴 Lifestyle Analysis",
-        "icon": "😴",
-        "questions": {
-            "sleep_quality": "Sleep quality (1-10):",
-            "energy_level": "Daily energy level (1-10):",
-            "stress_level": "Stress level (1-10):",
-            "digestion": "Digestion quality:",
-            "exercise": "Exercise frequency:"
-        }
-    },
-    {
-        "step": 4,
-        "title": "🍽️ Diet & Habits",
-        "icon": "🍽️",
-        "questions": {
-            "diet_type": "Primary diet type:",
-            "water_intake": "Daily water intake (glasses):",
-            "food_preferences": "Food preferences/allergies:",
-            "eating_pattern": "Typical eating pattern:"
-        }
-    },
-    {
-        "step": 5,
-        "title": "📝 Wellness Goals",
-        "icon": "📝",
-        "questions": {
-            "primary_goal": "Primary wellness goal:",
-            "time_commitment": "Daily time for wellness:",
-            "budget": "Wellness budget:",
-            "expectations": "Expected outcomes:"
-        }
-    }
-]
-
 # Display current step
 if not st.session_state.show_results:
-    current_q = questions[st.session_state.current_step]
+    current_q = QUESTIONS[st.session_state.current_step]
     
     st.markdown(f'<div class="step-card">', unsafe_allow_html=True)
     st.markdown(f"### {current_q['icon']} {current_q['title']}")
-    st.markdown(f"*Step {st.session_state.current_step + 1} of {len(questions)}*")
+    st.markdown(f"*Step {st.session_state.current_step + 1} of {len(QUESTIONS)}*")
     
-    # Dynamic question rendering
-    for key, question in current_q['questions'].items():
-        st.markdown(f'<div class="question-title">{question}</div>', unsafe_allow_html=True)
-        
-        # Smart input types
-        if key == 'main_health_concerns':
-            selected_problems = st.multiselect(
-                "Select from common health issues:",
-                HEALTH_PROBLEMS,
-                default=st.session_state.user_data.get('main_health_concerns', [])
-            )
-            st.session_state.user_data[key] = selected_problems
+    # Dynamic question rendering, batched into one form per step
+    with st.form(f"step_{st.session_state.current_step}"):
+        for key, question in current_q['questions'].items():
+            st.markdown(f'<div class="question-title">{question}</div>', unsafe_allow_html=True)
             
-            # Show selected tags
-            if selected_problems:
-                st.markdown("**Selected concerns:**")
-                for problem in selected_problems[:5]:  # Show first 5
-                    st.markdown(f'<span class="health-tag">{problem}</span>', unsafe_allow_html=True)
+            # Smart input types
+            if key == 'main_health_concerns':
+                selected_problems = st.multiselect(
+                    "Select from common health issues:",
+                    HEALTH_PROBLEMS,
+                    default=st.session_state.user_data.get('main_health_concerns', []),
+                    key=f"{key}_{st.session_state.current_step}"
+                )
                 
-        elif any(word in key for word in ['level', 'quality', 'severity', 'rating']):
-            default_val = st.session_state.user_data.get(key, 5)
-            response = st.slider("", 1, 10, default_val, key=f"{key}_{st.session_state.current_step}")
-            st.session_state.user_data[key] = response
-            
-        elif key in ['age', 'weight', 'height', 'water_intake']:
-            default_val = st.session_state.user_data.get(key, 25 if key == 'age' else 70)
-            response = st.number_input("", min_value=1, value=default_val, key=f"{key}_{st.session_state.current_step}")
-            st.session_state.user_data[key] = response
-            
-        elif key == 'gender':
-            options = ["Male", "Female", "Other", "Prefer not to say"]
-            default_idx = options.index(st.session_state.user_data.get(key, "Male"))
-            response = st.selectbox("", options, index=default_idx, key=f"{key}_{st.session_state.current_step}")
-            st.session_state.user_data[key] = response
-            
-        elif key == 'diet_type':
-            options = ["Vegetarian", "Non-vegetarian", "Vegan", "Pescatarian", "Mixed"]
-            default_idx = options.index(st.session_state.user_data.get(key, "Vegetarian"))
-            response = st.selectbox("", options, index=default_idx, key=f"{key}_{st.session_state.current_step}")
-            st.session_state.user_data[key] = response
-            
-        elif key == 'exercise':
-            options = ["Daily", "3-4 times/week", "Weekly", "Rarely", "Never"]
-            default_idx = options.index(st.session_state.user_data.get(key, "Weekly"))
-            response = st.selectbox("", options, index=default_idx, key=f"{key}_{st.session_state.current_step}")
-            st.session_state.user_data[key] = response
-            
-        elif key == 'digestion':
-            options = ["Excellent", "Good", "Fair", "Poor", "Severe issues"]
-            default_idx = options.index(st.session_state.user_data.get(key, "Good"))
-            response = st.selectbox("", options, index=default_idx, key=f"{key}_{st.session_state.current_step}")
-            st.session_state.user_data[key] = response
-            
-        elif key == 'budget':
-            options = ["Low", "Medium", "High", "Premium"]
-            default_idx = options.index(st.session_state.user_data.get(key, "Medium"))
-            response = st.selectbox("", options, index=default_idx, key=f"{key}_{st.session_state.current_step}")
-            st.session_state.user_data[key] = response
-            
-        else:
-            default_val = st.session_state.user_data.get(key, "")
-            response = st.text_input("", value=default_val, key=f"{key}_{st.session_state.current_step}")
-            st.session_state.user_data[key] = response
+                # Show selected tags
+                if selected_problems:
+                    st.markdown("**Selected concerns:**")
+                    for problem in selected_problems[:5]:  # Show first 5
+                        st.markdown(f'<span class="health-tag">{problem}</span>', unsafe_allow_html=True)
+                    
+            elif any(word in key for word in ['level', 'quality', 'severity', 'rating']):
+                default_val = st.session_state.user_data.get(key, 5)
+                st.slider("", 1, 10, default_val, key=f"{key}_{st.session_state.current_step}")
+                
+            elif key in ['age', 'weight', 'height', 'water_intake']:
+                default_val = st.session_state.user_data.get(key, 25 if key == 'age' else 70)
+                st.number_input("", min_value=1, value=default_val, key=f"{key}_{st.session_state.current_step}")
+                
+            elif key == 'gender':
+                options = ["Male", "Female", "Other", "Prefer not to say"]
+                default_idx = options.index(st.session_state.user_data.get(key, "Male"))
+                st.selectbox("", options, index=default_idx, key=f"{key}_{st.session_state.current_step}")
+                
+            elif key == 'diet_type':
+                options = ["Vegetarian", "Non-vegetarian", "Vegan", "Pescatarian", "Mixed"]
+                default_idx = options.index(st.session_state.user_data.get(key, "Vegetarian"))
+                st.selectbox("", options, index=default_idx, key=f"{key}_{st.session_state.current_step}")
+                
+            elif key == 'exercise':
+                options = ["Daily", "3-4 times/week", "Weekly", "Rarely", "Never"]
+                default_idx = options.index(st.session_state.user_data.get(key, "Weekly"))
+                st.selectbox("", options, index=default_idx, key=f"{key}_{st.session_state.current_step}")
+                
+            elif key == 'digestion':
+                options = ["Excellent", "Good", "Fair", "Poor", "Severe issues"]
+                default_idx = options.index(st.session_state.user_data.get(key, "Good"))
+                st.selectbox("", options, index=default_idx, key=f"{key}_{st.session_state.current_step}")
+                
+            elif key == 'budget':
+                options = ["Low", "Medium", "High", "Premium"]
+                default_idx = options.index(st.session_state.user_data.get(key, "Medium"))
+                st.selectbox("", options, index=default_idx, key=f"{key}_{st.session_state.current_step}")
+                
+            else:
+                default_val = st.session_state.user_data.get(key, "")
+                st.text_input("", value=default_val, key=f"{key}_{st.session_state.current_step}")
+        
+        # Professional Navigation (submitting the form is the only rerun per step)
+        col1, col2, col3 = st.columns([1, 2, 1])
+        
+        with col1:
+            if st.session_state.current_step > 0:
+                st.form_submit_button("← Previous Step", use_container_width=True, on_click=submit_step, args=(-1,))
+        
+        with col3:
+            if st.session_state.current_step < len(QUESTIONS) - 1:
+                st.form_submit_button("Next Step →", use_container_width=True, type="primary", on_click=submit_step, args=(1,))
+            else:
+                st.form_submit_button(
+                    "🎯 Generate AI Plan", use_container_width=True, type="primary", on_click=submit_step, args=(0, True)
+                )
+    
+    # Last step: every answer the speculative sections need is already in
+    if (speculative_plan_enabled and sectioned_plan_enabled and refine_with_llm and gemini_connected
+            and st.session_state.current_step == len(QUESTIONS) - 1):
+        speculate_plan(st.session_state.user_data)
     
     st.markdown('</div>', unsafe_allow_html=True)
-    
-    # Professional Navigation
-    col1, col2, col3 = st.columns([1, 2, 1])
-    
-    with col1:
-        if st.session_state.current_step > 0:
-            if st.button("← Previous Step", use_container_width=True):
-                st.session_state.current_step -= 1
-                st.rerun()
-    
-    with col3:
-        if st.session_state.current_step < len(questions) - 1:
-            if st.button("Next Step →", use_container_width=True, type="primary"):
-                st.session_state.current_step += 1
-                st.rerun()
-        else:
-            if st.button("🎯 Generate AI Plan", use_container_width=True, type="primary"):
-                st.session_state.show_results = True
-                st.rerun()
 
 # RESULTS PAGE - With Gemini AI
 else:
@@ -381,16 +439,6 @@ else:
     st.success("### ✅ Assessment Complete! Generating Your AI-Powered Ayurvedic Plan...")
     
     # Calculate Wellness Score
-    def calculate_wellness_score(user_data):
-        sleep = int(user_data.get('sleep_quality', 5))
-        energy = int(user_data.get('energy_level', 5))
-        stress = 10 - int(user_data.get('stress_level', 5))
-        digestion_map = {"Excellent": 10, "Good": 8, "Fair": 6, "Poor": 4, "Severe issues": 2}
-        digestion = digestion_map.get(user_data.get('digestion', 'Fair'), 6)
-        
-        total = (sleep + energy + stress + digestion) / 4
-        return min(10, max(1, total))
-    
     wellness_score = calculate_wellness_score(st.session_state.user_data)
     
     # Display Wellness Metrics
@@ -404,187 +452,300 @@ else:
     with col4:
         st.metric("😌 Stress Level", f"{st.session_state.user_data.get('stress_level', 5)}/10")
     
-    # Prepare data for Gemini AI
-    user_profile = f"""
-    COMPREHENSIVE USER PROFILE FOR AYURVEDIC ASSESSMENT:
-    
-    PERSONAL DETAILS:
-    - Name: {st.session_state.user_data.get('name', 'User')}
-    - Age: {st.session_state.user_data.get('age', 'Not specified')} years
-    - Weight: {st.session_state.user_data.get('weight', 'Not specified')} kg
-    - Height: {st.session_state.user_data.get('height', 'Not specified')} cm
-    - Gender: {st.session_state.user_data.get('gender', 'Not specified')}
-    
-    HEALTH CONCERNS:
-    - Main Concerns: {', '.join(st.session_state.user_data.get('main_health_concerns', ['General wellness']))}
-    - Symptom Severity: {st.session_state.user_data.get('symptom_severity', '5')}/10
-    - Duration: {st.session_state.user_data.get('duration', 'Not specified')}
-    - Previous Treatments: {st.session_state.user_data.get('previous_treatments', 'None')}
-    
-    LIFESTYLE METRICS:
-    - Sleep Quality: {st.session_state.user_data.get('sleep_quality', '5')}/10
-    - Energy Level: {st.session_state.user_data.get('energy_level', '5')}/10
-    - Stress Level: {st.session_state.user_data.get('stress_level', '5')}/10
-    - Digestion: {st.session_state.user_data.get('digestion', 'Fair')}
-    - Exercise: {st.session_state.user_data.get('exercise', 'Weekly')}
-    
-    DIETARY PROFILE:
-    - Diet Type: {st.session_state.user_data.get('diet_type', 'Vegetarian')}
-    - Water Intake: {st.session_state.user_data.get('water_intake', '6')} glasses/day
-    - Food Preferences: {st.session_state.user_data.get('food_preferences', 'None')}
-    - Eating Pattern: {st.session_state.user_data.get('eating_pattern', 'Regular')}
-    
-    WELLNESS GOALS:
-    - Primary Goal: {st.session_state.user_data.get('primary_goal', 'Overall wellness')}
-    - Time Commitment: {st.session_state.user_data.get('time_commitment', '30 minutes')}/day
-    - Budget: {st.session_state.user_data.get('budget', 'Medium')}
-    - Expectations: {st.session_state.user_data.get('expectations', 'Improved health')}
-    
-    WELLNESS SCORE: {wellness_score}/10
-    """
-    
-    # Gemini AI Prompt
-    prompt = f"""
-    ACT as Dr. Ayurveda AI - a senior Ayurvedic practitioner with 25+ years experience.
-    
-    USER PROFILE:
-    {user_profile}
-    
-    AVAILABLE HERBS DATABASE:
-    {json.dumps(HERBS_DATABASE, indent=2)}
-    
-    Create a COMPREHENSIVE, PERSONALIZED Ayurvedic wellness plan with these EXACT sections:
-    
-    🌿 **HERBAL PRESCRIPTION**
-    - Select 3-5 most suitable herbs from the database for this user's specific concerns
-    - Provide exact dosages based on user's weight {st.session_state.user_data.get('weight', 70)}kg
-    - Specific timing (morning/afternoon/evening) with reasoning
-    - Duration and progression plan (4-8 weeks)
-    
-    📅 **DAILY WELLNESS SCHEDULE** (Dinacharya)
-    - Morning routine (5-8 AM) with specific timings
-    - Afternoon routine (12-2 PM) 
-    - Evening routine (6-8 PM)
-    - Bedtime routine (9-10 PM)
-    
-    🍃 **4-WEEK TRANSFORMATION PLAN**
-    - Week 1: Detox & Foundation Building
-    - Week 2: Strengthening & Symptom Relief
-    - Week 3: Optimization & Balance
-    - Week 4: Maintenance & Progress Assessment
-    
-    ⚠️ **SAFETY & PRECAUTIONS**
-    - Specific contraindications based on user profile
-    - Herb-drug interaction warnings
-    - Side effects monitoring guide
-    - When to consult a practitioner
-    
-    💡 **LIFESTYLE RECOMMENDATIONS**
-    - Dietary adjustments for their diet type
-    - Exercise suggestions based on their frequency
-    - Stress management techniques
-    - Sleep optimization strategies
-    
-    Format with clear headings, use emojis, and provide actionable, specific advice.
-    Be very precise about dosages in mg/grams and exact timing.
-    Reference specific herbs from the database provided.
-    """
+    # Prepare prompt for Gemini AI (only the relevant herbs, within the token budget)
+    with metrics.span("prompt_build"):
+        plan_prompt = build_prompt(st.session_state.user_data)
+    prompt, prompt_tokens, herb_context = plan_prompt.text, plan_prompt.tokens, plan_prompt.herb_context
+    
+    # Serve repeat views (button clicks, reruns) from the plan cache
+    with metrics.span("cache_lookup"):
+        plan_key = plan_cache_key(st.session_state.user_data, sectioned_plan_enabled)
+        cached_plan = plan_cache.get(plan_key)
+        if not cached_plan and st.session_state.get("regenerated_key") != plan_key:
+            # A saved plan for an identical profile is as good as a cache hit
+            stored_plan = plan_store.latest_for_profile(plan_key)
+            if stored_plan:
+                cached_plan = CachedPlan(text=stored_plan.plan, model=stored_plan.model, meta=stored_plan.timing)
+                plan_cache.put(plan_key, cached_plan)
+        if (not cached_plan and config.SIMILARITY_CACHE and refine_with_llm and not sectioned_plan_enabled
+                and st.session_state.get("regenerated_key") != plan_key):
+            similar_plan = similarity_cache.get(st.session_state.user_data)
+            if similar_plan:
+                cached_plan = CachedPlan(
+                    text=similar_plan.text,
+                    model=similar_plan.plan.model,
+                    created_at=similar_plan.plan.created_at,
+                    meta={**similar_plan.plan.meta, "approximated": similar_plan.approximated},
+                )
+                # Later reruns are exact hits instead of more similarity lookups
+                plan_cache.put(plan_key, cached_plan)
+    # Partial, busy and local plans are not cached; reruns (chat messages, buttons) keep the one already shown
+    rendered_plan = st.session_state.get("rendered_plan")
+    if cached_plan or not rendered_plan or rendered_plan["key"] != [plan_key, refine_with_llm]:
+        rendered_plan = None
+    
+    # Instant rule-based plan: first paint and offline fallback
+    with metrics.span("local_plan"):
+        local_plan = build_local_plan(st.session_state.user_data, HERBS_DATABASE, concern_index())
+    
+    # Display AI Plan (streamed into the placeholder as it arrives); the whole
+    # card is one payload so each update replaces a single element
+    plan_placeholder = st.empty()
+    def show_plan(text):
+        plan_placeholder.markdown(plan_card_markdown(text), unsafe_allow_html=True)
+    if not cached_plan and not rendered_plan:
+        show_plan(local_plan.to_markdown())
+    
+    # Claim this session's speculative run; one started for other answers is discarded as wasted
+    speculative = None
+    if not cached_plan and not rendered_plan and refine_with_llm and gemini_connected and sectioned_plan_enabled:
+        speculative = speculator.claim(st.session_state.session_id, speculation_key(st.session_state.user_data))
+    else:
+        speculator.discard(st.session_state.session_id)
     
     # UPDATED GEMINI CODE WITH WORKING MODELS
-    if gemini_connected:
+    plan_model, plan_timing = None, {}
+    if cached_plan:
+        ai_plan = cached_plan.text
+        plan_model, plan_timing = cached_plan.model, cached_plan.meta
+        if cached_plan.meta.get("approximated"):
+            st.sidebar.success(f"⚡ Plan from a similar profile ({cached_plan.model})")
+            st.sidebar.caption(
+                f"≈ Approximated: {', '.join(cached_plan.meta['approximated'])} • "
+                f"written {(time.time() - cached_plan.created_at) / 60:.0f} min ago"
+            )
+        else:
+            st.sidebar.success(f"⚡ Cached plan ({cached_plan.model})")
+    elif rendered_plan:
+        ai_plan, plan_model, plan_timing = rendered_plan["text"], rendered_plan["model"], rendered_plan["timing"]
+        st.sidebar.info("📌 Showing the plan generated earlier in this session (🔁 Regenerate Plan for a new one)")
+    elif not refine_with_llm:
+        ai_plan = local_plan.to_markdown()
+        st.sidebar.info(f"⚡ Instant local plan ({local_plan.build_ms:.1f} ms)")
+    elif gemini_connected:
         try:
+            generation_backend.configure(gemini_api_key)
             with st.spinner("🧠 AI Doctor is analyzing your profile..."):
-                # Try all available model names
-                model_names = [
-                    'gemini-1.5-flash',
-                    'gemini-1.5-flash-001',
-                    'gemini-1.5-pro',
-                    'gemini-1.5-pro-001',
-                    'gemini-1.0-pro',
-                    'gemini-1.0-pro-001',
-                    'gemini-pro',
-                    'models/gemini-pro'
-                ]
-                
-                ai_plan = None
-                successful_model = None
-                
-                for model_name in model_names:
-                    try:
-                        model = genai.GenerativeModel(model_name)
-                        response = model.generate_content(prompt)
-                        ai_plan = response.text
-                        successful_model = model_name
-                        break
-                    except Exception as model_error:
-                        continue
+                # Router tries the last healthy model first, with per-attempt deadlines
+                ai_plan, busy, partial_plan = None, None, False
+                try:
+                    if speculative is not None:
+                        # Its sections are cached or still being written; generate() below reuses or joins them
+                        st.sidebar.caption("🔮 Some sections were started while you answered the last step")
+                    missing_sections = section_planner.missing(st.session_state.user_data) if sectioned_plan_enabled else None
+                    if missing_sections == []:
+                        # Every section is cached: no model call, so no place in the queue either
+                        result = section_planner.generate(st.session_state.user_data)
+                    else:
+                        # Wait our turn in the shared quota queue (or give up early if it is too long)
+                        ticket = quota_scheduler.submit(
+                            st.session_state.session_id,
+                            prompt_tokens + config.EXPECTED_RESPONSE_TOKENS,
+                            requests=len(missing_sections) if sectioned_plan_enabled else 1,
+                        )
+                        # A rerun or stop before run() must not leave the ticket blocking the queue
+                        try:
+                            if ticket.estimated_wait_s >= 1:
+                                st.sidebar.caption(
+                                    f"⏳ Estimated wait ~{ticket.estimated_wait_s:.0f}s ({ticket.ahead} requests ahead)"
+                                )
+                            # Spans start once the ticket is granted: they time the model calls, not the queue
+                            if sectioned_plan_enabled:
+                                def generate_plan():
+                                    with metrics.span("generation_sections"):
+                                        return section_planner.generate(
+                                            st.session_state.user_data,
+                                            on_section=lambda plan: show_plan(plan.to_markdown()),
+                                        )
+                            else:
+                                def generate_plan():
+                                    with metrics.span("generation", streamed=stream_plan_enabled):
+                                        return model_router.generate(
+                                            prompt, on_text=show_plan if stream_plan_enabled else None
+                                        )
+                            result = quota_scheduler.run(ticket, generate_plan)
+                        finally:
+                            quota_scheduler.cancel(ticket)
+                    if sectioned_plan_enabled:
+                        st.sidebar.caption(
+                            f"🧩 Sections: {len(result.regenerated)} regenerated • {len(result.reused)}/{len(SECTIONS)} reused"
+                        )
+                    ai_plan, successful_model, timings = result.text, result.model or "cached sections", result.timings
+                    partial_plan = not getattr(result, "complete", True)
+                except AllModelsFailed as model_error:
+                    st.sidebar.caption(f"⚠️ {model_error}")
+                except SchedulerBusy as scheduler_busy:
+                    busy = scheduler_busy
                 
                 if ai_plan:
+                    plan_model, plan_timing = successful_model, timings.as_dict()
                     st.sidebar.success(f"✅ AI Model: {successful_model}")
+                    st.sidebar.caption(f"⏱️ First token {timings.first_token_s:.1f}s • Total {timings.total_s:.1f}s")
+                    if timings.usage:
+                        st.sidebar.caption(
+                            f"🔢 Tokens: {timings.usage['prompt_tokens']} prompt • {timings.usage['response_tokens']} response"
+                            + (f" • {timings.usage['cached_tokens']} cached" if timings.usage.get("cached_tokens") else "")
+                        )
+                    generation_stats.record(timings)
+                    generated_plan = CachedPlan(
+                        text=ai_plan,
+                        model=successful_model,
+                        meta={**timings.as_dict(), "prompt_tokens": prompt_tokens, "prompt_herbs": herb_context.herbs},
+                    )
+                    if partial_plan:
+                        # Its failed sections ask for a retry; caching would pin them for the whole TTL
+                        st.sidebar.caption(f"⚠️ {len(result.errors)} section(s) unavailable; plan not cached")
+                    else:
+                        plan_cache.put(plan_key, generated_plan)
+                    if config.SIMILARITY_CACHE and not sectioned_plan_enabled:
+                        similarity_cache.put(st.session_state.user_data, generated_plan)
+                elif busy:
+                    local_plan.notes.append(
+                        f"Gemini is busy right now (estimated wait {busy.wait_s:.0f}s), so this plan was generated "
+                        "locally from our herb database. Use 🔁 Regenerate Plan to try again in a minute."
+                    )
+                    ai_plan = local_plan.to_markdown()
+                    st.sidebar.warning("🚦 Using local plan (Gemini busy)")
                 else:
-                    ai_plan = """
-🌿 **Ayurvedic Wellness Plan**
-
-**Based on your assessment, here are personalized recommendations:**
-
-**Top Herbs for Your Concerns:**
-- Ashwagandha: 500mg twice daily (stress & energy)
-- Turmeric: 500mg with meals (inflammation)  
-- Brahmi: 300mg morning (mental clarity)
-- Triphala: 1g at bedtime (digestion)
-
-**Daily Schedule:**
-- **6-7 AM:** Wake up, warm water with lemon + Ashwagandha
-- **12-1 PM:** Lunch with Turmeric
-- **6-7 PM:** Brahmi with honey
-- **9-10 PM:** Triphala with warm water
-
-**Note:** Gemini AI is currently unavailable. This is a sample plan.
-                    """
-                    st.sidebar.warning("🤖 Using sample plan (AI unavailable)")
+                    local_plan.notes.append("Gemini AI is currently unavailable. This plan was generated locally from our herb database.")
+                    ai_plan = local_plan.to_markdown()
+                    st.sidebar.warning("🤖 Using local plan (AI unavailable)")
                     
         except Exception as e:
             st.error(f"⚠️ AI Error: {str(e)}")
-            ai_plan = "### 🔌 AI service temporarily unavailable. Please try again later."
+            local_plan.notes.append("AI service temporarily unavailable. This plan was generated locally; please try again later.")
+            ai_plan = local_plan.to_markdown()
     else:
-        ai_plan = "### 🔌 Connect Gemini API in secrets.toml for AI-powered recommendations."
+        local_plan.notes.append("Connect Gemini API in secrets.toml for AI-refined recommendations.")
+        ai_plan = local_plan.to_markdown()
     
-    # Display AI Plan
-    st.markdown('<div class="recommendation-card">', unsafe_allow_html=True)
-    st.markdown("## 🌟 Your AI-Powered Ayurvedic Wellness Plan")
-    st.markdown("---")
-    st.markdown(ai_plan)
-    st.markdown('</div>', unsafe_allow_html=True)
+    show_plan(ai_plan)
+    st.session_state.rendered_plan = {
+        "key": [plan_key, refine_with_llm], "text": ai_plan, "model": plan_model, "timing": plan_timing,
+    }
+    
+    st.sidebar.caption(
+        f"📝 Prompt: ~{prompt_tokens} tokens • {len(herb_context.herbs)}/{len(HERBS_DATABASE)} herbs"
+        + (f" ({herb_context.dropped_for_budget} dropped for budget)" if herb_context.dropped_for_budget else "")
+    )
+    if st.session_state.assessment_runs:
+        st.sidebar.caption(
+            f"🔁 Assessment: {st.session_state.assessment_runs} reruns • "
+            f"{st.session_state.assessment_cpu_s * 1000:.0f} ms CPU"
+        )
+    cache_stats = plan_cache.stats()
+    st.sidebar.caption(f"🗄️ Plan cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+    if config.SIMILARITY_CACHE:
+        similar_stats = similarity_cache.stats()
+        st.sidebar.caption(
+            f"≈ Similar-profile cache: {similar_stats['hit_rate']:.0%} hit rate • "
+            f"{similar_stats['approximate_hits']} approximate • mean age {similar_stats['mean_staleness_s'] / 60:.0f} min"
+        )
+    timing_summary = generation_stats.summary(streamed=stream_plan_enabled)
+    if timing_summary["count"]:
+        st.sidebar.caption(
+            f"📈 p50 over {timing_summary['count']} plans: first token "
+            f"{timing_summary['first_token_p50_s']:.1f}s • total {timing_summary['total_p50_s']:.1f}s"
+        )
+    with st.sidebar.expander("🛰️ Model Health"):
+        st.table([
+            {**row, "errors": ", ".join(f"{name} ×{count}" for name, count in row["errors"].items())}
+            for row in model_router.stats()
+        ])
+        if speculative_plan_enabled:
+            speculation_stats = speculator.stats()
+            st.caption(
+                f"🔮 Speculative plans: {speculation_stats['used']} used • {speculation_stats['wasted']} wasted "
+                f"({speculation_stats['wasted_ratio']:.0%})"
+            )
+        queue_stats = quota_scheduler.stats()
+        st.caption(
+            f"🚦 Shared queue: {queue_stats['queued']} waiting • {queue_stats['rejected']} sent to local plan • "
+            f"{queue_stats['quota_errors']} quota errors"
+            + (f" • paused {queue_stats['paused_s']:.0f}s" if queue_stats["paused_s"] else "")
+        )
     
     # Herb Reference Guide
-    with st.expander("🌿 Herb Reference Guide (Click to Expand)"):
-        st.markdown("### Common Ayurvedic Herbs & Their Uses")
-        cols = st.columns(2)
-        for idx, (herb, info) in enumerate(HERBS_DATABASE.items()):
-            with cols[idx % 2]:
-                st.markdown(f'<div class="herb-card">', unsafe_allow_html=True)
-                st.markdown(f"**{herb}**")
-                st.markdown(f"*Benefits:* {', '.join(info['benefits'][:3])}")
-                st.markdown(f"*Dosage:* {info['dosage']}")
-                st.markdown(f"*Safety:* {info['safety'][:50]}...")
-                st.markdown('</div>', unsafe_allow_html=True)
+    render_reference_guide()
     
     # Action Buttons
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         if st.button("🔄 New Assessment", use_container_width=True):
             st.session_state.current_step = 0
             st.session_state.user_data = {}
             st.session_state.show_results = False
+            st.session_state.assessment_runs = 0
+            st.session_state.assessment_cpu_s = 0.0
+            st.session_state.pop("rendered_plan", None)
             st.rerun()
     
     with col2:
         if st.button("📄 Save This Plan", use_container_width=True):
-            st.success("💾 Plan saved to your session! (Add database for permanent storage)")
+            plan_store.save(plan_owner(), st.session_state.user_data, plan_key, ai_plan, model=plan_model, timing=plan_timing)
+            st.success("💾 Plan saved! Reopen it from the sidebar when you come back.")
     
     with col3:
         if st.button("📊 View My Profile", use_container_width=True):
             st.json(st.session_state.user_data)
+    
+    with col4:
+        if st.button("🔁 Regenerate Plan", use_container_width=True):
+            plan_cache.invalidate(plan_key)
+            section_planner.invalidate(st.session_state.user_data)
+            st.session_state.regenerated_key = plan_key
+            st.session_state.pop("rendered_plan", None)
+            st.rerun()
+    
+    # Follow-up consultation about this plan; per-turn input stays within the chat token budgets
+    if gemini_connected:
+        # The plan on screen, as stored for this session: regenerating it elsewhere must not wipe the chat
+        chat_plan = st.session_state.rendered_plan["text"]
+        consultation = st.session_state.get("consultation")
+        if consultation is None or not consultation.matches(st.session_state.user_data, chat_plan):
+            consultation = st.session_state.consultation = config.consultation_from_env(st.session_state.user_data, chat_plan)
+        st.markdown("### 💬 Ask a Follow-up Question")
+        for turn in consultation.turns:
+            with st.chat_message(turn.role):
+                st.markdown(turn.text)
+        question = st.chat_input("e.g. Can I take Ashwagandha with my thyroid medication?")
+        if question:
+            with st.chat_message("user"):
+                st.markdown(question)
+            chat_prompt = consultation.build_prompt(question, cached_prefix=config.CONTEXT_CACHE)
+            with st.chat_message("assistant"):
+                answer_placeholder = st.empty()
+                try:
+                    generation_backend.configure(gemini_api_key)
+                    ticket = quota_scheduler.submit(
+                        st.session_state.session_id, chat_prompt.tokens + config.CHAT_RESPONSE_TOKENS
+                    )
+                    def answer():
+                        with metrics.span("consultation_turn"):
+                            return consultation_router.generate(chat_prompt.text, on_text=answer_placeholder.markdown)
+                    try:
+                        result = quota_scheduler.run(ticket, answer)
+                    finally:
+                        quota_scheduler.cancel(ticket)
+                except SchedulerBusy as busy:
+                    answer_placeholder.warning(f"⏳ Gemini is busy (about {busy.wait_s:.0f}s wait). Please ask again shortly.")
+                except AllModelsFailed as e:
+                    answer_placeholder.error(f"⚠️ AI Error: {str(e)}")
+                else:
+                    answer_placeholder.markdown(result.text)
+                    consultation.add_exchange(question, result.text)
+                    # Older turns are folded into the summary after the answer is on screen
+                    consultation.compact_in_background(
+                        chat_summarizer, functools.partial(summarize_consultation, st.session_state.session_id)
+                    )
+                    chat_stats = consultation.stats()
+                    st.caption(
+                        f"📝 ~{chat_prompt.tokens} input tokens"
+                        + (f" (+{chat_prompt.prefix_tokens} cached)" if chat_prompt.cached_prefix else "")
+                        + f" • {chat_prompt.history_turns} recent turns"
+                        + (f" • {chat_stats['summarized_turns']} summarized" if chat_stats["summarized_turns"] else "")
+                        + f" • {result.timings.total_s:.1f}s"
+                    )
 
 # Footer
 st.markdown("---")
@@ -592,4 +753,14 @@ st.markdown("""
 <div style='text-align: center; color: gray;'>
     <i>🌿 Ancient Wisdom × Modern AI • Personalized Ayurvedic Wellness • Always consult healthcare providers for medical advice</i>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Run accounting (runs cut short by st.rerun() are not counted)
+run_page = "results" if st.session_state.show_results else "wizard"
+run_cpu_s = time.thread_time() - run_cpu_start
+metrics.inc("ayurveda_script_runs_total", page=run_page)
+metrics.observe("ayurveda_script_run_cpu_seconds", run_cpu_s, page=run_page)
+if not st.session_state.show_results:
+    st.session_state.assessment_runs += 1
+    st.session_state.assessment_cpu_s += run_cpu_s
+checkpoint_session()
\ No newline at end of file
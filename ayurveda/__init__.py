@@ -0,0 +1 @@
+"""Core, UI-independent building blocks for the Ayurvedic AI Doctor app."""
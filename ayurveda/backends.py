@@ -0,0 +1,63 @@
+"""Pluggable generation backends.
+
+A backend turns a model name into an object with the
+``GenerativeModel.generate_content(prompt, stream=...)`` interface. The real
+one wraps the Gemini SDK; ``AYURVEDA_BACKEND=fake`` swaps in the local stub
+from :mod:`ayurveda.fake_backend` so the app, batch mode, service and
+benchmarks can run without spending API quota.
+"""
+from __future__ import annotations
+
+import os
+from typing import Protocol
+
+from ayurveda import gemini_client
+
+
+class GenerationBackend(Protocol):
+    name: str
+    requires_api_key: bool
+
+    def configure(self, api_key: str | None) -> None: ...
+
+    def create_model(self, model_name: str): ...
+
+    def create_cached_model(self, model_name: str, prefix: str, ttl_seconds: float): ...
+
+
+class GeminiBackend:
+    name = "gemini"
+    requires_api_key = True
+
+    def configure(self, api_key: str | None) -> None:
+        if api_key:
+            gemini_client.configure(api_key)
+
+    def create_model(self, model_name: str):
+        return gemini_client.create_model(model_name)
+
+    def create_cached_model(self, model_name: str, prefix: str, ttl_seconds: float):
+        return gemini_client.create_cached_model(model_name, prefix, ttl_seconds)
+
+
+def backend_from_env() -> GenerationBackend:
+    """Backend selected by ``AYURVEDA_BACKEND`` (``gemini`` or ``fake``)."""
+    kind = os.environ.get("AYURVEDA_BACKEND", "gemini")
+    if kind == "gemini":
+        return GeminiBackend()
+    if kind == "fake":
+        from ayurveda.fake_backend import FakeBackend
+
+        missing = os.environ.get("AYURVEDA_FAKE_MISSING_MODELS", "")
+        seed = os.environ.get("AYURVEDA_FAKE_SEED")
+        return FakeBackend(
+            latency=os.environ.get("AYURVEDA_FAKE_LATENCY", "lognormal:2.0,0.4"),
+            error_rate=float(os.environ.get("AYURVEDA_FAKE_ERROR_RATE", 0)),
+            missing_models=tuple(name for name in missing.split(",") if name),
+            chunk_chars=int(os.environ.get("AYURVEDA_FAKE_CHUNK_CHARS", 120)),
+            min_cache_tokens=int(os.environ.get("AYURVEDA_FAKE_MIN_CACHE_TOKENS", 0)),
+            quota_limit=int(os.environ.get("AYURVEDA_FAKE_RPM_LIMIT", 0)),
+            prefill_s_per_1k_tokens=float(os.environ.get("AYURVEDA_FAKE_PREFILL", 0)),
+            seed=int(seed) if seed else None,
+        )
+    raise ValueError(f"Unknown AYURVEDA_BACKEND: {kind}")
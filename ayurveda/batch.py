@@ -0,0 +1,188 @@
+"""Headless batch generation of wellness plans.
+
+Streams a JSONL file of assessments (same keys as the app's ``user_data``)
+through the same prompt builder and model router as the Streamlit app::
+
+    python -m ayurveda.batch assessments.jsonl -o plans.jsonl --concurrency 8 --rpm 120
+
+Input is read lazily and only a bounded window of records is in flight, so
+memory does not grow with the input size. Progress is checkpointed next to
+the output file; rerunning the same command resumes where it stopped.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator
+
+from ayurveda import config
+from ayurveda.backends import backend_from_env
+from ayurveda.metrics import get_registry
+from ayurveda.plan_cache import CachedPlan, profile_hash
+from ayurveda.prompts import PROMPT_TEMPLATE_VERSION, build_prompt
+from ayurveda.ratelimit import TokenBucket
+from ayurveda.router import AllModelsFailed
+
+
+class Checkpoint:
+    """Low watermark plus the few finished lines above it.
+
+    Lines complete out of order, but never more than the in-flight window
+    ahead of the watermark, so the checkpoint stays small for any input size.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done_below = 0
+        self.done_above: set[int] = set()
+        try:
+            with open(path, encoding="utf-8") as fh:
+                state = json.load(fh)
+            self.done_below = state["done_below"]
+            self.done_above = set(state["done_above"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def is_done(self, line_no: int) -> bool:
+        return line_no < self.done_below or line_no in self.done_above
+
+    def mark_done(self, line_no: int) -> None:
+        self.done_above.add(line_no)
+        while self.done_below in self.done_above:
+            self.done_above.remove(self.done_below)
+            self.done_below += 1
+
+    def save(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump({"done_below": self.done_below, "done_above": sorted(self.done_above)}, fh)
+        os.replace(tmp_path, self.path)
+
+
+def read_records(path: str) -> Iterator[tuple[int, str]]:
+    """Yield (line number, raw line) lazily; blank lines are skipped."""
+    fh = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line_no, line in enumerate(fh):
+            if line.strip():
+                yield line_no, line
+    finally:
+        if fh is not sys.stdin:
+            fh.close()
+
+
+class BatchRunner:
+    def __init__(self, router, plan_cache, limiter: TokenBucket, retries: int = 3, backoff: float = 2.0, metrics=None):
+        self.router = router
+        self.metrics = metrics or get_registry()
+        self.plan_cache = plan_cache
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff = backoff
+
+    def generate(self, line_no: int, raw: str) -> dict:
+        try:
+            user_data = json.loads(raw)
+        except ValueError as error:
+            return {"line": line_no, "error": f"invalid JSON: {error}"}
+        result = {"line": line_no, "id": user_data.get("id")}
+        user_data = {k: v for k, v in user_data.items() if k != "id"}
+        key = profile_hash(user_data, PROMPT_TEMPLATE_VERSION)
+        result["profile_hash"] = key
+
+        cached = self.plan_cache.get(key)
+        if cached:
+            return {**result, "model": cached.model, "plan": cached.text, "cached": True}
+
+        with self.metrics.span("prompt_build"):
+            plan_prompt = build_prompt(user_data)
+        result["prompt_tokens"] = plan_prompt.tokens
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                with self.metrics.span("generation", streamed=False):
+                    generated = self.router.generate(plan_prompt.text)
+            except AllModelsFailed as error:
+                if attempt == self.retries:
+                    return {**result, "error": str(error), "attempts": attempt + 1}
+                # Exponential backoff with jitter so workers don't retry in lockstep.
+                time.sleep(self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
+                continue
+            meta = {**generated.timings.as_dict(), "prompt_tokens": plan_prompt.tokens}
+            self.plan_cache.put(key, CachedPlan(text=generated.text, model=generated.model, meta=meta))
+            return {**result, "model": generated.model, "plan": generated.text, "timings": meta, "attempts": attempt + 1}
+
+
+def run(args: argparse.Namespace) -> dict:
+    backend = backend_from_env()
+    api_key = config.gemini_api_key()
+    if backend.requires_api_key and not api_key:
+        raise SystemExit("GEMINI_API_KEY is not set (environment or .env)")
+    backend.configure(api_key)
+
+    runner = BatchRunner(
+        router=config.router_from_env(backend),
+        plan_cache=config.plan_cache_from_env(),
+        limiter=TokenBucket(args.rpm, burst=args.concurrency),
+        retries=args.retries,
+        backoff=args.backoff,
+    )
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint")
+    summary = {"ok": 0, "failed": 0, "skipped": 0}
+    started = time.monotonic()
+    window = args.concurrency * 2
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool, open(args.output, "a", encoding="utf-8") as out:
+        in_flight: dict = {}
+
+        def drain(return_when) -> None:
+            done, _ = wait(list(in_flight), return_when=return_when)
+            for future in done:
+                line_no = in_flight.pop(future)
+                try:
+                    record = future.result()
+                except Exception as error:
+                    record = {"line": line_no, "error": f"{type(error).__name__}: {error}"}
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                summary["failed" if "error" in record else "ok"] += 1
+                checkpoint.mark_done(line_no)
+            out.flush()
+            checkpoint.save()
+
+        for line_no, raw in read_records(args.input):
+            if checkpoint.is_done(line_no):
+                summary["skipped"] += 1
+                continue
+            while len(in_flight) >= window:
+                drain(FIRST_COMPLETED)
+            in_flight[pool.submit(runner.generate, line_no, raw)] = line_no
+        while in_flight:
+            drain(FIRST_COMPLETED)
+
+    summary["elapsed_s"] = round(time.monotonic() - started, 2)
+    summary["plan_cache"] = runner.plan_cache.stats()
+    return summary
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate wellness plans for a JSONL file of assessments.")
+    parser.add_argument("input", help="JSONL file of user_data records ('-' for stdin)")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file that results are appended to")
+    parser.add_argument("--concurrency", type=int, default=4, help="worker threads (default: 4)")
+    parser.add_argument("--rpm", type=float, default=60, help="client-side requests per minute (default: 60)")
+    parser.add_argument("--retries", type=int, default=3, help="retries per record after all models fail (default: 3)")
+    parser.add_argument("--backoff", type=float, default=2.0, help="base backoff in seconds (default: 2)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint)")
+    summary = run(parser.parse_args(argv))
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
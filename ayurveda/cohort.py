@@ -0,0 +1,206 @@
+"""Vectorized wellness scoring and cohort analytics over saved assessments.
+
+``wellness_scores`` is the NumPy counterpart of
+:func:`ayurveda.scoring.calculate_wellness_score`: it takes columnar arrays of
+``sleep_quality``, ``energy_level``, ``stress_level`` and ``digestion`` and
+returns identical scores. :class:`CohortAggregator` consumes assessments in
+chunks and keeps only fixed-size counters, so dashboards can summarise
+millions of stored plans without holding them in memory:
+
+    python -m ayurveda.cohort plans.jsonl
+    python -m ayurveda.cohort --db ayurveda_plans.db
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from itertools import islice
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from ayurveda.scoring import DIGESTION_SCORES
+
+DEFAULT_DIGESTION = "Fair"
+
+# Scores are (sum of four integers) / 4 clipped to [1, 10], i.e. multiples of
+# 0.25, so the full distribution fits in 37 exact bins.
+SCORE_STEPS = 4
+SCORE_BINS = (10 - 1) * SCORE_STEPS + 1
+
+
+def digestion_scores(values) -> np.ndarray:
+    """Map digestion answers (strings) to their 2-10 score; unknown answers score 6."""
+    values = np.asarray(values, dtype=object)
+    default = DIGESTION_SCORES[DEFAULT_DIGESTION]
+    out = np.full(values.shape, default, dtype=np.int16)
+    for label, score in DIGESTION_SCORES.items():
+        out[values == label] = score
+    return out
+
+
+def wellness_scores(sleep, energy, stress, digestion) -> np.ndarray:
+    """Scores for whole columns; ``digestion`` holds answers or precomputed 2-10 scores."""
+    digestion = np.asarray(digestion)
+    if digestion.dtype.kind in "OUS":
+        digestion = digestion_scores(digestion)
+    total = (
+        np.asarray(sleep).astype(np.int64)
+        + np.asarray(energy).astype(np.int64)
+        + (10 - np.asarray(stress).astype(np.int64))
+        + digestion.astype(np.int64)
+    ) / 4
+    return np.clip(total, 1, 10)
+
+
+def columns_from_records(records: list[dict]) -> dict[str, np.ndarray]:
+    """Columnar arrays from ``user_data`` dicts, with the scalar scorer's defaults."""
+    n = len(records)
+    return {
+        "sleep_quality": np.fromiter((int(r.get("sleep_quality", 5)) for r in records), np.int64, n),
+        "energy_level": np.fromiter((int(r.get("energy_level", 5)) for r in records), np.int64, n),
+        "stress_level": np.fromiter((int(r.get("stress_level", 5)) for r in records), np.int64, n),
+        "digestion": np.fromiter(
+            (DIGESTION_SCORES.get(r.get("digestion", DEFAULT_DIGESTION), 6) for r in records), np.int64, n
+        ),
+    }
+
+
+def score_records(records: list[dict]) -> np.ndarray:
+    columns = columns_from_records(records)
+    return wellness_scores(columns["sleep_quality"], columns["energy_level"], columns["stress_level"], columns["digestion"])
+
+
+def _score_bins(scores: np.ndarray) -> np.ndarray:
+    return np.rint((scores - 1) * SCORE_STEPS).astype(np.int64)
+
+
+def _percentile(counts: np.ndarray, q: float) -> float | None:
+    total = int(counts.sum())
+    if not total:
+        return None
+    idx = int(np.searchsorted(np.cumsum(counts), max(1, int(np.ceil(q * total)))))
+    return 1 + idx / SCORE_STEPS
+
+
+class CohortAggregator:
+    """Streaming score distribution, overall and per health concern."""
+
+    def __init__(self):
+        self.count = 0
+        self.histogram = np.zeros(SCORE_BINS, dtype=np.int64)
+        self.concerns: dict[str, int] = {}
+        self.concern_histograms = np.zeros((0, SCORE_BINS), dtype=np.int64)
+
+    def _concern_ids(self, names: list[str]) -> list[int]:
+        ids = []
+        for name in names:
+            if name not in self.concerns:
+                self.concerns[name] = len(self.concerns)
+            ids.append(self.concerns[name])
+        if len(self.concerns) > len(self.concern_histograms):
+            grown = np.zeros((len(self.concerns), SCORE_BINS), dtype=np.int64)
+            grown[: len(self.concern_histograms)] = self.concern_histograms
+            self.concern_histograms = grown
+        return ids
+
+    def update(self, scores: np.ndarray, concerns: list[list[str]] | None = None) -> None:
+        """Add a chunk of scores and, optionally, each assessment's concerns."""
+        bins = _score_bins(np.asarray(scores, dtype=np.float64))
+        self.count += len(bins)
+        self.histogram += np.bincount(bins, minlength=SCORE_BINS)
+        if concerns is None:
+            return
+        lengths = np.fromiter((len(c) for c in concerns), np.int64, len(concerns))
+        if not lengths.sum():
+            return
+        concern_ids = np.asarray(self._concern_ids([name for c in concerns for name in c]), dtype=np.int64)
+        flat = concern_ids * SCORE_BINS + np.repeat(bins, lengths)
+        counts = np.bincount(flat, minlength=self.concern_histograms.size)
+        self.concern_histograms += counts.reshape(self.concern_histograms.shape)
+
+    def update_records(self, records: list[dict]) -> None:
+        self.update(score_records(records), [list(r.get("main_health_concerns") or []) for r in records])
+
+    def merge(self, other: "CohortAggregator") -> None:
+        """Fold in an aggregator built elsewhere (e.g. another worker's shard)."""
+        self.count += other.count
+        self.histogram += other.histogram
+        ids = self._concern_ids(list(other.concerns))
+        self.concern_histograms[ids] += other.concern_histograms[: len(ids)]
+
+    @staticmethod
+    def _describe(counts: np.ndarray) -> dict:
+        total = int(counts.sum())
+        values = 1 + np.arange(SCORE_BINS) / SCORE_STEPS
+        mean = float(counts @ values / total) if total else None
+        std = float(np.sqrt(counts @ (values - mean) ** 2 / total)) if total else None
+        nonzero = np.flatnonzero(counts)
+        return {
+            "count": total,
+            "mean": mean,
+            "std": std,
+            "min": float(values[nonzero[0]]) if total else None,
+            "max": float(values[nonzero[-1]]) if total else None,
+            "p10": _percentile(counts, 0.10),
+            "p50": _percentile(counts, 0.50),
+            "p90": _percentile(counts, 0.90),
+        }
+
+    def summary(self) -> dict:
+        values = 1 + np.arange(SCORE_BINS) / SCORE_STEPS
+        return {
+            **self._describe(self.histogram),
+            "distribution": {f"{v:g}": int(c) for v, c in zip(values, self.histogram) if c},
+            "concerns": {
+                name: self._describe(self.concern_histograms[idx])
+                for name, idx in sorted(self.concerns.items(), key=lambda item: -self.concern_histograms[item[1]].sum())
+            },
+        }
+
+
+def chunked(records: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    iterator = iter(records)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def read_jsonl_profiles(path: str) -> Iterator[dict]:
+    """Assessments from JSON lines: plan-store exports (``profile``), batch input (``user_data``) or bare dicts."""
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield record.get("profile") or record.get("user_data") or record
+
+
+def aggregate(profiles: Iterable[dict], chunk_size: int = 50_000) -> CohortAggregator:
+    aggregator = CohortAggregator()
+    for chunk in chunked(profiles, chunk_size):
+        aggregator.update_records(chunk)
+    return aggregator
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Wellness score distribution over stored assessments.")
+    parser.add_argument("input", nargs="?", help="JSON lines of assessments or exported plans")
+    parser.add_argument("--db", help="read saved plans from this SQLite plan store instead")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args(argv)
+    if bool(args.input) == bool(args.db):
+        parser.error("give either an input file or --db")
+
+    if args.db:
+        from ayurveda.storage import PlanStore
+
+        profiles = (plan.profile for plan in PlanStore(args.db).iter_plans())
+    else:
+        profiles = read_jsonl_profiles(args.input)
+    json.dump(aggregate(profiles, args.chunk_size).summary(), sys.stdout, indent=2, ensure_ascii=False)
+    print()
+
+
+if __name__ == "__main__":
+    main()
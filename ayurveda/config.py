@@ -0,0 +1,193 @@
+"""Environment-driven settings and factories for process-wide resources."""
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+from ayurveda.metrics import MetricsRegistry, get_registry, start_http_server
+from ayurveda.plan_cache import PlanCache
+from ayurveda.router import ModelRouter
+from ayurveda.scheduler import QuotaScheduler
+from ayurveda.session_store import FileSessionStore, SessionStore, SQLiteSessionStore
+from ayurveda.similarity_cache import SimilarityCache, policies_from_spec
+from ayurveda.speculation import Speculator
+from ayurveda.storage import PlanStore
+
+if TYPE_CHECKING:
+    from ayurveda.consultation import Consultation
+
+# Prompt size controls: most relevant herbs only, within a token budget
+PROMPT_TOP_K_HERBS = int(os.environ.get("AYURVEDA_PROMPT_TOP_K", 6))
+PROMPT_TOKEN_BUDGET = int(os.environ.get("AYURVEDA_PROMPT_TOKEN_BUDGET", 2000))
+
+# Generate the plan as five separately cached JSON sections (sidebar toggle default)
+SECTIONED_PLANS = os.environ.get("AYURVEDA_SECTIONED_PLANS", "0").lower() in ("1", "true", "yes")
+
+# Keep the static prompt prefix (instructions + herb catalog) in the provider's
+# context cache and send only the per-user suffix
+CONTEXT_CACHE = os.environ.get("AYURVEDA_CONTEXT_CACHE", "0").lower() in ("1", "true", "yes")
+CONTEXT_CACHE_TTL = float(os.environ.get("AYURVEDA_CONTEXT_CACHE_TTL", 3600))
+
+# Serve plans written for near-identical profiles (numeric answers within tolerance)
+SIMILARITY_CACHE = os.environ.get("AYURVEDA_SIMILARITY_CACHE", "0").lower() in ("1", "true", "yes")
+
+# Shared Gemini quota across sessions: requests and tokens per minute, the longest
+# queue wait before falling back to the local plan, and whether a 429 should
+# still walk the model fallback chain. The quota is for the whole deployment;
+# each of AYURVEDA_WORKERS app processes schedules against its share of it
+SCHEDULER_RPM = float(os.environ.get("AYURVEDA_RPM", 60))
+SCHEDULER_TPM = float(os.environ.get("AYURVEDA_TPM", 1_000_000))
+WORKERS = max(1, int(os.environ.get("AYURVEDA_WORKERS", 1)))
+SCHEDULER_MAX_WAIT = float(os.environ.get("AYURVEDA_MAX_QUEUE_WAIT", 20))
+FALLBACK_ON_QUOTA = os.environ.get("AYURVEDA_FALLBACK_ON_QUOTA", "0").lower() in ("1", "true", "yes")
+# Expected response size, charged against the TPM bucket up front
+EXPECTED_RESPONSE_TOKENS = int(os.environ.get("AYURVEDA_EXPECTED_RESPONSE_TOKENS", 1500))
+
+# Start generating on a background thread once the user reaches the last step
+SPECULATIVE_PLANS = os.environ.get("AYURVEDA_SPECULATIVE_PLANS", "0").lower() in ("1", "true", "yes")
+
+# Follow-up chat: token budgets for recent turns, the running summary of older
+# turns and the plan, and the answer size charged against the TPM bucket
+CHAT_HISTORY_TOKENS = int(os.environ.get("AYURVEDA_CHAT_HISTORY_TOKENS", 800))
+CHAT_SUMMARY_TOKENS = int(os.environ.get("AYURVEDA_CHAT_SUMMARY_TOKENS", 300))
+CHAT_PLAN_TOKENS = int(os.environ.get("AYURVEDA_CHAT_PLAN_TOKENS", 1200))
+CHAT_HERB_TOKENS = int(os.environ.get("AYURVEDA_CHAT_HERB_TOKENS", 400))
+CHAT_RESPONSE_TOKENS = int(os.environ.get("AYURVEDA_CHAT_RESPONSE_TOKENS", 500))
+
+# Herbs listed in the reference guide before the user filters the catalog
+REFERENCE_GUIDE_LIMIT = int(os.environ.get("AYURVEDA_REFERENCE_GUIDE_LIMIT", 20))
+
+
+def plan_cache_from_env() -> PlanCache:
+    return PlanCache(
+        max_entries=int(os.environ.get("AYURVEDA_PLAN_CACHE_SIZE", 256)),
+        ttl_seconds=float(os.environ.get("AYURVEDA_PLAN_CACHE_TTL", 24 * 3600)),
+        disk_dir=os.environ.get("AYURVEDA_PLAN_CACHE_DIR") or None,
+    )
+
+
+def similarity_cache_from_env(template_version) -> SimilarityCache:
+    """Approximate plan cache; ``AYURVEDA_SIMILARITY_POLICY`` overrides per-field
+    policies, e.g. ``age=10,sleep_quality=3,budget=ignore``."""
+    disk_dir = os.environ.get("AYURVEDA_PLAN_CACHE_DIR")
+    cache = PlanCache(
+        max_entries=int(os.environ.get("AYURVEDA_PLAN_CACHE_SIZE", 256)),
+        ttl_seconds=float(os.environ.get("AYURVEDA_PLAN_CACHE_TTL", 24 * 3600)),
+        disk_dir=os.path.join(disk_dir, "similar") if disk_dir else None,
+    )
+    return SimilarityCache(
+        cache,
+        policies_from_spec(os.environ.get("AYURVEDA_SIMILARITY_POLICY", "")),
+        template_version=template_version,
+        metrics=get_registry(),
+    )
+
+
+def speculator_from_env() -> Speculator:
+    return Speculator(
+        max_workers=int(os.environ.get("AYURVEDA_SPECULATION_WORKERS", 2)),
+        metrics=get_registry(),
+    )
+
+
+def plan_store_from_env() -> PlanStore:
+    return PlanStore(os.environ.get("AYURVEDA_PLAN_DB", "ayurveda_plans.db"))
+
+
+def session_store_from_env() -> SessionStore | None:
+    """``AYURVEDA_SESSION_STORE=sqlite:<path>`` or ``file:<directory>``; unset keeps
+    session state in this process only."""
+    spec = os.environ.get("AYURVEDA_SESSION_STORE", "")
+    if not spec:
+        return None
+    kind, _, location = spec.partition(":")
+    options = {
+        "flush_interval_s": float(os.environ.get("AYURVEDA_SESSION_FLUSH_INTERVAL", 0.5)),
+        "ttl_seconds": float(os.environ.get("AYURVEDA_SESSION_TTL", 7 * 24 * 3600)),
+        "metrics": get_registry(),
+    }
+    if kind == "sqlite":
+        return SQLiteSessionStore(location or "ayurveda_sessions.db", **options)
+    if kind == "file":
+        return FileSessionStore(location or "ayurveda_sessions", **options)
+    raise ValueError(f"Unknown AYURVEDA_SESSION_STORE: {spec}")
+
+
+def consultation_from_env(user_data: dict, plan: str) -> Consultation:
+    # Imported here: ayurveda.consultation builds on ayurveda.prompts, which imports this module.
+    from ayurveda.consultation import Consultation
+
+    return Consultation(
+        user_data,
+        plan,
+        history_budget=CHAT_HISTORY_TOKENS,
+        summary_budget=CHAT_SUMMARY_TOKENS,
+        plan_budget=CHAT_PLAN_TOKENS,
+        herb_budget=CHAT_HERB_TOKENS,
+        top_k_herbs=PROMPT_TOP_K_HERBS,
+        metrics=get_registry(),
+    )
+
+
+def router_from_env(
+    backend=None,
+    model_names: list[str] | None = None,
+    context_cache: bool | None = None,
+    cache_prefix: str | None = None,
+) -> ModelRouter:
+    """Model router; with ``context_cache`` (default ``CONTEXT_CACHE``) prompts are
+    expected to be suffixes from ``build_prompt(..., cached_prefix=True)``, or of
+    whatever ``cache_prefix`` is cached instead of the plan prefix."""
+    from ayurveda import gemini_client
+    from ayurveda.backends import backend_from_env
+
+    backend = backend or backend_from_env()
+    model_factory = backend.create_model
+    if CONTEXT_CACHE if context_cache is None else context_cache:
+        from ayurveda.context_cache import ContextCache
+        from ayurveda.prompts import context_cache_prefix
+
+        model_factory = ContextCache(
+            backend, cache_prefix or context_cache_prefix(), ttl_seconds=CONTEXT_CACHE_TTL, metrics=get_registry()
+        ).create_model
+    hedge_after = os.environ.get("AYURVEDA_HEDGE_AFTER")
+    return ModelRouter(
+        model_names or gemini_client.MODEL_NAMES,
+        model_factory,
+        attempt_timeout=float(os.environ.get("AYURVEDA_MODEL_TIMEOUT", 45)),
+        failure_threshold=int(os.environ.get("AYURVEDA_BREAKER_THRESHOLD", 3)),
+        cooldown_seconds=float(os.environ.get("AYURVEDA_BREAKER_COOLDOWN", 60)),
+        hedge_after=float(hedge_after) if hedge_after else None,
+        metrics=get_registry(),
+        fallback_on_quota=FALLBACK_ON_QUOTA,
+    )
+
+
+def scheduler_from_env() -> QuotaScheduler:
+    return QuotaScheduler(
+        rpm=SCHEDULER_RPM / WORKERS,
+        tpm=SCHEDULER_TPM / WORKERS,
+        max_wait_s=SCHEDULER_MAX_WAIT,
+        quota_backoff_s=float(os.environ.get("AYURVEDA_QUOTA_BACKOFF", 10)),
+        metrics=get_registry(),
+    )
+
+
+def metrics_from_env() -> MetricsRegistry:
+    """Process-wide registry; ``AYURVEDA_METRICS_PORT`` also starts a /metrics exporter."""
+    registry = get_registry()
+    port = os.environ.get("AYURVEDA_METRICS_PORT")
+    if port:
+        start_http_server(int(port), registry)
+    return registry
+
+
+def gemini_api_key() -> str | None:
+    """API key for non-UI entry points, read from the environment or a .env file."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        pass
+    else:
+        load_dotenv()
+    return os.environ.get("GEMINI_API_KEY")
@@ -0,0 +1,217 @@
+"""Follow-up consultation chat on the results page.
+
+Questions are answered with the user's profile and generated plan as context.
+Each prompt has three parts:
+
+* the static prefix: persona and consultation rules. It is the same for every
+  user and turn, so with ``AYURVEDA_CONTEXT_CACHE`` it lives in the provider's
+  context cache (:func:`consultation_prefix`);
+* the conversation context: profile, the herbs most relevant to the user's
+  concerns (the same ranking the plan prompt used, capped at ``herb_budget``
+  tokens), plan (capped at ``plan_budget``) and a running summary of older
+  turns (capped at ``summary_budget``);
+* the most recent turns, newest first until ``history_budget`` is spent.
+
+When the unsummarized turns outgrow ``history_budget``, the oldest exchanges
+are folded into the summary by a separate model call on a background thread,
+after the answer has been shown. The input sent per turn is therefore bounded
+by the budgets however long the chat runs and however large the herb catalog
+is, and no turn waits for a summary.
+If the summary call fails, a truncated extract of the folded turns is used
+instead, so the budget holds either way.
+"""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import Callable
+
+from ayurveda.herb_index import build_herb_context, estimate_tokens
+from ayurveda.knowledge_base import KnowledgeBase, get_knowledge_base
+from ayurveda.prompts import PERSONA, build_user_profile
+from ayurveda.scoring import calculate_wellness_score
+
+CONSULTATION_INSTRUCTIONS = """
+The user has already received the personalized Ayurvedic wellness plan shown below and is asking follow-up questions about it.
+- Answer the latest question directly and concisely (a few short paragraphs or bullets)
+- Ground the answer in the user's profile, their plan and the relevant herbs listed
+- For medications, pregnancy, chronic conditions or surgery, name specific herb-drug interactions and tell them to check with their doctor
+- Say so plainly when a question is outside Ayurvedic wellness advice
+- Do not repeat the whole plan
+""".strip()
+
+# Input tokens sent per consultation turn.
+CHAT_TOKEN_BUCKETS = (250.0, 500.0, 1000.0, 1500.0, 2000.0, 3000.0, 4000.0, 6000.0, 8000.0)
+
+SUMMARY_INSTRUCTIONS = """
+Update the running summary of an Ayurvedic follow-up consultation with the turns below.
+Keep what later answers depend on: facts the user shared (medications, conditions, preferences, changes they made), advice already given, and open questions.
+Do not answer anything. Reply with the updated summary only, in at most {words} words.
+""".strip()
+
+
+def consultation_prefix() -> str:
+    """Static prefix shared by every consultation turn, for provider-side context caching."""
+    return f"{PERSONA}\n\n{CONSULTATION_INSTRUCTIONS}\n\n"
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """``text`` cut at a word boundary to roughly ``budget`` tokens."""
+    if estimate_tokens(text) <= budget:
+        return text
+    cut = text[: max(0, budget * 4 - 2)]
+    return cut[: cut.rfind(" ")] + " …" if " " in cut else cut + "…"
+
+
+@dataclass
+class Turn:
+    role: str  # "user" or "assistant", as st.chat_message expects
+    text: str
+    tokens: int
+
+
+@dataclass
+class ChatPrompt:
+    # What to send: prefix + suffix, or only the suffix when the prefix is cached.
+    text: str
+    tokens: int
+    prefix_tokens: int
+    cached_prefix: bool
+    summary_tokens: int
+    history_turns: int
+
+
+class Consultation:
+    """One user's follow-up chat about one plan."""
+
+    def __init__(self, user_data: dict, plan: str, history_budget: int = 800, summary_budget: int = 300,
+                 plan_budget: int = 1200, herb_budget: int = 400, top_k_herbs: int = 6,
+                 knowledge_base: KnowledgeBase | None = None, metrics=None):
+        self.user_data = dict(user_data)
+        self.plan = plan
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.metrics = metrics
+        self.turns: list[Turn] = []
+        self.summary = ""
+        # turns[:summarized] are folded into the summary.
+        self.summarized = 0
+        self.compactions = 0
+        self.summary_failures = 0
+        self._profile = build_user_profile(user_data, calculate_wellness_score(user_data))
+        self._plan = truncate_tokens(plan, plan_budget)
+        kb = knowledge_base or get_knowledge_base()
+        ranked = kb.rank_for_concerns(user_data.get("main_health_concerns", []), limit=top_k_herbs)
+        self._herbs = build_herb_context(ranked, kb.herbs, top_k=top_k_herbs, token_budget=herb_budget).json
+        self._lock = threading.Lock()
+        self._compaction: Future | None = None
+
+    def matches(self, user_data: dict, plan: str) -> bool:
+        """Whether this chat is still about these answers and this plan."""
+        return self.user_data == user_data and self.plan == plan
+
+    def build_prompt(self, question: str, cached_prefix: bool = False) -> ChatPrompt:
+        with self._lock:
+            summary = self.summary
+            recent = self.turns[self.summarized:]
+        # Newest turns first until the history budget is spent; a turn that no
+        # longer fits is about to be folded into the summary anyway.
+        history, spent = [], 0
+        for turn in reversed(recent):
+            text = truncate_tokens(turn.text, self.history_budget // 2)
+            tokens = estimate_tokens(text)
+            if history and spent + tokens > self.history_budget:
+                break
+            history.append(f"{'USER' if turn.role == 'user' else 'DR. AYURVEDA AI'}: {text}")
+            spent += tokens
+        parts = [self._profile, f"RELEVANT HERBS FROM THE DATABASE:\n{self._herbs}", f"THE USER'S PLAN:\n{self._plan}"]
+        if summary:
+            parts.append(f"CONSULTATION SO FAR (summary):\n{summary}")
+        if history:
+            parts.append("RECENT TURNS:\n" + "\n\n".join(reversed(history)))
+        parts.append(f"LATEST QUESTION: {question}")
+        suffix = "\n\n".join(parts) + "\n"
+        prefix = consultation_prefix()
+        text = suffix if cached_prefix else prefix + suffix
+        prompt = ChatPrompt(
+            text=text,
+            tokens=estimate_tokens(text),
+            prefix_tokens=estimate_tokens(prefix),
+            cached_prefix=cached_prefix,
+            summary_tokens=estimate_tokens(summary),
+            history_turns=len(history),
+        )
+        if self.metrics is not None:
+            self.metrics.inc("ayurveda_chat_turns_total")
+            self.metrics.observe("ayurveda_chat_input_tokens", prompt.tokens, buckets=CHAT_TOKEN_BUCKETS)
+        return prompt
+
+    def add_exchange(self, question: str, answer: str) -> None:
+        with self._lock:
+            self.turns.append(Turn("user", question, estimate_tokens(question)))
+            self.turns.append(Turn("assistant", answer, estimate_tokens(answer)))
+
+    def needs_compaction(self) -> bool:
+        with self._lock:
+            return sum(turn.tokens for turn in self.turns[self.summarized:]) > self.history_budget
+
+    def compact(self, summarize: Callable[[str], str]) -> bool:
+        """Fold the oldest exchanges into the summary; False if there was nothing to fold."""
+        with self._lock:
+            recent = self.turns[self.summarized:]
+            remaining = sum(turn.tokens for turn in recent)
+            # Fold whole exchanges until half the budget is left, so one summary
+            # call covers several turns; the latest exchange always stays verbatim.
+            fold = 0
+            while fold + 2 < len(recent) and remaining > self.history_budget // 2:
+                remaining -= recent[fold].tokens + recent[fold + 1].tokens
+                fold += 2
+            if not fold:
+                return False
+            folded, previous, upto = recent[:fold], self.summary, self.summarized + fold
+        transcript = "\n".join(f"{turn.role.upper()}: {turn.text}" for turn in folded)
+        prompt = (
+            f"{SUMMARY_INSTRUCTIONS.format(words=self.summary_budget * 3 // 4)}\n\n"
+            f"CURRENT SUMMARY:\n{previous or '(none yet)'}\n\nTURNS TO ADD:\n{transcript}\n"
+        )
+        try:
+            summary = summarize(prompt).strip()
+            outcome = "model"
+        except Exception:
+            # Keep the budget without the model: the first words of each folded turn.
+            summary = "\n".join(filter(None, [previous] + [
+                f"{turn.role}: {truncate_tokens(turn.text, 40)}" for turn in folded
+            ]))
+            outcome = "fallback"
+        with self._lock:
+            self.summary = truncate_tokens(summary, self.summary_budget)
+            self.summarized = upto
+            self.compactions += 1
+            if outcome == "fallback":
+                self.summary_failures += 1
+        if self.metrics is not None:
+            self.metrics.inc("ayurveda_chat_compactions_total", outcome=outcome)
+        return True
+
+    def compact_in_background(self, executor: Executor, summarize: Callable[[str], str]) -> Future | None:
+        """Start :meth:`compact` if the history is over budget and no compaction is running."""
+        with self._lock:
+            if self._compaction is not None and not self._compaction.done():
+                return None
+        if not self.needs_compaction():
+            return None
+        future = executor.submit(self.compact, summarize)
+        with self._lock:
+            self._compaction = future
+        return future
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "turns": len(self.turns),
+                "summarized_turns": self.summarized,
+                "summary_tokens": estimate_tokens(self.summary),
+                "compactions": self.compactions,
+                "summary_failures": self.summary_failures,
+            }
@@ -0,0 +1,94 @@
+"""Provider-side context caching for the static prompt prefix.
+
+The persona, plan instructions and full herb catalog are identical for every
+user, so with ``AYURVEDA_CONTEXT_CACHE`` they are uploaded once per model as
+cached content and each request only sends the per-user suffix built by
+:func:`ayurveda.prompts.build_prompt`. Cached content expires after
+``AYURVEDA_CONTEXT_CACHE_TTL`` seconds and is re-created shortly before that.
+Models (or prefixes) that cannot be cached, e.g. because the prefix is below
+the provider's minimum size, fall back to sending prefix + suffix.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class _Entry:
+    model: object
+    # Text still to prepend to each prompt: "" when the prefix is cached.
+    prefix: str
+    expires_at: float
+
+
+class ContextCachedModel:
+    """``GenerativeModel`` stand-in that routes calls through a :class:`ContextCache`."""
+
+    def __init__(self, cache: "ContextCache", model_name: str):
+        self.cache = cache
+        self.model_name = model_name
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        model, prefix = self.cache.model_for(self.model_name)
+        return model.generate_content(prefix + prompt, stream=stream, **kwargs)
+
+
+class ContextCache:
+    def __init__(self, backend, prefix: str, ttl_seconds: float = 3600.0, refresh_margin: float = 60.0, metrics=None):
+        self.backend = backend
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = min(refresh_margin, ttl_seconds / 2)
+        self.metrics = metrics
+        self.uploads = 0
+        self.fallbacks = 0
+        self._entries: dict[str, _Entry] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def create_model(self, model_name: str) -> ContextCachedModel:
+        """Model factory for :class:`ayurveda.router.ModelRouter`."""
+        return ContextCachedModel(self, model_name)
+
+    def _name_lock(self, model_name: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(model_name, threading.Lock())
+
+    def model_for(self, model_name: str) -> tuple[object, str]:
+        """The model to call and the text to prepend, (re)creating cached content as needed."""
+        entry = self._entries.get(model_name)
+        if entry is not None and time.monotonic() < entry.expires_at:
+            return entry.model, entry.prefix
+        with self._name_lock(model_name):
+            entry = self._entries.get(model_name)
+            if entry is None or time.monotonic() >= entry.expires_at:
+                entry = self._entries[model_name] = self._create(model_name)
+        return entry.model, entry.prefix
+
+    def _create(self, model_name: str) -> _Entry:
+        expires_at = time.monotonic() + self.ttl_seconds - self.refresh_margin
+        try:
+            model = self.backend.create_cached_model(model_name, self.prefix, self.ttl_seconds)
+        except Exception as error:
+            # Unsupported model, prefix below the minimum size, or a backend
+            # without caching: send the full prompt until the next refresh.
+            self.fallbacks += 1
+            self._count("ayurveda_context_cache_fallbacks_total", model_name, error=type(error).__name__)
+            return _Entry(self.backend.create_model(model_name), self.prefix, expires_at)
+        self.uploads += 1
+        self._count("ayurveda_context_cache_uploads_total", model_name)
+        return _Entry(model, "", expires_at)
+
+    def _count(self, name: str, model_name: str, **labels) -> None:
+        if self.metrics is not None:
+            self.metrics.inc(name, model=model_name, **labels)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "uploads": self.uploads,
+            "fallbacks": self.fallbacks,
+            "cached_models": sorted(name for name, e in self._entries.items() if not e.prefix and e.expires_at > now),
+        }
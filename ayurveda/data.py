@@ -0,0 +1,86 @@
+"""Static Ayurvedic reference data and the assessment questionnaire."""
+from __future__ import annotations
+
+from ayurveda.knowledge_base import get_knowledge_base
+
+# COMPREHENSIVE AYURVEDIC DATABASE
+HEALTH_PROBLEMS = [
+    "Stress & Anxiety", "Insomnia & Sleep Issues", "Low Immunity", "Digestive Problems",
+    "Joint Pain & Inflammation", "Skin Issues (Acne/Eczema)", "Low Energy & Fatigue",
+    "Brain Fog & Poor Memory", "Weight Management", "High Blood Pressure",
+    "Diabetes & Blood Sugar", "Respiratory Issues (Asthma/Allergies)", "Hair Loss",
+    "Hormonal Imbalance", "PCOS & Women's Health", "Menstrual Cramps", 
+    "Low Libido", "Poor Circulation", "High Cholesterol", "Liver Health",
+    "Kidney Health", "Constipation", "Acidity & GERD", "Migraines & Headaches",
+    "Eye Strain & Vision", "Dental & Gum Health", "Seasonal Allergies",
+    "Weak Bones & Osteoporosis", "Thyroid Issues", "Chronic Fatigue Syndrome"
+]
+
+# Loaded from the herb catalog once per process (see ayurveda.knowledge_base)
+HERBS_DATABASE = get_knowledge_base().herbs
+
+# Professional Question Flow
+QUESTIONS = [
+    {
+        "step": 1,
+        "title": "👤 Personal Profile",
+        "icon": "👤",
+        "questions": {
+            "name": "What's your full name?",
+            "age": "What's your age?",
+            "weight": "What's your weight (kg)?",
+            "height": "What's your height (cm)?",
+            "gender": "What's your gender?"
+        }
+    },
+    {
+        "step": 2, 
+        "title": "🎯 Health Assessment",
+        "icon": "🎯",
+        "questions": {
+            "main_health_concerns": "Select your main health concerns:",
+            "symptom_severity": "Rate your symptom severity (1-10):",
+            "duration": "How long have you had these symptoms?",
+            "previous_treatments": "What treatments have you tried?"
+        }
+    },
+    {
+        "step": 3,
+        "title": "😴 Lifestyle Analysis",
+        "icon": "😴",
+        "questions": {
+            "sleep_quality": "Sleep quality (1-10):",
+            "energy_level": "Daily energy level (1-10):",
+            "stress_level": "Stress level (1-10):",
+            "digestion": "Digestion quality:",
+            "exercise": "Exercise frequency:"
+        }
+    },
+    {
+        "step": 4,
+        "title": "🍽️ Diet & Habits",
+        "icon": "🍽️",
+        "questions": {
+            "diet_type": "Primary diet type:",
+            "water_intake": "Daily water intake (glasses):",
+            "food_preferences": "Food preferences/allergies:",
+            "eating_pattern": "Typical eating pattern:"
+        }
+    },
+    {
+        "step": 5,
+        "title": "📝 Wellness Goals",
+        "icon": "📝",
+        "questions": {
+            "primary_goal": "Primary wellness goal:",
+            "time_commitment": "Daily time for wellness:",
+            "budget": "Wellness budget:",
+            "expectations": "Expected outcomes:"
+        }
+    }
+]
+
+
+def concern_index() -> dict:
+    """Concern -> herb relevance index, built once per process."""
+    return get_knowledge_base().concern_index
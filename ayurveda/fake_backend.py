@@ -0,0 +1,239 @@
+"""Local stand-in for the Gemini SDK, for benchmarks and load tests.
+
+``FakeGenerativeModel.generate_content`` mimics the real call: it sleeps for
+a latency drawn from a configurable distribution, fails at a configurable
+rate, streams the plan in chunks and raises ``NotFound`` for model names
+that are configured as missing (like retired Gemini models). With
+``quota_limit`` it also enforces a project-wide request quota per
+``quota_window`` seconds and raises ``ResourceExhausted`` (429) beyond it.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+
+class NotFound(Exception):
+    """Same class name as the SDK's 404 error, so the router treats it alike."""
+
+
+class InternalServerError(Exception):
+    pass
+
+
+class ResourceExhausted(Exception):
+    """Same class name as the SDK's 429 quota error."""
+
+
+class InvalidArgument(Exception):
+    """Same class name as the SDK's 400 error (e.g. cached content too small)."""
+
+
+class LatencyModel:
+    """Latency distribution parsed from a spec such as ``lognormal:2.0,0.5``.
+
+    Supported: ``fixed:s``, ``uniform:low,high``, ``normal:mean,stdev`` and
+    ``lognormal:median,sigma`` (all in seconds, never negative).
+    """
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.params[0] if self.params else 0.0
+        if self.kind == "uniform":
+            return rng.uniform(*self.params[:2])
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(*self.params[:2]))
+        median, sigma = self.params[:2]
+        return median * rng.lognormvariate(0.0, sigma)
+
+
+@dataclass
+class UsageMetadata:
+    prompt_token_count: int
+    candidates_token_count: int
+    total_token_count: int
+    cached_content_token_count: int = 0
+
+
+class FakeResponse:
+    def __init__(self, text: str, usage_metadata: UsageMetadata | None = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+_SECTIONS = [
+    ("🌿 **HERBAL PRESCRIPTION**", "Take {herb} as directed, adjusting the dose to body weight over four weeks."),
+    ("📅 **DAILY WELLNESS SCHEDULE** (Dinacharya)", "Wake at 6 AM, sip warm water, and take {herb} after breakfast."),
+    ("🍃 **4-WEEK TRANSFORMATION PLAN**", "Week by week, build the routine around {herb} and regular meals."),
+    ("⚠️ **SAFETY & PRECAUTIONS**", "Review {herb} with your doctor if you take prescription medication."),
+    ("💡 **LIFESTYLE RECOMMENDATIONS**", "Favour warm cooked food, gentle yoga and a consistent bedtime alongside {herb}."),
+]
+_HERBS = ["Ashwagandha", "Turmeric", "Brahmi", "Triphala", "Tulsi"]
+
+
+def fake_plan(prompt: str, length: int) -> str:
+    """Deterministic five-section markdown plan of roughly ``length`` chars."""
+    seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+    lines = []
+    per_section = max(1, length // (len(_SECTIONS) * 90))
+    for idx, (heading, sentence) in enumerate(_SECTIONS):
+        lines += ["", heading, ""]
+        for n in range(per_section):
+            lines.append("- " + sentence.format(herb=_HERBS[(seed + idx + n) % len(_HERBS)]))
+    return "\n".join(lines).strip()
+
+
+def fake_section_json(prompt: str, length: int) -> str:
+    """Deterministic ``{"points": [...]}`` answer for JSON-mode (sectioned) requests."""
+    seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+    heading, sentence = next(
+        ((h, s) for h, s in _SECTIONS if h.split("**")[1] in prompt), _SECTIONS[seed % len(_SECTIONS)]
+    )
+    count = max(1, length // (len(_SECTIONS) * 90))
+    points = [sentence.format(herb=_HERBS[(seed + n) % len(_HERBS)]) for n in range(count)]
+    return json.dumps({"points": points}, ensure_ascii=False)
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name: str, backend: "FakeBackend", cached_prefix: str = ""):
+        self.model_name = model_name
+        self.backend = backend
+        # Stand-in for a model bound to provider-side cached content.
+        self.cached_prefix = cached_prefix
+
+    def generate_content(self, prompt, stream: bool = False, **kwargs):
+        backend = self.backend
+        rng = backend.rng()
+        backend.count_call(self.model_name)
+        if self.model_name in backend.missing_models:
+            time.sleep(backend.not_found_latency)
+            raise NotFound(f"404 models/{self.model_name} is not found")
+        if not backend.within_quota():
+            raise ResourceExhausted("429 Resource has been exhausted (e.g. check quota).")
+        latency = backend.latency.sample(rng)
+        if rng.random() < backend.error_rate:
+            time.sleep(latency * rng.random())
+            raise InternalServerError("500 fake backend error")
+
+        prompt_text = self.cached_prefix + (prompt if isinstance(prompt, str) else str(prompt))
+        # Prefill time grows with the prompt tokens that are not in the context cache.
+        latency += backend.prefill_s_per_1k_tokens * (len(prompt_text) - len(self.cached_prefix)) / 4000
+        config = kwargs.get("generation_config") or {}
+        if config.get("response_mime_type") == "application/json":
+            text = fake_section_json(prompt_text, backend.response_chars)
+        else:
+            text = fake_plan(prompt_text, backend.response_chars)
+        usage = UsageMetadata(
+            prompt_token_count=len(prompt_text) // 4,
+            candidates_token_count=len(text) // 4,
+            total_token_count=(len(prompt_text) + len(text)) // 4,
+            cached_content_token_count=len(self.cached_prefix) // 4,
+        )
+        if not stream:
+            time.sleep(latency)
+            return FakeResponse(text, usage)
+        return self._stream(text, usage, latency)
+
+    def _stream(self, text: str, usage: UsageMetadata, latency: float):
+        size = self.backend.chunk_chars
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        first_token = latency * self.backend.first_token_fraction
+        gap = (latency - first_token) / max(1, len(chunks) - 1)
+        time.sleep(first_token)
+        for idx, chunk in enumerate(chunks):
+            if idx:
+                time.sleep(gap)
+            yield FakeResponse(chunk, usage if idx == len(chunks) - 1 else None)
+
+
+class FakeBackend:
+    name = "fake"
+    requires_api_key = False
+
+    def __init__(
+        self,
+        latency: str = "lognormal:2.0,0.4",
+        error_rate: float = 0.0,
+        missing_models: tuple[str, ...] = (),
+        chunk_chars: int = 120,
+        response_chars: int = 4000,
+        first_token_fraction: float = 0.15,
+        not_found_latency: float = 0.2,
+        min_cache_tokens: int = 0,
+        quota_limit: int = 0,
+        quota_window: float = 60.0,
+        prefill_s_per_1k_tokens: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.latency = LatencyModel(latency)
+        self.error_rate = error_rate
+        self.missing_models = set(missing_models)
+        self.chunk_chars = chunk_chars
+        self.response_chars = response_chars
+        self.first_token_fraction = first_token_fraction
+        self.not_found_latency = not_found_latency
+        self.min_cache_tokens = min_cache_tokens
+        self.quota_limit = quota_limit
+        self.quota_window = quota_window
+        self.prefill_s_per_1k_tokens = prefill_s_per_1k_tokens
+        self._quota_calls: deque[float] = deque()
+        self.quota_errors = 0
+        self._seed = seed
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.calls: dict[str, int] = {}
+        self.cache_uploads = 0
+
+    def rng(self) -> random.Random:
+        # One generator per thread keeps seeded runs reproducible without locking.
+        if not hasattr(self._local, "rng"):
+            seed = None if self._seed is None else hash((self._seed, threading.get_ident()))
+            self._local.rng = random.Random(seed)
+        return self._local.rng
+
+    def count_call(self, model_name: str) -> None:
+        with self._lock:
+            self.calls[model_name] = self.calls.get(model_name, 0) + 1
+
+    def within_quota(self) -> bool:
+        """Count a request against the shared quota; False once the window is full."""
+        if not self.quota_limit:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            while self._quota_calls and self._quota_calls[0] <= now - self.quota_window:
+                self._quota_calls.popleft()
+            if len(self._quota_calls) >= self.quota_limit:
+                self.quota_errors += 1
+                return False
+            self._quota_calls.append(now)
+            return True
+
+    def configure(self, api_key: str | None) -> None:
+        pass
+
+    def create_model(self, model_name: str) -> FakeGenerativeModel:
+        return FakeGenerativeModel(model_name, self)
+
+    def create_cached_model(self, model_name: str, prefix: str, ttl_seconds: float) -> FakeGenerativeModel:
+        """Local stub for context caching; enforces a minimum size like the real API."""
+        if model_name in self.missing_models:
+            raise NotFound(f"404 models/{model_name} is not found")
+        if len(prefix) // 4 < self.min_cache_tokens:
+            raise InvalidArgument(f"Cached content is too small ({len(prefix) // 4} < {self.min_cache_tokens} tokens)")
+        with self._lock:
+            self.cache_uploads += 1
+        return FakeGenerativeModel(model_name, self, cached_prefix=prefix)
@@ -0,0 +1,58 @@
+"""Gemini SDK access, imported lazily.
+
+``google.generativeai`` is heavy to import, so it is only loaded the first
+time a model is actually needed rather than on every questionnaire step.
+"""
+from __future__ import annotations
+
+import threading
+
+# Gemini models in order of preference
+MODEL_NAMES = [
+    'gemini-1.5-flash',
+    'gemini-1.5-flash-001',
+    'gemini-1.5-pro',
+    'gemini-1.5-pro-001',
+    'gemini-1.0-pro',
+    'gemini-1.0-pro-001',
+    'gemini-pro',
+    'models/gemini-pro'
+]
+
+_lock = threading.Lock()
+_configured_key: str | None = None
+
+
+def genai():
+    """Return the ``google.generativeai`` module, importing it on first use."""
+    import google.generativeai
+
+    return google.generativeai
+
+
+def configure(api_key: str) -> None:
+    """Configure the SDK once per process (and again only if the key changes)."""
+    global _configured_key
+    with _lock:
+        if api_key != _configured_key:
+            genai().configure(api_key=api_key)
+            _configured_key = api_key
+
+
+def create_model(model_name: str):
+    return genai().GenerativeModel(model_name)
+
+
+def create_cached_model(model_name: str, prefix: str, ttl_seconds: float):
+    """Upload ``prefix`` as cached content and return a model bound to it."""
+    import datetime
+
+    from google.generativeai import caching
+
+    name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+    cached = caching.CachedContent.create(
+        model=name,
+        system_instruction=prefix,
+        ttl=datetime.timedelta(seconds=ttl_seconds),
+    )
+    return genai().GenerativeModel.from_cached_content(cached_content=cached)
@@ -0,0 +1,85 @@
+"""Plan generation helpers with time-to-first-token and total-time metrics."""
+from __future__ import annotations
+
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass
+class GenerationTimings:
+    first_token_s: float | None
+    total_s: float
+    chunks: int
+    streamed: bool
+    usage: dict | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            "first_token_s": self.first_token_s,
+            "total_s": self.total_s,
+            "chunks": self.chunks,
+            "streamed": self.streamed,
+            "usage": self.usage,
+        }
+
+
+def usage_from_response(response) -> dict | None:
+    """Token counts from the SDK's ``usage_metadata``, if the response has any."""
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return None
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+        "response_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+        "cached_tokens": getattr(usage, "cached_content_token_count", 0) or 0,
+    }
+
+
+def chunk_text(chunk) -> str:
+    # ``.text`` raises ValueError for chunks without text parts (e.g. a final
+    # chunk that only carries finish/safety metadata).
+    try:
+        return chunk.text or ""
+    except ValueError:
+        return ""
+
+
+def request_kwargs(generation_config: dict | None) -> dict:
+    # Only pass generation_config when set, so plain calls stay unchanged.
+    return {"generation_config": generation_config} if generation_config else {}
+
+
+def generate_plan(model, prompt: str, generation_config: dict | None = None) -> tuple[str, GenerationTimings]:
+    """Blocking generation; the first token only arrives with the full plan."""
+    start = time.perf_counter()
+    response = model.generate_content(prompt, **request_kwargs(generation_config))
+    text = response.text
+    elapsed = time.perf_counter() - start
+    timings = GenerationTimings(first_token_s=elapsed, total_s=elapsed, chunks=1, streamed=False, usage=usage_from_response(response))
+    return text, timings
+
+
+class GenerationStats:
+    """Rolling window of recent timings, split by streamed vs blocking calls."""
+
+    def __init__(self, window: int = 200):
+        self._samples = {True: deque(maxlen=window), False: deque(maxlen=window)}
+        self._lock = threading.Lock()
+
+    def record(self, timings: GenerationTimings) -> None:
+        with self._lock:
+            self._samples[timings.streamed].append((timings.first_token_s, timings.total_s))
+
+    def summary(self, streamed: bool) -> dict:
+        with self._lock:
+            samples = list(self._samples[streamed])
+        first_tokens = [s[0] for s in samples if s[0] is not None]
+        totals = [s[1] for s in samples]
+        return {
+            "count": len(samples),
+            "first_token_p50_s": statistics.median(first_tokens) if first_tokens else None,
+            "total_p50_s": statistics.median(totals) if totals else None,
+        }
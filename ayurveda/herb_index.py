@@ -0,0 +1,123 @@
+"""Concern keywords, herb scoring and the compact herb JSON sent to Gemini.
+
+:class:`~ayurveda.knowledge_base.KnowledgeBase` builds and ranks the concern
+index with these keywords; :func:`build_herb_context` then embeds only the
+top-k relevant herbs in compact JSON within a token budget.
+"""
+from __future__ import annotations
+
+import json
+import math
+import re
+from dataclasses import dataclass
+
+# Benefit keywords per concern, most specific first. Matching is a
+# case-insensitive substring test, so stems like "immun" cover "Immunity",
+# "Immune support" and "Immunity booster".
+CONCERN_KEYWORDS = {
+    "Stress & Anxiety": ["stress", "anxiety", "calm"],
+    "Insomnia & Sleep Issues": ["sleep", "insomnia", "stress"],
+    "Low Immunity": ["immun", "fever"],
+    "Digestive Problems": ["digest", "nausea", "constipation"],
+    "Joint Pain & Inflammation": ["joint", "inflamm"],
+    "Skin Issues (Acne/Eczema)": ["skin", "blood purification", "anti-inflammatory"],
+    "Low Energy & Fatigue": ["energy", "fatigue"],
+    "Brain Fog & Poor Memory": ["memory", "focus", "brain"],
+    "Weight Management": ["metabol", "detox", "digest"],
+    "High Blood Pressure": ["blood pressure", "circulation", "stress"],
+    "Diabetes & Blood Sugar": ["blood sugar", "diabet", "glucose"],
+    "Respiratory Issues (Asthma/Allergies)": ["respiratory", "cough", "cold"],
+    "Hair Loss": ["hair"],
+    "Hormonal Imbalance": ["hormon"],
+    "PCOS & Women's Health": ["women", "hormon"],
+    "Menstrual Cramps": ["cramp", "women", "inflamm"],
+    "Low Libido": ["libido", "hormon", "energy"],
+    "Poor Circulation": ["circulation", "blood"],
+    "High Cholesterol": ["cholesterol", "antioxidant"],
+    "Liver Health": ["liver", "detox"],
+    "Kidney Health": ["kidney", "detox"],
+    "Constipation": ["constipation", "digest"],
+    "Acidity & GERD": ["acid", "digest", "nausea"],
+    "Migraines & Headaches": ["headache", "migraine", "inflamm", "stress"],
+    "Eye Strain & Vision": ["eye", "vision", "antioxidant", "vitamin"],
+    "Dental & Gum Health": ["dental", "gum"],
+    "Seasonal Allergies": ["allerg", "respiratory", "immun"],
+    "Weak Bones & Osteoporosis": ["bone", "joint"],
+    "Thyroid Issues": ["thyroid", "hormon"],
+    "Chronic Fatigue Syndrome": ["fatigue", "energy", "immun"],
+    # Default concern used by the prompt when none were selected.
+    "General wellness": ["immun", "energy", "stress", "digest"],
+}
+
+DEFAULT_HERB_FIELDS = ("benefits", "dosage", "best_time", "safety")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough Gemini token estimate (~4 characters per token)."""
+    return math.ceil(len(text) / 4)
+
+
+def concern_keywords(concern: str) -> list[str]:
+    if concern in CONCERN_KEYWORDS:
+        return CONCERN_KEYWORDS[concern]
+    # Unknown concern: fall back to its significant words.
+    return [word for word in re.findall(r"[a-z]+", concern.lower()) if len(word) >= 4]
+
+
+def benefit_score(keywords: list[str], benefit: str) -> float:
+    """Relevance of one benefit phrase to a concern's keywords."""
+    # The first keyword is the concern itself; later ones are related effects.
+    text = benefit.lower()
+    for rank, keyword in enumerate(keywords):
+        if keyword in text:
+            return 2.0 if rank == 0 else 1.0
+    return 0.0
+
+
+def _herb_score(keywords: list[str], benefits: list[str]) -> float:
+    return sum(benefit_score(keywords, benefit) for benefit in benefits)
+
+
+def score_herbs(index: dict, concerns: list[str], herbs: dict) -> dict[str, float]:
+    """Total relevance of each matching herb to the given concerns."""
+    totals: dict[str, float] = {}
+    for concern in concerns or ["General wellness"]:
+        candidates = index.get(concern)
+        if candidates is None:
+            keywords = concern_keywords(concern)
+            candidates = [(name, _herb_score(keywords, info.get("benefits", []))) for name, info in herbs.items()]
+        for name, score in candidates:
+            if score > 0:
+                totals[name] = totals.get(name, 0.0) + score
+    return totals
+
+
+@dataclass
+class HerbContext:
+    json: str
+    herbs: list[str]
+    dropped_for_budget: int
+    tokens: int
+
+
+def build_herb_context(
+    ranked: list[str],
+    herbs: dict,
+    top_k: int = 6,
+    token_budget: int | None = None,
+    fields: tuple[str, ...] = DEFAULT_HERB_FIELDS,
+) -> HerbContext:
+    """Compact JSON for the top-k herbs that fits within ``token_budget``."""
+    selected: dict = {}
+    dropped = 0
+    rendered = "{}"
+    for name in ranked[:top_k]:
+        candidate = dict(selected)
+        candidate[name] = {field: herbs[name][field] for field in fields if field in herbs[name]}
+        candidate_json = json.dumps(candidate, separators=(",", ":"), ensure_ascii=False)
+        # The best match is always kept so the prompt never loses every herb.
+        if token_budget is not None and selected and estimate_tokens(candidate_json) > token_budget:
+            dropped += 1
+            continue
+        selected, rendered = candidate, candidate_json
+    return HerbContext(json=rendered, herbs=list(selected), dropped_for_budget=dropped, tokens=estimate_tokens(rendered))
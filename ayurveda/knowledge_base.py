@@ -0,0 +1,266 @@
+"""Herb knowledge base loaded from a catalog file once per process.
+
+The catalog (``ayurveda/herbs.json``, or the file named by
+``AYURVEDA_HERB_CATALOG``) maps each herb or formulation to its ``benefits``,
+``dosage``, ``best_time`` and ``safety``. It is validated on load and stored
+column-wise with interned strings, so thousands of entries cost little memory
+and every Streamlit session shares the same instance. Inverted indexes answer
+"which herbs help with X", "which herbs are contraindicated by Y" and "which
+herbs suit this concern" without scanning the catalog.
+"""
+from __future__ import annotations
+
+import bisect
+import functools
+import heapq
+import json
+import os
+import re
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Iterator
+
+from ayurveda.herb_index import CONCERN_KEYWORDS, benefit_score, concern_keywords
+
+DEFAULT_CATALOG = os.path.join(os.path.dirname(__file__), "herbs.json")
+
+REQUIRED_FIELDS = ("benefits", "dosage", "best_time", "safety")
+
+_WORD = re.compile(r"[a-z][a-z'-]+")
+# "Avoid in pregnancy, thyroid issues" / "Avoid with gallstones, blood thinners"
+_AVOID = re.compile(r"\bavoid\s+(?:in|with|during|if|on)?\s*(.+)", re.IGNORECASE)
+_SPLIT = re.compile(r",|;|\band\b|\bor\b")
+# Words too generic to be useful contraindication keys on their own.
+_GENERIC_TERMS = {"issues", "conditions", "condition", "diseases", "disease", "problems"}
+
+
+class CatalogError(ValueError):
+    """The herb catalog file is missing, malformed or has an invalid entry."""
+
+
+def _words(text: str) -> set[str]:
+    return {word for word in _WORD.findall(text.lower()) if len(word) >= 3}
+
+
+def contraindication_terms(safety: str) -> set[str]:
+    """Conditions and medications named in a ``safety`` text, plus their words."""
+    match = _AVOID.search(safety)
+    if not match:
+        return set()
+    terms = set()
+    for phrase in _SPLIT.split(match.group(1).lower()):
+        phrase = " ".join(phrase.split()).strip(" .")
+        if phrase:
+            terms.add(phrase)
+            terms |= _words(phrase) - _GENERIC_TERMS
+    return terms
+
+
+def _postings(index: dict[str, list[int]]) -> dict[str, array]:
+    return {sys.intern(key): array("I", sorted(set(ids))) for key, ids in index.items()}
+
+
+def validate_catalog(raw) -> dict[str, dict]:
+    if not isinstance(raw, dict) or not raw:
+        raise CatalogError("herb catalog must be a non-empty JSON object of name -> entry")
+    for name, entry in raw.items():
+        if not isinstance(entry, dict):
+            raise CatalogError(f"{name}: entry must be an object")
+        missing = [field for field in REQUIRED_FIELDS if field not in entry]
+        if missing:
+            raise CatalogError(f"{name}: missing {', '.join(missing)}")
+        benefits = entry["benefits"]
+        if not isinstance(benefits, list) or not benefits or not all(isinstance(b, str) and b for b in benefits):
+            raise CatalogError(f"{name}: benefits must be a non-empty list of strings")
+        for field in REQUIRED_FIELDS[1:]:
+            if not isinstance(entry[field], str):
+                raise CatalogError(f"{name}: {field} must be a string")
+    return raw
+
+
+class _HerbMapping(Mapping):
+    """Read-only ``name -> entry`` view shaped like the old ``HERBS_DATABASE`` dict."""
+
+    def __init__(self, kb: "KnowledgeBase"):
+        self._kb = kb
+
+    def __getitem__(self, name: str) -> dict:
+        return self._kb.entry(self._kb.position(name))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._kb.names)
+
+    def __len__(self) -> int:
+        return len(self._kb.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self._kb._ids
+
+
+class KnowledgeBase:
+    def __init__(self, catalog: dict[str, dict], source: str | None = None):
+        validate_catalog(catalog)
+        self.source = source
+        intern = sys.intern
+        self.names: tuple[str, ...] = tuple(intern(name) for name in catalog)
+        self._ids = {name: idx for idx, name in enumerate(self.names)}
+        self._benefits = tuple(tuple(intern(b) for b in entry["benefits"]) for entry in catalog.values())
+        self._dosage = tuple(intern(entry["dosage"]) for entry in catalog.values())
+        self._best_time = tuple(intern(entry["best_time"]) for entry in catalog.values())
+        self._safety = tuple(intern(entry["safety"]) for entry in catalog.values())
+        # Anything beyond the required fields (e.g. "type": "formulation") is kept as-is.
+        self._extras = {
+            idx: {k: v for k, v in entry.items() if k not in REQUIRED_FIELDS}
+            for idx, entry in enumerate(catalog.values())
+            if len(entry) > len(REQUIRED_FIELDS)
+        }
+        self.herbs: Mapping[str, dict] = _HerbMapping(self)
+
+        # Benefit phrases repeat across the catalog; each unique phrase is scored once.
+        phrase_herbs: dict[str, list[int]] = {}
+        benefit_index: dict[str, list[int]] = {}
+        contra_index: dict[str, list[int]] = {}
+        for idx, benefits in enumerate(self._benefits):
+            for benefit in benefits:
+                phrase = benefit.lower()
+                phrase_herbs.setdefault(phrase, []).append(idx)
+                for key in {phrase} | _words(phrase):
+                    benefit_index.setdefault(key, []).append(idx)
+            for term in contraindication_terms(self._safety[idx]):
+                contra_index.setdefault(term, []).append(idx)
+        self.benefit_index = _postings(benefit_index)
+        self.contraindication_index = _postings(contra_index)
+        self._benefit_vocab = sorted(self.benefit_index)
+        self._contra_vocab = sorted(self.contraindication_index)
+        self._concerns = {concern: self._score_concern(concern, phrase_herbs) for concern in CONCERN_KEYWORDS}
+        self._phrase_herbs = phrase_herbs
+
+    @classmethod
+    def load(cls, path: str) -> "KnowledgeBase":
+        try:
+            with open(path, encoding="utf-8") as fh:
+                raw = json.load(fh)
+        except OSError as error:
+            raise CatalogError(f"cannot read herb catalog {path}: {error}") from error
+        except ValueError as error:
+            raise CatalogError(f"herb catalog {path} is not valid JSON: {error}") from error
+        return cls(raw, source=path)
+
+    # -- entries ----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def position(self, name: str) -> int:
+        return self._ids[name]
+
+    def entry(self, idx: int) -> dict:
+        entry = {
+            "benefits": list(self._benefits[idx]),
+            "dosage": self._dosage[idx],
+            "best_time": self._best_time[idx],
+            "safety": self._safety[idx],
+        }
+        if idx in self._extras:
+            entry.update(self._extras[idx])
+        return entry
+
+    # -- concern index ----------------------------------------------------
+
+    def _score_concern(self, concern: str, phrase_herbs: dict[str, list[int]]) -> tuple[tuple[str, float], ...]:
+        keywords = concern_keywords(concern)
+        totals: dict[int, float] = {}
+        for phrase, ids in phrase_herbs.items():
+            score = benefit_score(keywords, phrase)
+            if score:
+                for idx in ids:
+                    totals[idx] = totals.get(idx, 0.0) + score
+        ranked = sorted(totals.items(), key=lambda pair: (-pair[1], pair[0]))
+        return tuple((self.names[idx], score) for idx, score in ranked)
+
+    @functools.cached_property
+    def concern_index(self) -> dict[str, list[tuple[str, float]]]:
+        """``concern -> [(herb, score), ...]`` in the shape ``herb_index.score_herbs`` expects."""
+        return {concern: list(pairs) for concern, pairs in self._concerns.items()}
+
+    def _concern_pairs(self, concern: str) -> tuple[tuple[str, float], ...]:
+        pairs = self._concerns.get(concern)
+        if pairs is None:
+            # Unknown concern: score it once on demand and remember it.
+            pairs = self._concerns[concern] = self._score_concern(concern, self._phrase_herbs)
+        return pairs
+
+    def herbs_for_concern(self, concern: str) -> list[tuple[str, float]]:
+        """Herbs matching one concern, best first."""
+        return list(self._concern_pairs(concern))
+
+    def rank_for_concerns(
+        self, concerns: list[str], exclude: set[str] | frozenset = frozenset(), limit: int | None = None
+    ) -> list[str]:
+        """Herbs by total relevance to ``concerns`` (catalog order breaks ties), minus ``exclude``."""
+        totals: dict[str, float] = {}
+        for concern in concerns or ["General wellness"]:
+            for name, score in self._concern_pairs(concern):
+                totals[name] = totals.get(name, 0.0) + score
+        if not totals:
+            for name, score in self._concern_pairs("General wellness"):
+                totals[name] = totals.get(name, 0.0) + score
+        if not totals:
+            ranked = [name for name in self.names if name not in exclude]
+            return ranked if limit is None else ranked[:limit]
+        for name in exclude:
+            totals.pop(name, None)
+        key = lambda name: (-totals[name], self._ids[name])  # noqa: E731
+        if limit is not None and limit < len(totals):
+            return heapq.nsmallest(limit, totals, key=key)
+        return sorted(totals, key=key)
+
+    # -- benefit / contraindication lookups --------------------------------
+
+    @staticmethod
+    def _prefix_lookup(vocab: list[str], index: dict[str, array], prefix: str) -> set[int]:
+        prefix = " ".join(prefix.lower().split())
+        ids: set[int] = set()
+        if not prefix:
+            return ids
+        start = bisect.bisect_left(vocab, prefix)
+        for key in vocab[start:]:
+            if not key.startswith(prefix):
+                break
+            ids.update(index[key])
+        return ids
+
+    def _ordered(self, ids: set[int]) -> list[str]:
+        return [self.names[idx] for idx in sorted(ids)]
+
+    def herbs_for_benefit(self, term: str) -> list[str]:
+        """Herbs with a benefit phrase or word starting with ``term`` ("immun", "joint health")."""
+        return self._ordered(self._prefix_lookup(self._benefit_vocab, self.benefit_index, term))
+
+    def herbs_contraindicated_by(self, term: str) -> list[str]:
+        """Herbs whose safety text says to avoid them with ``term`` ("pregnan", "blood thinner")."""
+        return self._ordered(self._prefix_lookup(self._contra_vocab, self.contraindication_index, term))
+
+    def search(self, benefit: str = "", avoid: tuple[str, ...] = ()) -> list[str]:
+        """Herbs matching every word of ``benefit`` and none of the ``avoid`` terms."""
+        ids = set(range(len(self.names)))
+        for word in benefit.lower().split():
+            ids &= self._prefix_lookup(self._benefit_vocab, self.benefit_index, word)
+        for term in avoid:
+            ids -= self._prefix_lookup(self._contra_vocab, self.contraindication_index, term)
+        return self._ordered(ids)
+
+
+def catalog_path() -> str:
+    return os.environ.get("AYURVEDA_HERB_CATALOG") or DEFAULT_CATALOG
+
+
+@functools.lru_cache(maxsize=None)
+def _load(path: str) -> KnowledgeBase:
+    return KnowledgeBase.load(path)
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """The process-wide knowledge base, loaded and indexed on first use."""
+    return _load(catalog_path())
@@ -0,0 +1,188 @@
+"""Deterministic, rule-based wellness planner.
+
+Works directly on the herb database and the concern index: herbs are scored
+against the user's concerns, herbs whose ``safety`` text conflicts with the
+profile are filtered out, and the remaining picks are laid out on a daily
+schedule. It runs in well under 10 ms, so the results page uses it for the
+instant first paint and as the offline fallback when Gemini is unavailable.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+
+from ayurveda.herb_index import concern_keywords, score_herbs
+
+# Safety keyword (as it appears in a herb's ``safety`` text) -> what in the
+# profile triggers it: selected concerns and free-text terms.
+CONTRAINDICATIONS = {
+    "pregnan": {"concerns": [], "terms": ["pregnan", "expecting", "trimester"]},
+    "thyroid": {"concerns": ["Thyroid Issues"], "terms": ["thyroid", "thyroxine", "levothyroxine"]},
+    "sedative": {"concerns": [], "terms": ["sedative", "sleeping pill", "benzodiazepine", "zolpidem", "diazepam", "alprazolam"]},
+    "gallbladder": {"concerns": [], "terms": ["gallbladder", "gallstone"]},
+    "gallstone": {"concerns": [], "terms": ["gallbladder", "gallstone"]},
+    "blood thinner": {"concerns": [], "terms": ["blood thinner", "warfarin", "heparin", "clopidogrel", "apixaban", "anticoagulant", "aspirin"]},
+    "diarrhea": {"concerns": [], "terms": ["diarrh", "loose stool", "ibs-d"]},
+    "autoimmune": {"concerns": [], "terms": ["autoimmune", "lupus", "rheumatoid", "multiple sclerosis", "hashimoto", "psoriasis"]},
+    "estrogen-sensitive": {"concerns": [], "terms": ["estrogen", "breast cancer", "endometriosis", "fibroid"]},
+    "diabetes medication": {"concerns": ["Diabetes & Blood Sugar"], "terms": ["diabet", "metformin", "insulin"]},
+}
+
+# Free-text answers scanned for medications and conditions.
+PROFILE_TEXT_FIELDS = (
+    "previous_treatments", "food_preferences", "duration", "eating_pattern", "primary_goal", "expectations",
+)
+
+SCHEDULE_SLOTS = {
+    "morning": "🌅 Morning (6-8 AM)",
+    "afternoon": "☀️ Afternoon (12-2 PM)",
+    "evening": "🌇 Evening (6-8 PM)",
+    "bedtime": "🌙 Bedtime (9-10 PM)",
+}
+
+
+@dataclass
+class HerbRecommendation:
+    name: str
+    dosage: str
+    best_time: str
+    safety: str
+    concerns: list[str]
+    slots: list[str]
+
+
+@dataclass
+class LocalPlan:
+    concerns: list[str]
+    herbs: list[HerbRecommendation]
+    excluded: dict[str, str]
+    schedule: dict[str, list[str]]
+    lifestyle: list[str]
+    build_ms: float = 0.0
+    notes: list[str] = field(default_factory=list)
+
+    def to_markdown(self) -> str:
+        lines = ["🌿 **HERBAL PRESCRIPTION**", ""]
+        for herb in self.herbs:
+            focus = f" — for {', '.join(herb.concerns)}" if herb.concerns else ""
+            lines.append(f"- **{herb.name}**: {herb.dosage} ({herb.best_time}){focus}")
+        if not self.herbs:
+            lines.append("- No herb in our database is a safe match for your profile; please consult a practitioner.")
+        lines += ["", "📅 **DAILY WELLNESS SCHEDULE** (Dinacharya)", ""]
+        for slot, label in SCHEDULE_SLOTS.items():
+            if self.schedule.get(slot):
+                lines.append(f"- **{label}:** {', '.join(self.schedule[slot])}")
+        lines += ["", "⚠️ **SAFETY & PRECAUTIONS**", ""]
+        for herb in self.herbs:
+            lines.append(f"- {herb.name}: {herb.safety}")
+        for name, reason in self.excluded.items():
+            lines.append(f"- Skipped **{name}**: {reason}")
+        lines.append("- Consult a qualified practitioner before starting any herbs, especially alongside medication.")
+        if self.lifestyle:
+            lines += ["", "💡 **LIFESTYLE RECOMMENDATIONS**", ""]
+            lines += [f"- {tip}" for tip in self.lifestyle]
+        if self.notes:
+            lines += [""] + [f"*{note}*" for note in self.notes]
+        return "\n".join(lines)
+
+
+def _profile_text(user_data: dict) -> str:
+    return " ".join(str(user_data.get(key, "")) for key in PROFILE_TEXT_FIELDS).lower()
+
+
+def safety_conflict(safety: str, concerns: list[str], profile_text: str) -> str | None:
+    """Return why a herb is unsafe for this profile, or None if it is fine."""
+    safety_lower = safety.lower()
+    for keyword, triggers in CONTRAINDICATIONS.items():
+        if keyword not in safety_lower:
+            continue
+        for concern in triggers["concerns"]:
+            if concern in concerns:
+                return f"{safety} (you selected {concern})"
+        for term in triggers["terms"]:
+            if term in profile_text:
+                return f"{safety} (your answers mention '{term}')"
+    return None
+
+
+def _slots(best_time: str, dosage: str) -> list[str]:
+    text = best_time.lower()
+    slots = []
+    if "morning" in text:
+        slots.append("morning")
+    if "afternoon" in text or "meal" in text:
+        slots.append("afternoon")
+    if "evening" in text:
+        slots.append("evening")
+    if "bedtime" in text or "sleep" in text or "bedtime" in dosage.lower():
+        slots.append("bedtime")
+    twice = "twice" in dosage.lower()
+    if not slots:
+        slots = ["morning", "evening"] if twice else ["morning"]
+    elif twice and len(slots) == 1:
+        slots.append("evening" if slots[0] in ("morning", "afternoon") else "morning")
+    return slots
+
+
+def _lifestyle_tips(user_data: dict) -> list[str]:
+    tips = []
+    if int(user_data.get("sleep_quality", 5)) <= 5:
+        tips.append("Keep a fixed bedtime before 10 PM and avoid screens for the last hour of the day.")
+    if int(user_data.get("stress_level", 5)) >= 6:
+        tips.append("Practise 10 minutes of Nadi Shodhana (alternate-nostril breathing) each morning and evening.")
+    if int(user_data.get("energy_level", 5)) <= 4:
+        tips.append("Take a 15-minute walk in morning sunlight and eat your largest meal at midday.")
+    if user_data.get("digestion") in ("Fair", "Poor", "Severe issues"):
+        tips.append("Favour warm, freshly cooked meals and sip warm water or ginger tea with food.")
+    if user_data.get("exercise") in ("Rarely", "Never"):
+        tips.append("Start with 20 minutes of gentle yoga or walking three times a week.")
+    if int(user_data.get("water_intake", 8)) < 6:
+        tips.append("Increase water intake gradually to 8 glasses a day, preferably warm.")
+    diet = user_data.get("diet_type")
+    if diet:
+        tips.append(f"Build your {diet.lower()} meals around whole grains, seasonal vegetables and healthy fats.")
+    return tips
+
+
+def build_local_plan(user_data: dict, herbs: dict, concern_index: dict, max_herbs: int = 4) -> LocalPlan:
+    """Score, filter and schedule herbs for a profile without calling an LLM."""
+    start = time.perf_counter()
+    concerns = list(user_data.get("main_health_concerns") or [])
+    profile_text = _profile_text(user_data)
+    scores = score_herbs(concern_index, concerns, herbs) or score_herbs(concern_index, ["General wellness"], herbs)
+    order = {name: position for position, name in enumerate(herbs)}
+    ranked = sorted(scores, key=lambda name: (-scores[name], order[name]))
+
+    picks: list[HerbRecommendation] = []
+    excluded: dict[str, str] = {}
+    for name in ranked:
+        if len(picks) >= max_herbs:
+            break
+        info = herbs[name]
+        conflict = safety_conflict(info.get("safety", ""), concerns, profile_text)
+        if conflict:
+            excluded[name] = conflict
+            continue
+        matched = [c for c in concerns if any(k in b.lower() for k in concern_keywords(c) for b in info["benefits"])]
+        picks.append(HerbRecommendation(
+            name=name,
+            dosage=info["dosage"],
+            best_time=info["best_time"],
+            safety=info["safety"],
+            concerns=matched,
+            slots=_slots(info["best_time"], info["dosage"]),
+        ))
+
+    schedule: dict[str, list[str]] = {slot: [] for slot in SCHEDULE_SLOTS}
+    for pick in picks:
+        for slot in pick.slots:
+            schedule[slot].append(pick.name)
+
+    return LocalPlan(
+        concerns=concerns,
+        herbs=picks,
+        excluded=excluded,
+        schedule=schedule,
+        lifestyle=_lifestyle_tips(user_data),
+        build_ms=(time.perf_counter() - start) * 1000,
+    )
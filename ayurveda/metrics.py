@@ -0,0 +1,221 @@
+"""Per-stage timing, model-attempt and token metrics.
+
+Metrics live in one process-wide :class:`MetricsRegistry` and are exported
+in the Prometheus text format, either from the plan service's ``/metrics``
+route or from a small exporter thread (``AYURVEDA_METRICS_PORT``) next to the
+Streamlit app. Every span and model attempt can also be appended as a JSON
+line to ``AYURVEDA_METRICS_LOG`` for ad-hoc analysis.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Streamlit's st.rerun()/st.stop() unwind the script with these; matched by
+# name so this module does not import Streamlit. Spans they cut short are
+# recorded as "interrupted", not as errors.
+CONTROL_FLOW_ERRORS = {"RerunException", "StopException"}
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "ayurveda_stage_seconds": "Time spent in each stage of plan generation, by outcome (ok, error, interrupted).",
+    "ayurveda_model_attempt_seconds": "Latency of individual model attempts.",
+    "ayurveda_model_attempts_total": "Model attempts by outcome and error class.",
+    "ayurveda_prompt_tokens_total": "Prompt tokens reported by the SDK usage metadata.",
+    "ayurveda_response_tokens_total": "Response tokens reported by the SDK usage metadata.",
+    "ayurveda_cached_prompt_tokens_total": "Prompt tokens served from provider context cache.",
+    "ayurveda_context_cache_uploads_total": "Static prompt prefixes uploaded as provider cached content.",
+    "ayurveda_context_cache_fallbacks_total": "Context cache uploads that failed and fell back to full prompts.",
+    "ayurveda_similarity_cache_lookups_total": "Approximate plan cache lookups by result (exact, approximate, miss).",
+    "ayurveda_similarity_cache_staleness_seconds": "Age of plans served from the approximate plan cache.",
+    "ayurveda_router_busy_total": "Model attempts that never started because every router worker was busy.",
+    "ayurveda_service_errors_total": "Plan service requests that failed with an unexpected error, by class.",
+    "ayurveda_scheduler_requests_total": "Scheduler admissions by outcome (granted, rejected, timeout, expired).",
+    "ayurveda_scheduler_wait_seconds": "Time requests spent queued in the shared scheduler.",
+    "ayurveda_quota_errors_total": "429 quota errors that paused the shared scheduler.",
+    "ayurveda_speculations_total": "Speculative plan runs by outcome (started, used, wasted, skipped).",
+    "ayurveda_speculation_head_start_seconds": "Time between starting a speculative plan and the user asking for it.",
+    "ayurveda_chat_turns_total": "Follow-up consultation prompts built, one per question asked.",
+    "ayurveda_chat_input_tokens": "Estimated input tokens per follow-up consultation turn.",
+    "ayurveda_chat_compactions_total": "Older consultation turns folded into the running summary, by outcome.",
+    "ayurveda_session_checkpoints_total": "Session state checkpoints queued for the session store.",
+    "ayurveda_session_store_writes_total": "Session checkpoints written to the session store (after coalescing).",
+    "ayurveda_session_rehydrations_total": "Session store lookups on reconnect by result (hit, miss).",
+    "ayurveda_script_runs_total": "Full Streamlit script runs by page.",
+    "ayurveda_script_run_cpu_seconds": "Thread CPU time per full Streamlit script run.",
+    "ayurveda_assessments_completed_total": "Assessments submitted with Generate AI Plan.",
+    "ayurveda_assessment_reruns_total": "Full script runs spent in the wizard, summed over completed assessments.",
+    "ayurveda_assessment_cpu_seconds_total": "Wizard CPU time, summed over completed assessments.",
+}
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_str(key: tuple) -> str:
+    return ",".join(f"{k}={v}" for k, v in key)
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self, log_path: str | None = None, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.log_path = log_path
+        self.buckets = buckets
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, _Histogram]] = {}
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "MetricsRegistry":
+        return cls(log_path=os.environ.get("AYURVEDA_METRICS_LOG") or None)
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, buckets: tuple[float, ...] | None = None, **labels) -> None:
+        """Record a sample; ``buckets`` overrides the registry default for a new series."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = _Histogram(buckets or self.buckets)
+            series[key].observe(value)
+
+    def log_event(self, event: str, **fields) -> None:
+        if not self.log_path:
+            return
+        line = json.dumps({"ts": time.time(), "event": event, **fields}, ensure_ascii=False, default=str)
+        with self._log_lock:
+            with open(self.log_path, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+
+    @contextmanager
+    def span(self, stage: str, **labels):
+        """Time a stage; failures are recorded with ``outcome="error"``, reruns and stops as ``"interrupted"``."""
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException as error:
+            outcome = "interrupted" if type(error).__name__ in CONTROL_FLOW_ERRORS else "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("ayurveda_stage_seconds", elapsed, stage=stage, outcome=outcome, **labels)
+            self.log_event("span", stage=stage, outcome=outcome, seconds=round(elapsed, 6), **labels)
+
+    def record_model_attempt(self, model: str, seconds: float, error: BaseException | None = None) -> None:
+        outcome = "ok" if error is None else ("timeout" if isinstance(error, TimeoutError) else "error")
+        error_class = "" if error is None else type(error).__name__
+        self.inc("ayurveda_model_attempts_total", model=model, outcome=outcome, error_class=error_class)
+        self.observe("ayurveda_model_attempt_seconds", seconds, model=model, outcome=outcome)
+        self.log_event("model_attempt", model=model, outcome=outcome, error_class=error_class, seconds=round(seconds, 6))
+
+    def record_usage(self, model: str, usage: dict | None) -> None:
+        if not usage:
+            return
+        self.inc("ayurveda_prompt_tokens_total", usage.get("prompt_tokens", 0), model=model)
+        self.inc("ayurveda_response_tokens_total", usage.get("response_tokens", 0), model=model)
+        if usage.get("cached_tokens"):
+            self.inc("ayurveda_cached_prompt_tokens_total", usage["cached_tokens"], model=model)
+        self.log_event("usage", model=model, **usage)
+
+    def snapshot(self) -> dict:
+        """Plain-dict view for dashboards inside the app."""
+        with self._lock:
+            return {
+                "counters": {name: {_label_str(k): v for k, v in series.items()} for name, series in self._counters.items()},
+                "histograms": {
+                    name: {_label_str(k): {"count": h.count, "sum": h.total} for k, h in series.items()}
+                    for name, series in self._histograms.items()
+                },
+            }
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in series.items():
+                    cumulative = 0
+                    for bound, count in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                        cumulative += count
+                        le = bound if bound == "+Inf" else f"{bound:g}"
+                        lines.append(f"{name}_bucket{_format_labels(key, (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.total:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+_registry: MetricsRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    """The process-wide registry, created from the environment on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry.from_env()
+        return _registry
+
+
+def start_http_server(port: int, registry: MetricsRegistry | None = None, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread (for processes without their own HTTP server)."""
+    registry = registry or get_registry()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return server
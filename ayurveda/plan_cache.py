@@ -0,0 +1,194 @@
+"""Two-tier cache for generated wellness plans.
+
+Plans are keyed on a canonical hash of the assessment answers plus the prompt
+template version. The memory tier is a per-process LRU with a TTL; the
+optional disk tier is a directory of JSON files that every session (and every
+process pointed at the same directory) can share. With a disk tier, a memory
+hit is checked against the file's modification time, so a plan regenerated or
+invalidated by another worker is not served stale from this one's memory.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+
+def _canonical(value: Any) -> Any:
+    """Normalise answers so cosmetic differences don't change the key."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return sorted((_canonical(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True, default=str))
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def profile_hash(user_data: dict, template_version: Any) -> str:
+    """Stable SHA-256 key for a profile rendered with a given prompt template."""
+    payload = {"template": template_version, "profile": _canonical(user_data)}
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedPlan:
+    text: str
+    model: str | None = None
+    created_at: float = field(default_factory=time.time)
+    meta: dict = field(default_factory=dict)
+
+
+class PlanCache:
+    """In-process LRU + TTL tier backed by an optional shared on-disk tier."""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 24 * 3600, disk_dir: str | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._entries: OrderedDict[str, CachedPlan] = OrderedDict()
+        # (inode, mtime) of the disk file each memory entry was read or written
+        # with; every write replaces the file, so a rewrite changes the inode.
+        self._stamps: dict[str, tuple[int, int] | None] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+    def _expired(self, plan: CachedPlan) -> bool:
+        return self.ttl_seconds is not None and time.time() - plan.created_at > self.ttl_seconds
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    @staticmethod
+    def _stamp(stat: os.stat_result) -> tuple[int, int]:
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _disk_stamp(self, key: str) -> tuple[int, int] | None:
+        try:
+            return self._stamp(os.stat(self._disk_path(key)))
+        except OSError:
+            return None
+
+    def _read_disk(self, key: str) -> tuple[CachedPlan | None, tuple[int, int] | None]:
+        if not self.disk_dir:
+            return None, None
+        try:
+            with open(self._disk_path(key), encoding="utf-8") as fh:
+                return CachedPlan(**json.load(fh)), self._stamp(os.fstat(fh.fileno()))
+        except (OSError, ValueError, TypeError):
+            return None, None
+
+    def _write_disk(self, key: str, plan: CachedPlan) -> tuple[int, int] | None:
+        if not self.disk_dir:
+            return None
+        # Write to a temp file and rename so readers never see a partial plan.
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(asdict(plan), fh, ensure_ascii=False)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+        return self._disk_stamp(key)
+
+    def _remove_disk(self, key: str) -> None:
+        if not self.disk_dir:
+            return
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def _remember(self, key: str, plan: CachedPlan, stamp: tuple[int, int] | None = None) -> None:
+        self._entries[key] = plan
+        self._entries.move_to_end(key)
+        self._stamps[key] = stamp
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._stamps.pop(evicted, None)
+
+    def _forget(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._stamps.pop(key, None)
+
+    def __contains__(self, key: str) -> bool:
+        """Whether a plan is cached, without counting a hit or miss."""
+        with self._lock:
+            plan = self._entries.get(key)
+            if plan is not None:
+                return not self._expired(plan)
+        return bool(self.disk_dir) and os.path.exists(self._disk_path(key))
+
+    def get(self, key: str) -> CachedPlan | None:
+        with self._lock:
+            plan = self._entries.get(key)
+            if plan is not None and self._expired(plan):
+                self._forget(key)
+                plan = None
+            stamp = self._stamps.get(key)
+        # Another worker sharing the disk tier regenerated or invalidated it.
+        if plan is not None and self.disk_dir and self._disk_stamp(key) != stamp:
+            plan = None
+        if plan is not None:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+            return plan
+
+        plan, stamp = self._read_disk(key)
+        with self._lock:
+            if plan is not None and not self._expired(plan):
+                self._remember(key, plan, stamp)
+                self.hits += 1
+                self.disk_hits += 1
+                return plan
+            self._forget(key)
+            self.misses += 1
+        if plan is not None:
+            self._remove_disk(key)
+        return None
+
+    def put(self, key: str, plan: CachedPlan) -> None:
+        with self._lock:
+            self._remember(key, plan)
+        stamp = self._write_disk(key, plan)
+        if stamp is not None:
+            with self._lock:
+                if self._entries.get(key) is plan:
+                    self._stamps[key] = stamp
+
+    def invalidate(self, key: str) -> None:
+        """Drop a plan from both tiers, e.g. when the user asks to regenerate."""
+        with self._lock:
+            self._forget(key)
+        self._remove_disk(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+            }
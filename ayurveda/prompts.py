@@ -0,0 +1,204 @@
+"""Prompt construction for the Gemini wellness plan.
+
+The prompt is split into a static prefix (persona, section instructions and,
+with context caching, the full herb catalog) that is compiled once per
+process, and a small per-user suffix (profile plus the relevant herbs). With
+``AYURVEDA_CONTEXT_CACHE`` the prefix is uploaded to the provider once and
+only the suffix is sent per request.
+"""
+from __future__ import annotations
+
+import functools
+import json
+from dataclasses import dataclass
+
+from ayurveda import config
+from ayurveda.herb_index import DEFAULT_HERB_FIELDS, HerbContext, build_herb_context, estimate_tokens
+from ayurveda.knowledge_base import KnowledgeBase, get_knowledge_base
+from ayurveda.scoring import calculate_wellness_score
+
+# Bump whenever the prompt below changes so cached plans are not reused
+PROMPT_TEMPLATE_VERSION = 3
+
+PERSONA = "ACT as Dr. Ayurveda AI - a senior Ayurvedic practitioner with 25+ years experience."
+
+PLAN_INSTRUCTIONS = """
+Create a COMPREHENSIVE, PERSONALIZED Ayurvedic wellness plan for the user profile given below, with these EXACT sections:
+
+🌿 **HERBAL PRESCRIPTION**
+- Select 3-5 most suitable herbs from the database for this user's specific concerns
+- Provide exact dosages based on the user's weight
+- Specific timing (morning/afternoon/evening) with reasoning
+- Duration and progression plan (4-8 weeks)
+
+📅 **DAILY WELLNESS SCHEDULE** (Dinacharya)
+- Morning routine (5-8 AM) with specific timings
+- Afternoon routine (12-2 PM)
+- Evening routine (6-8 PM)
+- Bedtime routine (9-10 PM)
+
+🍃 **4-WEEK TRANSFORMATION PLAN**
+- Week 1: Detox & Foundation Building
+- Week 2: Strengthening & Symptom Relief
+- Week 3: Optimization & Balance
+- Week 4: Maintenance & Progress Assessment
+
+⚠️ **SAFETY & PRECAUTIONS**
+- Specific contraindications based on user profile
+- Herb-drug interaction warnings
+- Side effects monitoring guide
+- When to consult a practitioner
+
+💡 **LIFESTYLE RECOMMENDATIONS**
+- Dietary adjustments for their diet type
+- Exercise suggestions based on their frequency
+- Stress management techniques
+- Sleep optimization strategies
+
+Format with clear headings, use emojis, and provide actionable, specific advice.
+Be very precise about dosages in mg/grams and exact timing.
+Reference specific herbs from the database provided.
+""".strip()
+
+# Compiled once; filled with str.format_map per request.
+PROFILE_TEMPLATE = """
+USER PROFILE:
+
+PERSONAL DETAILS:
+- Name: {name}
+- Age: {age} years
+- Weight: {weight} kg
+- Height: {height} cm
+- Gender: {gender}
+
+HEALTH CONCERNS:
+- Main Concerns: {main_health_concerns}
+- Symptom Severity: {symptom_severity}/10
+- Duration: {duration}
+- Previous Treatments: {previous_treatments}
+
+LIFESTYLE METRICS:
+- Sleep Quality: {sleep_quality}/10
+- Energy Level: {energy_level}/10
+- Stress Level: {stress_level}/10
+- Digestion: {digestion}
+- Exercise: {exercise}
+
+DIETARY PROFILE:
+- Diet Type: {diet_type}
+- Water Intake: {water_intake} glasses/day
+- Food Preferences: {food_preferences}
+- Eating Pattern: {eating_pattern}
+
+WELLNESS GOALS:
+- Primary Goal: {primary_goal}
+- Time Commitment: {time_commitment}/day
+- Budget: {budget}
+- Expectations: {expectations}
+
+WELLNESS SCORE: {wellness_score}/10
+""".strip()
+
+PROFILE_DEFAULTS = {
+    "name": "User",
+    "age": "Not specified",
+    "weight": "Not specified",
+    "height": "Not specified",
+    "gender": "Not specified",
+    "symptom_severity": "5",
+    "duration": "Not specified",
+    "previous_treatments": "None",
+    "sleep_quality": "5",
+    "energy_level": "5",
+    "stress_level": "5",
+    "digestion": "Fair",
+    "exercise": "Weekly",
+    "diet_type": "Vegetarian",
+    "water_intake": "6",
+    "food_preferences": "None",
+    "eating_pattern": "Regular",
+    "primary_goal": "Overall wellness",
+    "time_commitment": "30 minutes",
+    "budget": "Medium",
+    "expectations": "Improved health",
+}
+
+
+@dataclass
+class PlanPrompt:
+    # What to send: prefix + suffix, or only the suffix when the prefix is
+    # held in the provider's context cache.
+    text: str
+    tokens: int
+    herb_context: HerbContext
+    prefix_tokens: int = 0
+    cached_prefix: bool = False
+
+
+@functools.lru_cache(maxsize=None)
+def static_prefix() -> str:
+    """Persona and section instructions, identical for every user."""
+    return f"{PERSONA}\n\n{PLAN_INSTRUCTIONS}\n\n"
+
+
+@functools.lru_cache(maxsize=4)
+def _catalog_prefix(kb: KnowledgeBase) -> str:
+    # Keyed on the knowledge base itself: a different catalog is a different instance.
+    catalog = {name: {field: kb.herbs[name][field] for field in DEFAULT_HERB_FIELDS} for name in kb.names}
+    catalog_json = json.dumps(catalog, separators=(",", ":"), ensure_ascii=False)
+    return f"{static_prefix()}AVAILABLE HERBS DATABASE:\n{catalog_json}\n\n"
+
+
+def context_cache_prefix() -> str:
+    """Static prefix plus the full herb catalog, for provider-side context caching."""
+    return _catalog_prefix(get_knowledge_base())
+
+
+def build_user_profile(user_data: dict, wellness_score: float) -> str:
+    values = {**PROFILE_DEFAULTS, **{k: v for k, v in user_data.items() if k in PROFILE_DEFAULTS}}
+    values["main_health_concerns"] = ", ".join(user_data.get("main_health_concerns") or ["General wellness"])
+    values["wellness_score"] = wellness_score
+    return PROFILE_TEMPLATE.format_map(values)
+
+
+def build_prompt(
+    user_data: dict,
+    top_k: int | None = None,
+    token_budget: int | None = None,
+    cached_prefix: bool | None = None,
+) -> PlanPrompt:
+    """Plan prompt for a profile, embedding only the herbs relevant to the user's concerns.
+
+    With ``cached_prefix`` the catalog and instructions live in the provider's
+    context cache, so only the profile and the relevant herb names are sent.
+    """
+    top_k = config.PROMPT_TOP_K_HERBS if top_k is None else top_k
+    token_budget = config.PROMPT_TOKEN_BUDGET if token_budget is None else token_budget
+    cached_prefix = config.CONTEXT_CACHE if cached_prefix is None else cached_prefix
+    profile = build_user_profile(user_data, calculate_wellness_score(user_data))
+
+    kb = get_knowledge_base()
+    ranked_herbs = kb.rank_for_concerns(user_data.get('main_health_concerns', []), limit=top_k)
+    if cached_prefix:
+        # The whole catalog is already in the cached prefix; point at the best matches.
+        herb_context = build_herb_context(ranked_herbs, kb.herbs, top_k=top_k, fields=())
+        suffix = f"{profile}\n\nMOST RELEVANT HERBS FROM THE DATABASE: {', '.join(herb_context.herbs)}\n"
+        return PlanPrompt(
+            text=suffix,
+            tokens=estimate_tokens(suffix),
+            herb_context=herb_context,
+            prefix_tokens=estimate_tokens(context_cache_prefix()),
+            cached_prefix=True,
+        )
+
+    # Embed only the herbs relevant to this user's concerns, within the token budget
+    prefix = static_prefix()
+    head = f"{profile}\n\nAVAILABLE HERBS DATABASE:\n"
+    herb_context = build_herb_context(
+        ranked_herbs,
+        kb.herbs,
+        top_k=top_k,
+        token_budget=token_budget - estimate_tokens(prefix) - estimate_tokens(head),
+    )
+    text = f"{prefix}{head}{herb_context.json}\n"
+    return PlanPrompt(text=text, tokens=estimate_tokens(text), herb_context=herb_context, prefix_tokens=estimate_tokens(prefix))
@@ -0,0 +1,48 @@
+"""Thread-safe token-bucket rate limiter."""
+from __future__ import annotations
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Allows ``rate_per_minute`` units per minute with bursts up to ``burst``."""
+
+    def __init__(self, rate_per_minute: float, burst: float | None = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, rate_per_minute / 60.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate_per_second)
+        self._updated = now
+
+    def available(self) -> float:
+        """Units available right now."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """Seconds until ``amount`` units would be available (0 if now)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = min(amount, self.capacity) - self._tokens
+            return max(0.0, missing / self.rate_per_second) if self.rate_per_second else float("inf")
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        # Requests larger than the bucket are allowed once it is full.
+        with self._lock:
+            self._refill(time.monotonic())
+            needed = min(amount, self.capacity)
+            if self._tokens >= needed:
+                self._tokens -= amount
+                return True
+            return False
+
+    def acquire(self, amount: float = 1.0) -> None:
+        """Block until ``amount`` units are available, then take them."""
+        while not self.try_acquire(amount):
+            time.sleep(max(0.005, self.wait_time(amount)))
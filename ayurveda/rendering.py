@@ -0,0 +1,50 @@
+"""Single-payload HTML for the results page.
+
+Every ``st.markdown`` call is its own element and websocket delta, and an
+opening ``<div>`` in one call never wraps the markdown of the next. These
+helpers build a whole herb card, herb grid or plan card as one string, so
+each renders as one correctly nested element. :func:`payload_stats` reports
+the element count and bytes of what a page sends, for benchmarks.
+"""
+from __future__ import annotations
+
+import html
+from typing import Iterable, Mapping
+
+PLAN_TITLE = "## 🌟 Your AI-Powered Ayurvedic Wellness Plan"
+
+
+def herb_card_html(name: str, entry: Mapping) -> str:
+    safety = entry["safety"]
+    if len(safety) > 50:
+        safety = safety[:50] + "..."
+    return (
+        '<div class="herb-card">'
+        f"<b>{html.escape(name)}</b>"
+        f"<br><i>Benefits:</i> {html.escape(', '.join(entry['benefits'][:3]))}"
+        f"<br><i>Dosage:</i> {html.escape(entry['dosage'])}"
+        f"<br><i>Safety:</i> {html.escape(safety)}"
+        "</div>"
+    )
+
+
+def herb_grid_html(names: Iterable[str], herbs: Mapping[str, Mapping]) -> str:
+    """All cards in one two-column grid (see ``.herb-grid`` in the stylesheet)."""
+    return '<div class="herb-grid">' + "".join(herb_card_html(name, herbs[name]) for name in names) + "</div>"
+
+
+def plan_card_markdown(plan: str, title: str = PLAN_TITLE) -> str:
+    """The recommendation card as one markdown payload.
+
+    Blank lines around the plan let Streamlit render it as markdown while the
+    surrounding ``<div>`` still wraps it. ``<`` in the (model-written) plan is
+    escaped so it cannot open raw HTML; markdown syntax is left alone.
+    """
+    plan = plan.replace("<", "&lt;")
+    return f'<div class="recommendation-card">\n\n{title}\n\n---\n\n{plan}\n\n</div>'
+
+
+def payload_stats(payloads: Iterable[str]) -> dict:
+    """Element (delta) count and UTF-8 bytes of a sequence of markdown payloads."""
+    payloads = list(payloads)
+    return {"elements": len(payloads), "bytes": sum(len(p.encode("utf-8")) for p in payloads)}
@@ -0,0 +1,411 @@
+"""Process-wide Gemini model router.
+
+Replaces the serial ``model_names`` loop: model objects are built once, the
+last healthy model is tried first, every attempt has a deadline, models that
+keep failing are skipped by a circuit breaker, and an optional hedge request
+is sent to the next model when the current one is slow.
+
+Attempts run on a shared worker pool. An attempt's deadline starts when a
+worker picks it up, so time spent queued behind other sessions is never
+charged to the model; an attempt still queued after ``queue_timeout`` fails
+with :class:`RouterBusy` without touching any breaker. At most
+``max_workers`` attempts run at once. An attempt that timed out or lost a
+hedge keeps running until the SDK returns, but gives its slot back, and the
+pool has ``max_abandoned`` extra workers for such calls so they cannot starve
+new ones.
+"""
+from __future__ import annotations
+
+import queue
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Callable
+
+from ayurveda.generation import GenerationTimings, chunk_text, generate_plan, request_kwargs, usage_from_response
+
+# Errors that mean the model will not come back soon (e.g. a retired name).
+PERMANENT_ERRORS = {"NotFound"}
+# 429s: the project is over quota, so trying the next model mostly adds load.
+QUOTA_ERRORS = {"ResourceExhausted"}
+
+
+class AllModelsFailed(RuntimeError):
+    """Raised when no model produced a plan; ``errors`` holds (model, exception)."""
+
+    def __init__(self, errors: list[tuple[str, BaseException]]):
+        self.errors = errors
+        summary = ", ".join(f"{name}: {type(err).__name__}" for name, err in errors) or "no model available"
+        super().__init__(f"All models failed ({summary})")
+
+
+class RouterBusy(RuntimeError):
+    """No pool worker started the attempt within ``queue_timeout``; not the model's fault."""
+
+
+@dataclass
+class RouterResult:
+    text: str
+    model: str
+    timings: GenerationTimings
+    attempts: int
+    hedged: bool = False
+
+
+@dataclass
+class _ModelHealth:
+    attempts: int = 0
+    successes: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=100))
+    errors: Counter = field(default_factory=Counter)
+
+
+class _Attempt:
+    """One model call queued on the router's pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queued_at = time.monotonic()
+        # Resolves to the monotonic time a worker started the call.
+        self.started: Future = Future()
+        self.future: Future | None = None
+        self.holds_slot = False
+        self.abandoned = False
+        self.counted_abandoned = False
+
+    @property
+    def start(self) -> float | None:
+        return self.started.result() if self.started.done() else None
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        model_names: list[str],
+        model_factory: Callable[[str], object],
+        attempt_timeout: float = 45.0,
+        failure_threshold: int = 3,
+        cooldown_seconds: float = 60.0,
+        permanent_cooldown_seconds: float = 3600.0,
+        hedge_after: float | None = None,
+        max_workers: int = 8,
+        metrics=None,
+        fallback_on_quota: bool = True,
+        queue_timeout: float | None = None,
+        max_abandoned: int | None = None,
+    ):
+        self.model_names = list(model_names)
+        self.model_factory = model_factory
+        self.attempt_timeout = attempt_timeout
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.permanent_cooldown_seconds = permanent_cooldown_seconds
+        self.hedge_after = hedge_after
+        self.metrics = metrics
+        self.fallback_on_quota = fallback_on_quota
+        self.queue_timeout = attempt_timeout if queue_timeout is None else queue_timeout
+        self.max_abandoned = max_workers if max_abandoned is None else max_abandoned
+        self._executor = ThreadPoolExecutor(max_workers=max_workers + self.max_abandoned, thread_name_prefix="model-router")
+        self._slots = threading.Semaphore(max_workers)
+        self._abandoned = 0
+        self.busy = 0
+        self._models: dict[str, object] = {}
+        self._health = {name: _ModelHealth() for name in self.model_names}
+        self._preferred: str | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def preferred_model(self) -> str | None:
+        return self._preferred
+
+    def _model(self, name: str):
+        with self._lock:
+            model = self._models.get(name)
+        if model is None:
+            model = self.model_factory(name)
+            with self._lock:
+                model = self._models.setdefault(name, model)
+        return model
+
+    def _candidates(self) -> list[str]:
+        """Sticky winner first, then configured order, skipping open circuits."""
+        now = time.monotonic()
+        with self._lock:
+            ordered = self.model_names
+            if self._preferred in self._health:
+                ordered = [self._preferred] + [n for n in self.model_names if n != self._preferred]
+            closed = [n for n in ordered if self._health[n].open_until <= now]
+            if closed:
+                return closed
+            # Everything is open: probe the model whose cooldown ends first.
+            return [min(ordered, key=lambda n: self._health[n].open_until)]
+
+    def _record_success(self, name: str, latency: float, timings: GenerationTimings) -> None:
+        if self.metrics is not None:
+            self.metrics.record_model_attempt(name, latency)
+            self.metrics.record_usage(name, timings.usage)
+        with self._lock:
+            health = self._health[name]
+            health.attempts += 1
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.open_until = 0.0
+            health.latencies.append(latency)
+            self._preferred = name
+
+    def _record_failure(self, name: str, error: BaseException, latency: float) -> None:
+        if self.metrics is not None:
+            self.metrics.record_model_attempt(name, latency, error)
+        error_class = type(error).__name__
+        timed_out = isinstance(error, TimeoutError)
+        with self._lock:
+            health = self._health[name]
+            health.attempts += 1
+            health.failures += 1
+            health.timeouts += timed_out
+            health.consecutive_failures += 1
+            health.errors[error_class] += 1
+            if error_class in PERMANENT_ERRORS:
+                health.open_until = time.monotonic() + self.permanent_cooldown_seconds
+            elif health.consecutive_failures >= self.failure_threshold:
+                health.open_until = time.monotonic() + self.cooldown_seconds
+            if self._preferred == name:
+                self._preferred = None
+
+    def _stop_on(self, error: BaseException) -> bool:
+        return not self.fallback_on_quota and type(error).__name__ in QUOTA_ERRORS
+
+    def _submit(self, name: str, fn: Callable, *args) -> _Attempt:
+        attempt = _Attempt(name)
+        attempt.future = self._executor.submit(self._run, attempt, fn, *args)
+        return attempt
+
+    def _run(self, attempt: _Attempt, fn: Callable, *args):
+        self._slots.acquire()
+        with self._lock:
+            if attempt.abandoned:
+                # Given up on while it waited for a slot.
+                self._slots.release()
+                return None
+            attempt.holds_slot = True
+        attempt.started.set_result(time.monotonic())
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                if attempt.holds_slot:
+                    attempt.holds_slot = False
+                    self._slots.release()
+                elif attempt.counted_abandoned:
+                    self._abandoned -= 1
+
+    def _abandon(self, attempt: _Attempt) -> None:
+        """Stop waiting for ``attempt``; a running call gives its slot back if the abandoned cap allows."""
+        attempt.future.cancel()
+        with self._lock:
+            attempt.abandoned = True
+            if attempt.holds_slot and self._abandoned < self.max_abandoned:
+                attempt.holds_slot = False
+                attempt.counted_abandoned = True
+                self._abandoned += 1
+                self._slots.release()
+
+    def _busy(self, attempt: _Attempt) -> RouterBusy:
+        self._abandon(attempt)
+        with self._lock:
+            self.busy += 1
+        if self.metrics is not None:
+            self.metrics.inc("ayurveda_router_busy_total")
+        return RouterBusy(f"no router worker started {attempt.name} within {self.queue_timeout:.0f}s")
+
+    def generate(
+        self, prompt: str, on_text: Callable[[str], None] | None = None, generation_config: dict | None = None
+    ) -> RouterResult:
+        """Generate a plan; pass ``on_text`` to stream partial markdown."""
+        if on_text is not None:
+            return self._generate_streaming(prompt, on_text, generation_config)
+        return self._generate_blocking(prompt, generation_config)
+
+    def _generate_blocking(self, prompt: str, generation_config: dict | None = None) -> RouterResult:
+        candidates = self._candidates()
+        errors: list[tuple[str, BaseException]] = []
+        pending: dict[Future, _Attempt] = {}
+        next_idx = 0
+        attempts = 0
+        hedged = False
+
+        def launch() -> None:
+            nonlocal next_idx, attempts
+            name = candidates[next_idx]
+            next_idx += 1
+            attempts += 1
+            attempt = self._submit(name, lambda: generate_plan(self._model(name), prompt, generation_config))
+            pending[attempt.future] = attempt
+
+        def give_up(error: BaseException | None = None) -> AllModelsFailed:
+            for attempt in pending.values():
+                self._abandon(attempt)
+            pending.clear()
+            failed = AllModelsFailed(errors)
+            failed.__cause__ = error
+            return failed
+
+        launch()
+        while pending:
+            now = time.monotonic()
+            waits, wake_at = list(pending), []
+            for attempt in pending.values():
+                if attempt.start is None:
+                    # Wake when a worker starts it (its deadline begins) or the queue wait runs out.
+                    waits.append(attempt.started)
+                    wake_at.append(attempt.queued_at + self.queue_timeout)
+                else:
+                    wake_at.append(attempt.start + self.attempt_timeout)
+            can_hedge = self.hedge_after is not None and len(pending) == 1 and next_idx < len(candidates)
+            if can_hedge:
+                only, = pending.values()
+                if only.start is not None:
+                    wake_at.append(only.start + self.hedge_after)
+            wait(waits, timeout=max(0.0, min(wake_at) - now), return_when=FIRST_COMPLETED)
+
+            for future in [f for f in pending if f.done()]:
+                attempt = pending.pop(future)
+                try:
+                    text, timings = future.result()
+                except Exception as error:
+                    self._record_failure(attempt.name, error, time.monotonic() - attempt.start)
+                    errors.append((attempt.name, error))
+                    if self._stop_on(error):
+                        raise give_up(error)
+                    continue
+                self._record_success(attempt.name, time.monotonic() - attempt.start, timings)
+                # Any other in-flight attempt is abandoned; its result is ignored.
+                give_up()
+                return RouterResult(text=text, model=attempt.name, timings=timings, attempts=attempts, hedged=hedged)
+
+            now = time.monotonic()
+            for future, attempt in list(pending.items()):
+                if attempt.start is None:
+                    if now - attempt.queued_at >= self.queue_timeout:
+                        pending.pop(future)
+                        errors.append((attempt.name, self._busy(attempt)))
+                        # The pool is saturated; the next model would queue just the same.
+                        raise give_up()
+                elif now - attempt.start >= self.attempt_timeout:
+                    pending.pop(future)
+                    self._abandon(attempt)
+                    error = TimeoutError(f"{attempt.name} exceeded {self.attempt_timeout:.0f}s")
+                    self._record_failure(attempt.name, error, now - attempt.start)
+                    errors.append((attempt.name, error))
+
+            if next_idx < len(candidates):
+                if not pending:
+                    launch()
+                elif can_hedge and only.start is not None and now - only.start >= self.hedge_after:
+                    hedged = True
+                    launch()
+        raise AllModelsFailed(errors)
+
+    def _stream_worker(
+        self, name: str, prompt: str, chunks: queue.Queue, cancelled: threading.Event, generation_config: dict | None
+    ) -> None:
+        try:
+            for chunk in self._model(name).generate_content(prompt, stream=True, **request_kwargs(generation_config)):
+                if cancelled.is_set():
+                    return
+                usage = usage_from_response(chunk)
+                if usage:
+                    chunks.put(("usage", usage))
+                piece = chunk_text(chunk)
+                if piece:
+                    chunks.put(("chunk", piece))
+            chunks.put(("done", None))
+        except Exception as error:
+            chunks.put(("error", error))
+
+    def _generate_streaming(
+        self, prompt: str, on_text: Callable[[str], None], generation_config: dict | None = None
+    ) -> RouterResult:
+        # Chunks are produced on a worker thread but ``on_text`` runs on the
+        # caller's thread, so UI callbacks keep their script context. The
+        # deadline applies to the first chunk (counted from when a worker starts
+        # the call) and to every gap between chunks.
+        errors: list[tuple[str, BaseException]] = []
+        attempts = 0
+        for name in self._candidates():
+            attempts += 1
+            chunks: queue.Queue = queue.Queue()
+            cancelled = threading.Event()
+            attempt = self._submit(name, self._stream_worker, name, prompt, chunks, cancelled, generation_config)
+            try:
+                start = attempt.started.result(timeout=self.queue_timeout)
+            except FutureTimeout:
+                errors.append((name, self._busy(attempt)))
+                raise AllModelsFailed(errors) from None
+            first_token_s = None
+            text = ""
+            count = 0
+            usage = None
+            try:
+                while True:
+                    try:
+                        kind, payload = chunks.get(timeout=self.attempt_timeout)
+                    except queue.Empty:
+                        raise TimeoutError(f"{name} stalled for {self.attempt_timeout:.0f}s") from None
+                    if kind == "error":
+                        raise payload
+                    if kind == "done":
+                        break
+                    if kind == "usage":
+                        usage = payload
+                        continue
+                    if first_token_s is None:
+                        first_token_s = time.monotonic() - start
+                    count += 1
+                    text += payload
+                    on_text(text)
+                if not text:
+                    raise ValueError("Model returned an empty plan")
+            except Exception as error:
+                cancelled.set()
+                self._abandon(attempt)
+                self._record_failure(name, error, time.monotonic() - start)
+                errors.append((name, error))
+                if self._stop_on(error):
+                    raise AllModelsFailed(errors) from error
+                continue
+            total_s = time.monotonic() - start
+            timings = GenerationTimings(first_token_s=first_token_s, total_s=total_s, chunks=count, streamed=True, usage=usage)
+            self._record_success(name, total_s, timings)
+            return RouterResult(text=text, model=name, timings=timings, attempts=attempts)
+        raise AllModelsFailed(errors)
+
+    def stats(self) -> list[dict]:
+        """Per-model health snapshot, in configured order."""
+        now = time.monotonic()
+        rows = []
+        with self._lock:
+            for name in self.model_names:
+                health = self._health[name]
+                latencies = sorted(health.latencies)
+                rows.append({
+                    "model": name,
+                    "state": "open" if health.open_until > now else "closed",
+                    "preferred": name == self._preferred,
+                    "attempts": health.attempts,
+                    "successes": health.successes,
+                    "failures": health.failures,
+                    "timeouts": health.timeouts,
+                    "p50_s": round(statistics.median(latencies), 2) if latencies else None,
+                    "p95_s": round(latencies[int(0.95 * (len(latencies) - 1))], 2) if latencies else None,
+                    "errors": dict(health.errors),
+                })
+        return rows
@@ -0,0 +1,271 @@
+"""Process-wide, quota-aware scheduler for Gemini requests.
+
+Every Streamlit session shares one :class:`QuotaScheduler` (via
+``st.cache_resource``). Requests are admitted through two token buckets, one
+for requests per minute and one for tokens per minute, and queued fairly: the
+sessions waiting take turns, so one session's burst of section requests
+cannot starve everybody else. Each ticket carries an estimated wait for the
+UI; when that estimate exceeds ``max_wait_s`` the request is refused up front
+(:class:`SchedulerBusy`) so the caller can fall back to a local or cached
+plan. A quota error (429 ``ResourceExhausted``) pauses the whole queue with
+exponential backoff instead of letting every session retry at once.
+
+A ticket must be waited on (:meth:`QuotaScheduler.wait` or ``run``) within
+``lease_s`` of being submitted. One that never is, because its script run
+was stopped between ``submit`` and ``run``, is purged by the next waiter, so
+an abandoned ticket cannot hold up the queue; callers should still
+:meth:`~QuotaScheduler.cancel` tickets they give up on.
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Callable, TypeVar
+
+from ayurveda.ratelimit import TokenBucket
+from ayurveda.router import QUOTA_ERRORS
+
+T = TypeVar("T")
+
+
+class SchedulerBusy(RuntimeError):
+    """The request would wait longer than the scheduler allows."""
+
+    def __init__(self, wait_s: float, reason: str = "queue"):
+        self.wait_s = wait_s
+        self.reason = reason
+        super().__init__(f"Gemini is busy ({reason}); estimated wait {wait_s:.0f}s")
+
+
+@dataclass
+class Ticket:
+    session_id: str
+    requests: int
+    tokens: int
+    estimated_wait_s: float
+    ahead: int
+    id: int = 0
+    submitted_at: float = field(default_factory=time.monotonic)
+    # Unless someone is waiting on it by then, the ticket is dropped at expires_at.
+    expires_at: float = float("inf")
+    waiting: bool = False
+    expired: bool = False
+
+
+def is_quota_error(error: BaseException) -> bool:
+    errors = getattr(error, "errors", None) or [(None, error)]
+    return any(type(err).__name__ in QUOTA_ERRORS for _, err in errors)
+
+
+class QuotaScheduler:
+    def __init__(
+        self,
+        rpm: float,
+        tpm: float,
+        max_wait_s: float = 20.0,
+        quota_backoff_s: float = 10.0,
+        max_backoff_s: float = 120.0,
+        burst_s: float = 10.0,
+        lease_s: float = 5.0,
+        metrics=None,
+    ):
+        # ``burst_s`` seconds' worth of burst, so a quiet process can start several requests at once.
+        self.requests = TokenBucket(rpm, burst=max(1.0, rpm * burst_s / 60))
+        self.tokens = TokenBucket(tpm, burst=max(1.0, tpm * burst_s / 60))
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait_s = max_wait_s
+        self.quota_backoff_s = quota_backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.lease_s = lease_s
+        self.metrics = metrics
+        self._queues: OrderedDict[str, deque[Ticket]] = OrderedDict()
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._paused_until = 0.0
+        self._backoff_s = quota_backoff_s
+        self.granted = 0
+        self.rejected = 0
+        self.expired = 0
+        self.quota_errors = 0
+
+    # -- estimates ---------------------------------------------------------
+
+    def _estimate(self, ticket: Ticket, ahead: int) -> float:
+        """Seconds until both buckets have refilled enough for ``ahead`` similar requests plus this one."""
+        waits = [self._paused_until - time.monotonic(), 0.0]
+        for bucket, amount in ((self.requests, ticket.requests), (self.tokens, ticket.tokens)):
+            missing = (ahead + 1) * amount - bucket.available()
+            if missing > 0:
+                waits.append(missing / bucket.rate_per_second if bucket.rate_per_second else float("inf"))
+        return max(waits)
+
+    def _ahead(self, session_id: str, position: int) -> int:
+        """Tickets granted before the ``position``-th (0-based) ticket of a session."""
+        ahead = position
+        for other, tickets in self._queues.items():
+            if other != session_id:
+                ahead += min(len(tickets), position + 1)
+        return ahead
+
+    def _head_wait(self, ticket: Ticket) -> float:
+        return max(
+            self._paused_until - time.monotonic(),
+            self.requests.wait_time(ticket.requests),
+            self.tokens.wait_time(ticket.tokens),
+            0.0,
+        )
+
+    def estimate_wait(self, session_id: str = "", tokens: int = 0, requests: int = 1) -> float:
+        """Estimated wait for a new request from ``session_id``, without queueing it."""
+        probe = Ticket(session_id, requests, tokens, 0.0, 0)
+        with self._cond:
+            return self._estimate(probe, self._ahead(session_id, len(self._queues.get(session_id, ()))))
+
+    # -- queueing ----------------------------------------------------------
+
+    def submit(self, session_id: str, tokens: int, requests: int = 1) -> Ticket:
+        """Queue a request, or raise :class:`SchedulerBusy` if it would wait too long."""
+        with self._cond:
+            position = len(self._queues.get(session_id, ()))
+            ahead = self._ahead(session_id, position)
+            ticket = Ticket(session_id, requests, tokens, 0.0, ahead, id=next(self._ids))
+            ticket.expires_at = ticket.submitted_at + self.lease_s
+            ticket.estimated_wait_s = self._estimate(ticket, ahead)
+            if ticket.estimated_wait_s > self.max_wait_s:
+                self.rejected += 1
+                self._count("rejected")
+                raise SchedulerBusy(ticket.estimated_wait_s, "paused after quota error" if self._paused() else "queue")
+            self._queues.setdefault(session_id, deque()).append(ticket)
+            return ticket
+
+    def _paused(self) -> bool:
+        return time.monotonic() < self._paused_until
+
+    def _is_next(self, ticket: Ticket) -> bool:
+        if not self._queues:
+            return False
+        session_id, tickets = next(iter(self._queues.items()))
+        return session_id == ticket.session_id and tickets[0] is ticket
+
+    def _remove(self, ticket: Ticket) -> None:
+        tickets = self._queues.get(ticket.session_id)
+        if tickets is None:
+            return
+        try:
+            tickets.remove(ticket)
+        except ValueError:
+            return
+        if not tickets:
+            del self._queues[ticket.session_id]
+
+    def _purge_expired(self, now: float) -> float:
+        """Drop tickets nobody waited on within their lease; returns the next expiry."""
+        next_expiry = float("inf")
+        for tickets in list(self._queues.values()):
+            for ticket in list(tickets):
+                if ticket.waiting:
+                    continue
+                if now >= ticket.expires_at:
+                    ticket.expired = True
+                    self._remove(ticket)
+                    self.expired += 1
+                    self._count("expired")
+                else:
+                    next_expiry = min(next_expiry, ticket.expires_at)
+        return next_expiry
+
+    def cancel(self, ticket: Ticket) -> None:
+        with self._cond:
+            self._remove(ticket)
+            self._cond.notify_all()
+
+    def wait(self, ticket: Ticket, timeout: float | None = None) -> float:
+        """Block until it is this ticket's turn and both buckets allow it; returns seconds waited."""
+        deadline = time.monotonic() + (self.max_wait_s if timeout is None else timeout)
+        with self._cond:
+            if ticket.expired:
+                raise SchedulerBusy(time.monotonic() - ticket.submitted_at, "ticket expired before it was used")
+            ticket.waiting = True
+            try:
+                while True:
+                    now = time.monotonic()
+                    next_expiry = self._purge_expired(now)
+                    if now >= deadline:
+                        self._count("timeout")
+                        raise SchedulerBusy(now - ticket.submitted_at, "timed out in queue")
+                    if self._is_next(ticket):
+                        delay = self._head_wait(ticket)
+                        if delay <= 0 and self._take(ticket):
+                            break
+                        self._cond.wait(min(max(delay, 0.005), deadline - now))
+                    else:
+                        # Wake when an abandoned ticket ahead of us expires, too.
+                        self._cond.wait(min(deadline, next_expiry) - now)
+            except BaseException:
+                self._remove(ticket)
+                self._cond.notify_all()
+                raise
+            # Round robin: this session goes to the back of the line.
+            session_id = ticket.session_id
+            tickets = self._queues[session_id]
+            tickets.popleft()
+            if tickets:
+                self._queues.move_to_end(session_id)
+            else:
+                del self._queues[session_id]
+            self.granted += 1
+            self._cond.notify_all()
+        waited = time.monotonic() - ticket.submitted_at
+        self._count("granted", waited)
+        return waited
+
+    def _take(self, ticket: Ticket) -> bool:
+        # Only the head ticket takes, right after both buckets reported enough,
+        # and buckets only refill in between, so both acquires succeed together.
+        return self.requests.try_acquire(ticket.requests) and self.tokens.try_acquire(ticket.tokens)
+
+    def run(self, ticket: Ticket, call: Callable[[], T]) -> T:
+        """Wait for ``ticket``, then make the call, pausing the queue on quota errors."""
+        self.wait(ticket)
+        try:
+            result = call()
+        except Exception as error:
+            if is_quota_error(error):
+                self.report_quota_error()
+            raise
+        with self._cond:
+            self._backoff_s = self.quota_backoff_s
+        return result
+
+    def report_quota_error(self) -> None:
+        """Pause every queued request; repeated 429s double the pause."""
+        with self._cond:
+            self.quota_errors += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + self._backoff_s)
+            self._backoff_s = min(self.max_backoff_s, self._backoff_s * 2)
+            self._cond.notify_all()
+        if self.metrics is not None:
+            self.metrics.inc("ayurveda_quota_errors_total")
+
+    def _count(self, outcome: str, waited: float | None = None) -> None:
+        if self.metrics is None:
+            return
+        self.metrics.inc("ayurveda_scheduler_requests_total", outcome=outcome)
+        if waited is not None:
+            self.metrics.observe("ayurveda_scheduler_wait_seconds", waited)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queued": sum(len(tickets) for tickets in self._queues.values()),
+                "sessions_waiting": len(self._queues),
+                "granted": self.granted,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "quota_errors": self.quota_errors,
+                "paused_s": max(0.0, self._paused_until - time.monotonic()),
+            }
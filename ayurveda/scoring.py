@@ -0,0 +1,14 @@
+"""Wellness score derived from the lifestyle answers."""
+from __future__ import annotations
+
+DIGESTION_SCORES = {"Excellent": 10, "Good": 8, "Fair": 6, "Poor": 4, "Severe issues": 2}
+
+
+def calculate_wellness_score(user_data: dict) -> float:
+    sleep = int(user_data.get('sleep_quality', 5))
+    energy = int(user_data.get('energy_level', 5))
+    stress = 10 - int(user_data.get('stress_level', 5))
+    digestion = DIGESTION_SCORES.get(user_data.get('digestion', 'Fair'), 6)
+
+    total = (sleep + energy + stress + digestion) / 4
+    return min(10, max(1, total))
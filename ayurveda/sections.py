@@ -0,0 +1,444 @@
+"""Sectioned wellness plans with section-level caching.
+
+The plan's five sections are generated as separate, schema-constrained JSON
+requests. Each section's prompt only contains the profile fields it depends
+on, and its cache key is a hash of exactly those fields, so editing the diet
+or exercise answers regenerates the lifestyle (and schedule) sections while
+the herbal prescription, 4-week plan and safety notes come from the cache.
+Sections that do need regenerating are requested in parallel, and a section
+already being written for the same answers is joined rather than requested
+twice. A caller that has to queue for quota first (a speculative run waiting
+for its scheduler ticket) :meth:`~SectionedPlanner.reserve`\ s its sections,
+so they count as being written from the moment it joins the queue.
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+from ayurveda import config
+from ayurveda.generation import GenerationTimings
+from ayurveda.herb_index import build_herb_context
+from ayurveda.knowledge_base import get_knowledge_base
+from ayurveda.plan_cache import CachedPlan, profile_hash
+from ayurveda.router import AllModelsFailed
+from ayurveda.scoring import calculate_wellness_score
+
+# Bump whenever a section prompt or the schema changes
+SECTION_TEMPLATE_VERSION = 1
+
+SECTION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "points": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "note": {"type": "STRING"},
+    },
+    "required": ["points"],
+}
+
+GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": SECTION_SCHEMA}
+
+FIELD_LABELS = {
+    "age": "Age (years)",
+    "weight": "Weight (kg)",
+    "height": "Height (cm)",
+    "gender": "Gender",
+    "main_health_concerns": "Main Concerns",
+    "symptom_severity": "Symptom Severity (/10)",
+    "duration": "Duration",
+    "previous_treatments": "Previous Treatments",
+    "sleep_quality": "Sleep Quality (/10)",
+    "energy_level": "Energy Level (/10)",
+    "stress_level": "Stress Level (/10)",
+    "digestion": "Digestion",
+    "exercise": "Exercise",
+    "diet_type": "Diet Type",
+    "water_intake": "Water Intake (glasses/day)",
+    "food_preferences": "Food Preferences",
+    "eating_pattern": "Eating Pattern",
+    "primary_goal": "Primary Goal",
+    "time_commitment": "Time Commitment (/day)",
+    "budget": "Budget",
+    "expectations": "Expectations",
+}
+
+SCORE_FIELDS = ("sleep_quality", "energy_level", "stress_level", "digestion")
+
+
+@dataclass(frozen=True)
+class SectionSpec:
+    key: str
+    heading: str
+    instructions: tuple[str, ...]
+    depends_on: tuple[str, ...]
+    uses_herbs: bool = False
+
+
+SECTIONS = (
+    SectionSpec(
+        "herbal_prescription",
+        "🌿 **HERBAL PRESCRIPTION**",
+        (
+            "Select 3-5 most suitable herbs from the database for this user's specific concerns",
+            "Provide exact dosages based on the user's weight",
+            "Specific timing (morning/afternoon/evening) with reasoning",
+            "Duration and progression plan (4-8 weeks)",
+        ),
+        ("main_health_concerns", "symptom_severity", "duration", "age", "weight", "gender"),
+        uses_herbs=True,
+    ),
+    SectionSpec(
+        "daily_schedule",
+        "📅 **DAILY WELLNESS SCHEDULE** (Dinacharya)",
+        (
+            "Morning routine (5-8 AM) with specific timings",
+            "Afternoon routine (12-2 PM)",
+            "Evening routine (6-8 PM)",
+            "Bedtime routine (9-10 PM)",
+        ),
+        ("main_health_concerns", "sleep_quality", "energy_level", "exercise", "eating_pattern", "time_commitment"),
+        uses_herbs=True,
+    ),
+    SectionSpec(
+        "four_week_plan",
+        "🍃 **4-WEEK TRANSFORMATION PLAN**",
+        (
+            "Week 1: Detox & Foundation Building",
+            "Week 2: Strengthening & Symptom Relief",
+            "Week 3: Optimization & Balance",
+            "Week 4: Maintenance & Progress Assessment",
+        ),
+        ("main_health_concerns", "symptom_severity", "duration", "primary_goal", "expectations", "time_commitment"),
+        uses_herbs=True,
+    ),
+    SectionSpec(
+        "safety",
+        "⚠️ **SAFETY & PRECAUTIONS**",
+        (
+            "Specific contraindications based on user profile",
+            "Herb-drug interaction warnings",
+            "Side effects monitoring guide",
+            "When to consult a practitioner",
+        ),
+        ("main_health_concerns", "previous_treatments", "age", "gender", "food_preferences"),
+        uses_herbs=True,
+    ),
+    SectionSpec(
+        "lifestyle",
+        "💡 **LIFESTYLE RECOMMENDATIONS**",
+        (
+            "Dietary adjustments for their diet type",
+            "Exercise suggestions based on their frequency",
+            "Stress management techniques",
+            "Sleep optimization strategies",
+        ),
+        (
+            "diet_type", "exercise", "water_intake", "food_preferences", "eating_pattern",
+            "sleep_quality", "energy_level", "stress_level", "digestion", "budget",
+        ),
+    ),
+)
+
+
+@dataclass
+class Section:
+    key: str
+    points: list[str]
+    note: str = ""
+
+    def to_json(self) -> str:
+        return json.dumps({"points": self.points, "note": self.note}, ensure_ascii=False)
+
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.*)")
+
+
+def parse_section(key: str, text: str) -> Section:
+    """Parse a JSON section answer, tolerating code fences and plain bullet lists."""
+    cleaned = _FENCE.sub("", text.strip())
+    try:
+        data = json.loads(cleaned)
+    except ValueError:
+        data = None
+    if isinstance(data, dict) and isinstance(data.get("points"), list):
+        points = [str(point).strip() for point in data["points"] if str(point).strip()]
+        note = str(data.get("note") or "").strip()
+    elif isinstance(data, list):
+        points, note = [str(point).strip() for point in data if str(point).strip()], ""
+    else:
+        lines = [line for line in cleaned.splitlines() if line.strip()]
+        points = [m.group(1).strip() for m in map(_BULLET.match, lines) if m] or [" ".join(lines)]
+        note = ""
+    if not any(points):
+        raise ValueError(f"Model returned an empty {key} section")
+    return Section(key=key, points=points, note=note)
+
+
+def _value(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value) or "None"
+    return str(value)
+
+
+def section_profile(spec: SectionSpec, user_data: dict) -> dict:
+    """The answers a section depends on (and nothing else)."""
+    profile = {name: user_data[name] for name in spec.depends_on if name in user_data}
+    if "main_health_concerns" in spec.depends_on and not profile.get("main_health_concerns"):
+        profile["main_health_concerns"] = ["General wellness"]
+    return profile
+
+
+def sections_independent_of(fields: Iterable[str]) -> tuple[SectionSpec, ...]:
+    """Sections whose prompt uses none of ``fields``."""
+    fields = set(fields)
+    return tuple(spec for spec in SECTIONS if not fields.intersection(spec.depends_on))
+
+
+def section_key(spec: SectionSpec, user_data: dict) -> str:
+    return profile_hash(section_profile(spec, user_data), f"section:{spec.key}:{SECTION_TEMPLATE_VERSION}")
+
+
+def build_section_prompt(spec: SectionSpec, user_data: dict, top_k: int | None = None) -> str:
+    top_k = config.PROMPT_TOP_K_HERBS if top_k is None else top_k
+    profile = section_profile(spec, user_data)
+    lines = [f"- {FIELD_LABELS.get(name, name)}: {_value(value)}" for name, value in profile.items()]
+    if all(name in spec.depends_on for name in SCORE_FIELDS):
+        lines.append(f"- Wellness Score: {calculate_wellness_score(user_data)}/10")
+    parts = [
+        "ACT as Dr. Ayurveda AI - a senior Ayurvedic practitioner with 25+ years experience.",
+        "USER PROFILE (relevant answers only):\n" + "\n".join(lines),
+    ]
+    if spec.uses_herbs:
+        kb = get_knowledge_base()
+        ranked = kb.rank_for_concerns(profile.get("main_health_concerns", []), limit=top_k)
+        herbs = build_herb_context(ranked, kb.herbs, top_k=top_k)
+        parts.append(
+            "AVAILABLE HERBS DATABASE (most relevant first; prefer the first herbs listed):\n" + herbs.json
+        )
+    title = spec.heading.split("**")[1]
+    parts.append(
+        f"Write ONLY the {title} section of a personalized Ayurvedic wellness plan, covering:\n"
+        + "\n".join(f"- {item}" for item in spec.instructions)
+    )
+    parts.append(
+        'Answer as JSON: {"points": [one actionable, specific point per string], "note": optional short note}. '
+        "Be very precise about dosages in mg/grams and exact timing, and use emojis where helpful."
+    )
+    return "\n\n".join(parts)
+
+
+@dataclass
+class SectionedPlan:
+    sections: dict[str, Section | None]
+    regenerated: list[str]
+    reused: list[str]
+    errors: dict[str, BaseException] = field(default_factory=dict)
+    models: dict[str, str] = field(default_factory=dict)
+    timings: GenerationTimings | None = None
+
+    @property
+    def complete(self) -> bool:
+        """Every section is present; a partial plan should not be cached as a whole."""
+        return not self.errors and all(section is not None for section in self.sections.values())
+
+    @property
+    def model(self) -> str | None:
+        """Model that wrote most of the regenerated sections."""
+        counts = Counter(self.models.values())
+        return counts.most_common(1)[0][0] if counts else None
+
+    def to_markdown(self, pending: str = "*⏳ Writing this section...*") -> str:
+        lines = []
+        for spec in SECTIONS:
+            lines += ["", spec.heading, ""]
+            section = self.sections.get(spec.key)
+            if section is None:
+                lines.append("- *Not available right now; use 🔁 Regenerate Plan to try again.*"
+                             if spec.key in self.errors else pending)
+                continue
+            lines += [f"- {point}" for point in section.points]
+            if section.note:
+                lines += ["", f"*{section.note}*"]
+        return "\n".join(lines).strip()
+
+    @property
+    def text(self) -> str:
+        return self.to_markdown()
+
+
+@dataclass
+class SectionReservation:
+    """Sections claimed as in flight before their request is scheduled."""
+
+    user_data: dict
+    # Section key -> the future the reserving caller will resolve.
+    futures: dict[str, Future]
+
+    def __len__(self) -> int:
+        return len(self.futures)
+
+    @property
+    def keys(self) -> list[str]:
+        return list(self.futures)
+
+
+class SectionedPlanner:
+    """Generates the five plan sections in parallel, reusing cached sections."""
+
+    def __init__(self, router, cache, max_workers: int = len(SECTIONS)):
+        self.router = router
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan-sections")
+        # Section key -> the future writing it; reentrant because a finished
+        # future runs its done-callback straight away, under the lock.
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.RLock()
+
+    def _submit(self, spec: SectionSpec, user_data: dict, key: str) -> Future:
+        with self._lock:
+            future = self._in_flight.get(key)
+            # A released reservation may linger until its done-callback runs.
+            if future is None or future.cancelled():
+                future = self._in_flight[key] = self._executor.submit(self._generate_section, spec, user_data)
+                future.add_done_callback(lambda done: self._finished(key, done))
+            return future
+
+    def _fulfil(self, placeholder: Future, spec: SectionSpec, user_data: dict) -> None:
+        if not placeholder.set_running_or_notify_cancel():
+            return
+        try:
+            placeholder.set_result(self._generate_section(spec, user_data))
+        except BaseException as error:
+            placeholder.set_exception(error)
+
+    def _finished(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def _generate_section(self, spec: SectionSpec, user_data: dict):
+        result = self.router.generate(build_section_prompt(spec, user_data), generation_config=GENERATION_CONFIG)
+        return parse_section(spec.key, result.text), result
+
+    def invalidate(self, user_data: dict) -> None:
+        for spec in SECTIONS:
+            self.cache.invalidate(section_key(spec, user_data))
+
+    def missing(self, user_data: dict, only: Iterable[str] | None = None) -> list[SectionSpec]:
+        """Sections (of those named in ``only``) neither cached nor being written for these answers."""
+        missing = []
+        for spec in SECTIONS:
+            if only is not None and spec.key not in only:
+                continue
+            key = section_key(spec, user_data)
+            with self._lock:
+                in_flight = key in self._in_flight
+            if not in_flight and key not in self.cache:
+                missing.append(spec)
+        return missing
+
+    def reserve(self, user_data: dict, only: Iterable[str] | None = None) -> SectionReservation:
+        """Mark the missing sections (of those in ``only``) as being written, before any request is sent.
+
+        Other callers join them instead of requesting them again. Pass the
+        reservation to :meth:`generate`, and :meth:`release` it whatever
+        happens, so sections that were never written free up.
+        """
+        futures = {}
+        for spec in self.missing(user_data, only):
+            key = section_key(spec, user_data)
+            with self._lock:
+                if key in self._in_flight:
+                    continue
+                future = self._in_flight[key] = Future()
+                future.add_done_callback(lambda done, key=key: self._finished(key, done))
+            futures[spec.key] = future
+        return SectionReservation(dict(user_data), futures)
+
+    def release(self, reservation: SectionReservation) -> None:
+        """Give up the reserved sections that no :meth:`generate` call has started; callers joined to them write them instead."""
+        for future in reservation.futures.values():
+            future.cancel()
+
+    def generate(self, user_data: dict, on_section: Callable[[SectionedPlan], None] | None = None,
+                 only: Iterable[str] | None = None, reserved: SectionReservation | None = None) -> SectionedPlan:
+        """Return every section (or those named in ``only``), regenerating only the ones whose inputs changed.
+
+        ``on_section`` is called on the caller's thread each time a section
+        arrives, so a UI can paint sections as they complete. With
+        ``reserved``, only the reserved sections are written (by this call).
+        """
+        start = time.perf_counter()
+        if reserved is not None and only is None:
+            only = reserved.keys
+        only = None if only is None else set(only)
+        plan = SectionedPlan(sections={spec.key: None for spec in SECTIONS}, regenerated=[], reused=[])
+        pending = {}
+        for spec in SECTIONS:
+            if only is not None and spec.key not in only:
+                continue
+            key = section_key(spec, user_data)
+            placeholder = reserved.futures.get(spec.key) if reserved is not None else None
+            if placeholder is not None:
+                self._executor.submit(self._fulfil, placeholder, spec, user_data)
+                pending[placeholder] = (spec, key)
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                try:
+                    plan.sections[spec.key] = parse_section(spec.key, cached.text)
+                    plan.reused.append(spec.key)
+                    continue
+                except ValueError:
+                    self.cache.invalidate(key)
+            pending[self._submit(spec, user_data, key)] = (spec, key)
+
+        first_section_s = None
+        usage: dict[str, int] = {}
+        requested = len(pending)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                spec, key = pending.pop(future)
+                if future.cancelled():
+                    if reserved is None or reserved.futures.get(spec.key) is not future:
+                        # Joined a reservation that was released before it ran: write the section here.
+                        pending[self._submit(spec, user_data, key)] = (spec, key)
+                    continue
+                try:
+                    section, result = future.result()
+                except Exception as error:
+                    plan.errors[spec.key] = error
+                    continue
+                if first_section_s is None:
+                    first_section_s = time.perf_counter() - start
+                plan.sections[spec.key] = section
+                plan.regenerated.append(spec.key)
+                plan.models[spec.key] = result.model
+                for name, count in (result.timings.usage or {}).items():
+                    usage[name] = usage.get(name, 0) + count
+                self.cache.put(key, CachedPlan(text=section.to_json(), model=result.model, meta=result.timings.as_dict()))
+                if on_section is not None:
+                    on_section(plan)
+
+        if requested and len(plan.errors) == requested and not plan.reused:
+            raise AllModelsFailed([
+                (name, error) for spec_key, err in plan.errors.items()
+                for name, error in (getattr(err, "errors", None) or [(spec_key, err)])
+            ])
+        total_s = time.perf_counter() - start
+        plan.timings = GenerationTimings(
+            first_token_s=first_section_s if first_section_s is not None else total_s,
+            total_s=total_s,
+            chunks=len(plan.regenerated),
+            streamed=False,
+            usage=usage or None,
+        )
+        return plan
@@ -0,0 +1,223 @@
+"""Asyncio HTTP service for plan generation.
+
+    python -m ayurveda.service --port 8080
+
+Endpoints:
+
+- ``POST /plan`` – body is a ``user_data`` JSON object; returns the plan.
+- ``GET /stats`` – queue depth, in-flight upstream calls and cache counters.
+- ``GET /metrics`` – Prometheus text format (stages, model attempts, tokens).
+- ``GET /healthz`` – liveness probe.
+
+Concurrent requests for the same profile share one upstream call
+(single-flight), and blocking SDK calls run on a bounded thread pool so they
+never stall the event loop. Uses only the standard library.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Awaitable, Callable
+
+from ayurveda import config
+from ayurveda.backends import backend_from_env
+from ayurveda.data import HERBS_DATABASE, concern_index
+from ayurveda.local_planner import build_local_plan
+from ayurveda.metrics import get_registry
+from ayurveda.plan_cache import CachedPlan, profile_hash
+from ayurveda.prompts import PROMPT_TEMPLATE_VERSION, build_prompt
+from ayurveda.router import AllModelsFailed
+
+MAX_BODY_BYTES = 1 << 20
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shield so one caller disconnecting doesn't cancel the shared call.
+        return await asyncio.shield(task)
+
+
+class PlanService:
+    def __init__(self, router, plan_cache, max_concurrency: int = 8, metrics=None):
+        self.router = router
+        self.metrics = metrics or get_registry()
+        self.plan_cache = plan_cache
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="plan-service")
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.flights = SingleFlight()
+        self.requests = 0
+        self.queued = 0
+        self.in_flight = 0
+        self.errors = 0
+
+    def _generate_blocking(self, user_data: dict, key: str) -> dict:
+        with self.metrics.span("prompt_build"):
+            plan_prompt = build_prompt(user_data)
+        try:
+            with self.metrics.span("generation", streamed=False):
+                result = self.router.generate(plan_prompt.text)
+        except AllModelsFailed as error:
+            local_plan = build_local_plan(user_data, HERBS_DATABASE, concern_index())
+            return {"source": "local", "plan": local_plan.to_markdown(), "error": str(error)}
+        meta = {**result.timings.as_dict(), "prompt_tokens": plan_prompt.tokens}
+        self.plan_cache.put(key, CachedPlan(text=result.text, model=result.model, meta=meta))
+        return {"source": "gemini", "model": result.model, "plan": result.text, "timings": meta}
+
+    async def _generate(self, user_data: dict, key: str) -> dict:
+        self.queued += 1
+        try:
+            with self.metrics.span("queue_wait"):
+                await self.slots.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._generate_blocking, user_data, key)
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+
+    async def plan(self, user_data: dict) -> dict:
+        self.requests += 1
+        key = profile_hash(user_data, PROMPT_TEMPLATE_VERSION)
+        cached = self.plan_cache.get(key)
+        if cached:
+            return {"source": "cache", "model": cached.model, "plan": cached.text, "profile_hash": key}
+        result = await self.flights.do(key, lambda: self._generate(user_data, key))
+        return {**result, "profile_hash": key}
+
+    def record_error(self, error: Exception) -> None:
+        self.errors += 1
+        self.metrics.inc("ayurveda_service_errors_total", error=type(error).__name__)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "distinct_in_flight": len(self.flights),
+            "coalesced": self.flights.coalesced,
+            "errors": self.errors,
+            "plan_cache": self.plan_cache.stats(),
+            "models": self.router.stats(),
+        }
+
+
+async def _write_response(writer: asyncio.StreamWriter, status: HTTPStatus, payload: dict | str) -> None:
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode("ascii") + body)
+    await writer.drain()
+
+
+async def handle_connection(service: PlanService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            return
+        method, path = request_line[0], request_line[1].split("?", 1)[0]
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if method == "GET" and path == "/healthz":
+            await _write_response(writer, HTTPStatus.OK, {"status": "ok"})
+        elif method == "GET" and path == "/stats":
+            await _write_response(writer, HTTPStatus.OK, service.stats())
+        elif method == "GET" and path == "/metrics":
+            await _write_response(writer, HTTPStatus.OK, service.metrics.render_prometheus())
+        elif method == "POST" and path == "/plan":
+            length = headers.get("content-length", "")
+            if not length.isdigit():
+                await _write_response(writer, HTTPStatus.BAD_REQUEST, {"error": "missing or invalid Content-Length"})
+                return
+            if int(length) > MAX_BODY_BYTES:
+                await _write_response(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "body too large"})
+                return
+            try:
+                body = await reader.readexactly(int(length))
+            except asyncio.IncompleteReadError:
+                await _write_response(writer, HTTPStatus.BAD_REQUEST, {"error": "body shorter than Content-Length"})
+                return
+            try:
+                user_data = json.loads(body or b"null")
+            except ValueError as error:
+                await _write_response(writer, HTTPStatus.BAD_REQUEST, {"error": f"invalid JSON: {error}"})
+                return
+            if not isinstance(user_data, dict):
+                await _write_response(writer, HTTPStatus.BAD_REQUEST, {"error": "body must be a user_data object"})
+                return
+            try:
+                result = await service.plan(user_data)
+            except Exception as error:
+                # Backend or cache failures other than AllModelsFailed still get a response.
+                service.record_error(error)
+                await _write_response(
+                    writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"plan generation failed ({type(error).__name__})"}
+                )
+                return
+            await _write_response(writer, HTTPStatus.OK, result)
+        else:
+            await _write_response(writer, HTTPStatus.NOT_FOUND, {"error": f"no route for {method} {path}"})
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int, max_concurrency: int) -> None:
+    backend = backend_from_env()
+    api_key = config.gemini_api_key()
+    if backend.requires_api_key and not api_key:
+        print("GEMINI_API_KEY is not set; serving local plans only")
+    backend.configure(api_key)
+    service = PlanService(config.router_from_env(backend), config.plan_cache_from_env(), max_concurrency=max_concurrency)
+    server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), host, port)
+    print(f"Serving plans on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="HTTP service for Ayurvedic wellness plan generation.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=8, help="max concurrent upstream calls (default: 8)")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""Checkpointed session state, so any app worker can resume any session.
+
+Streamlit keeps ``st.session_state`` in the memory of the process that owns
+the websocket, so a worker restart or a load balancer without sticky sessions
+loses every assessment in progress. With ``AYURVEDA_SESSION_STORE`` the app
+checkpoints the keys in :data:`SESSION_KEYS` after each wizard step and
+script run, and a browser reconnecting with ``?sid=<session id>`` is
+rehydrated by whichever worker it lands on.
+
+Checkpoints are compact JSON, zlib-compressed above
+:data:`COMPRESS_MIN_BYTES`, and written behind: :meth:`SessionStore.save`
+only records the latest state per session, and a writer thread stores
+everything pending every ``flush_interval_s`` as one batch, so a burst of
+reruns costs one write per session. Unchanged state is not re-queued, and a
+batch that fails to write is queued again (behind any newer checkpoint of the
+same session) for the next flush.
+
+:class:`SQLiteSessionStore` suits several workers on one host (WAL mode);
+:class:`FileSessionStore` writes one file per session into a directory that
+may live on shared storage.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+# Session state that survives a reconnect; widget values are rebuilt from user_data.
+SESSION_KEYS = ("user_data", "current_step", "show_results", "assessment_runs", "assessment_cpu_s")
+
+COMPRESS_MIN_BYTES = 512
+
+logger = logging.getLogger(__name__)
+
+# Session ids come from the URL, so only ids shaped like the app's own are accepted.
+_SESSION_ID = re.compile(r"[A-Za-z0-9_-]{8,64}")
+
+
+def valid_session_id(session_id) -> bool:
+    return isinstance(session_id, str) and _SESSION_ID.fullmatch(session_id) is not None
+
+
+def encode_state(state: dict) -> bytes:
+    raw = json.dumps(state, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return b"z" + zlib.compress(raw, 6)
+    return b"j" + raw
+
+
+def decode_state(blob: bytes) -> dict:
+    kind, body = blob[:1], blob[1:]
+    if kind == b"z":
+        body = zlib.decompress(body)
+    elif kind != b"j":
+        raise ValueError(f"unknown session encoding {kind!r}")
+    return json.loads(body.decode("utf-8"))
+
+
+class SessionStore:
+    """Write-behind base class; subclasses implement ``_write``, ``_read`` and ``_purge``."""
+
+    # Sessions whose last checkpoint digest is kept to skip unchanged saves.
+    max_digests = 10_000
+
+    def __init__(self, flush_interval_s: float = 0.5, ttl_seconds: float = 7 * 24 * 3600,
+                 purge_interval_s: float = 3600.0, metrics=None):
+        self.flush_interval_s = flush_interval_s
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval_s = purge_interval_s
+        self.metrics = metrics
+        self._pending: dict[str, tuple[bytes, float]] = {}
+        # The batch the writer is storing right now, still readable by load().
+        self._writing: dict[str, tuple[bytes, float]] = {}
+        self._digests: OrderedDict[str, int] = OrderedDict()
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._taken = 0
+        self._done = 0
+        self._closing = False
+        self._last_purge = 0.0
+        self.checkpoints = 0
+        self.unchanged = 0
+        self.writes = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.rehydrated = 0
+        self.not_found = 0
+        self._writer = threading.Thread(target=self._write_loop, name="session-store-writer", daemon=True)
+        self._writer.start()
+
+    # -- backend hooks -----------------------------------------------------
+
+    def _write(self, items: list[tuple[str, bytes, float]]) -> None:
+        """Store ``(session_id, blob, updated_at)`` rows, replacing older ones."""
+        raise NotImplementedError
+
+    def _read(self, session_id: str) -> tuple[bytes, float] | None:
+        raise NotImplementedError
+
+    def _purge(self, before: float) -> int:
+        """Drop sessions last written before ``before``; returns how many."""
+        raise NotImplementedError
+
+    # -- public API --------------------------------------------------------
+
+    def save(self, session_id: str, state: dict) -> bool:
+        """Queue a checkpoint; False if it matches the session's last one."""
+        if not valid_session_id(session_id):
+            raise ValueError(f"invalid session id {session_id!r}")
+        blob = encode_state(state)
+        digest = zlib.crc32(blob)
+        with self._cond:
+            if self._digests.get(session_id) == digest:
+                self.unchanged += 1
+                return False
+            self._digests[session_id] = digest
+            self._digests.move_to_end(session_id)
+            while len(self._digests) > self.max_digests:
+                self._digests.popitem(last=False)
+            self._pending[session_id] = (blob, time.time())
+            self.checkpoints += 1
+        if self.metrics is not None:
+            self.metrics.inc("ayurveda_session_checkpoints_total")
+        return True
+
+    def load(self, session_id: str) -> dict | None:
+        """The session's last checkpoint (including one not yet written), or None."""
+        state = None
+        if valid_session_id(session_id):
+            with self._cond:
+                pending = self._pending.get(session_id) or self._writing.get(session_id)
+            stored = pending or self._safe_read(session_id)
+            if stored is not None and time.time() - stored[1] <= self.ttl_seconds:
+                try:
+                    state = decode_state(stored[0])
+                except (ValueError, zlib.error):
+                    state = None
+        with self._cond:
+            if state is None:
+                self.not_found += 1
+            else:
+                self.rehydrated += 1
+                # Resuming with the same state must not write it again.
+                self._digests[session_id] = zlib.crc32(stored[0])
+        if self.metrics is not None:
+            self.metrics.inc("ayurveda_session_rehydrations_total", result="hit" if state is not None else "miss")
+        return state
+
+    def _safe_read(self, session_id: str) -> tuple[bytes, float] | None:
+        try:
+            return self._read(session_id)
+        except (OSError, sqlite3.Error):
+            logger.warning("reading session %s failed", session_id, exc_info=True)
+            return None
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Write everything saved so far now; False if that took longer than ``timeout``."""
+        with self._cond:
+            target = self._taken + 1
+            self._wake.set()
+            return self._cond.wait_for(lambda: self._done >= target, timeout)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closing = True
+        self._wake.set()
+        self._writer.join()
+
+    # -- writer ------------------------------------------------------------
+
+    def _write_loop(self) -> None:
+        while True:
+            # Checkpoints arriving during the interval coalesce into one batch.
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            with self._cond:
+                batch, self._pending = self._pending, {}
+                self._writing = batch
+                self._taken += 1
+                closing = self._closing
+            try:
+                if batch:
+                    self._write_batch(batch, closing)
+                now = time.time()
+                if now - self._last_purge >= self.purge_interval_s:
+                    self._last_purge = now
+                    try:
+                        self._purge(now - self.ttl_seconds)
+                    except Exception:
+                        logger.exception("purging expired sessions failed")
+            finally:
+                # Whatever happened, flush() waiters are released and the loop goes on.
+                with self._cond:
+                    self._writing = {}
+                    self._done += 1
+                    self._cond.notify_all()
+            if closing:
+                return
+
+    def _write_batch(self, batch: dict[str, tuple[bytes, float]], closing: bool) -> None:
+        items = [(session_id, blob, updated_at) for session_id, (blob, updated_at) in batch.items()]
+        try:
+            self._write(items)
+        except Exception:
+            self.write_errors += len(items)
+            with self._cond:
+                # Retry with the next batch, unless the session has saved something newer since.
+                for session_id, stored in batch.items():
+                    self._pending.setdefault(session_id, stored)
+            if closing:
+                logger.exception("session store closed with %d checkpoint(s) unwritten", len(items))
+            else:
+                logger.exception("writing %d session checkpoint(s) failed; retrying", len(items))
+            return
+        self.writes += len(items)
+        self.batches += 1
+        if self.metrics is not None:
+            self.metrics.inc("ayurveda_session_store_writes_total", len(items))
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "checkpoints": self.checkpoints,
+                "unchanged": self.unchanged,
+                "writes": self.writes,
+                "batches": self.batches,
+                "pending": len(self._pending),
+                "write_errors": self.write_errors,
+                "rehydrated": self.rehydrated,
+                "not_found": self.not_found,
+            }
+
+
+class FileSessionStore(SessionStore):
+    """One ``<session id>.session`` file per session in ``directory``."""
+
+    def __init__(self, directory: str, **kwargs):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(**kwargs)
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.session")
+
+    def _write(self, items: list[tuple[str, bytes, float]]) -> None:
+        for session_id, blob, updated_at in items:
+            # Temp file + rename, so a worker reading concurrently never sees half a checkpoint.
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(blob)
+                os.utime(tmp_path, (updated_at, updated_at))
+                os.replace(tmp_path, self._path(session_id))
+            except OSError:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+
+    def _read(self, session_id: str) -> tuple[bytes, float] | None:
+        try:
+            with open(self._path(session_id), "rb") as fh:
+                return fh.read(), os.fstat(fh.fileno()).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def _purge(self, before: float) -> int:
+        purged = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".session") and entry.stat().st_mtime < before:
+                    try:
+                        os.remove(entry.path)
+                        purged += 1
+                    except OSError:
+                        pass
+        return purged
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    state BLOB NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions (updated_at);
+"""
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in one SQLite table (WAL mode); each batch is one transaction."""
+
+    def __init__(self, path: str, **kwargs):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+        super().__init__(**kwargs)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        # Per thread: the writer thread and each script thread get their own.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _write(self, items: list[tuple[str, bytes, float]]) -> None:
+        with self._conn() as conn:
+            conn.executemany("INSERT OR REPLACE INTO sessions (session_id, state, updated_at) VALUES (?, ?, ?)", items)
+
+    def _read(self, session_id: str) -> tuple[bytes, float] | None:
+        row = self._conn().execute(
+            "SELECT state, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return (bytes(row[0]), row[1]) if row else None
+
+    def _purge(self, before: float) -> int:
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (before,)).rowcount
@@ -0,0 +1,287 @@
+"""Approximate plan cache: near-identical assessments share one plan.
+
+Most assessments differ from an earlier one only by a slider point or a few
+years/kilograms, so exact profile hashes rarely repeat. Here every answer has
+a :class:`FieldPolicy`: numeric answers match within a per-field tolerance,
+the concern list is normalized to a case-folded set, other answers must match
+exactly after normalization, and the name is ignored. Profiles are grouped by
+a hash of their exact fields; a lookup scans that (small) group for the
+closest stored profile whose numeric answers are all within tolerance. Groups
+and plans both live in a :class:`~ayurveda.plan_cache.PlanCache`, so a shared
+disk tier shares them across processes too.
+
+Fields in :data:`NEVER_APPROXIMATE` (allergies and food preferences, previous
+treatments) can never be given a tolerance. Every mention of the user's full
+or first name is swapped for a placeholder when the plan is stored and filled
+back in for whoever it is served to, so personalization costs a string
+replace rather than a model call. A plan that would still mention the name
+(a surname on its own, say) is neither stored nor served. Plans are keyed on
+the prompt template version, so a new prompt never serves plans written for
+an old one.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from ayurveda.plan_cache import CachedPlan, PlanCache, profile_hash
+
+NAME_PLACEHOLDER = "{{name}}"
+FIRST_NAME_PLACEHOLDER = "{{first_name}}"
+
+# Plans served minutes to days after they were written.
+STALENESS_BUCKETS = (60.0, 300.0, 900.0, 3600.0, 4 * 3600.0, 12 * 3600.0, 24 * 3600.0, 72 * 3600.0)
+
+
+@dataclass(frozen=True)
+class FieldPolicy:
+    # "exact": must match after normalization; "tolerance": numeric answers
+    # match when within ``tolerance``; "ignore": not compared (personalized
+    # on the way out instead).
+    mode: str = "exact"
+    tolerance: float = 0.0
+
+    def __post_init__(self):
+        if self.mode not in ("exact", "tolerance", "ignore"):
+            raise ValueError(f"unknown field policy {self.mode!r}")
+        if self.mode == "tolerance" and self.tolerance < 0:
+            raise ValueError("tolerance must not be negative")
+
+    def normalize(self, value):
+        if isinstance(value, (list, tuple, set)):
+            return sorted({" ".join(str(v).split()).casefold() for v in value})
+        if isinstance(value, str):
+            return " ".join(value.split()).casefold()
+        return value
+
+
+EXACT = FieldPolicy("exact")
+IGNORE = FieldPolicy("ignore")
+
+
+def within(tolerance: float) -> FieldPolicy:
+    return FieldPolicy("tolerance", tolerance)
+
+
+NEVER_APPROXIMATE = frozenset({"food_preferences", "previous_treatments"})
+
+DEFAULT_POLICIES = {
+    "name": IGNORE,
+    "age": within(3),
+    "weight": within(3),
+    "height": within(5),
+    "symptom_severity": within(1),
+    "sleep_quality": within(1),
+    "energy_level": within(1),
+    "stress_level": within(1),
+    "water_intake": within(2),
+}
+
+# Stored profiles kept per group of identical exact fields (newest first).
+MAX_GROUP_SIZE = 32
+
+
+def policies_from_spec(spec: str, base: dict[str, FieldPolicy] | None = None) -> dict[str, FieldPolicy]:
+    """Policies from ``"age=5,weight=10,budget=exact,gender=ignore"`` on top of ``base``."""
+    policies = dict(DEFAULT_POLICIES if base is None else base)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        name, value = name.strip(), value.strip()
+        if value in ("exact", "ignore"):
+            policies[name] = FieldPolicy(value)
+        else:
+            policies[name] = within(float(value))
+    check_policies(policies)
+    return policies
+
+
+def check_policies(policies: dict[str, FieldPolicy]) -> None:
+    loose = sorted(name for name in NEVER_APPROXIMATE if policies.get(name, EXACT).mode != "exact")
+    if loose:
+        raise ValueError(f"{', '.join(loose)} must always match exactly")
+
+
+def _number(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass
+class SimilarPlan:
+    plan: CachedPlan
+    # Plan text personalized for the requesting user.
+    text: str
+    exact: bool
+    approximated: list[str]
+    staleness_s: float
+
+
+class SimilarityCache:
+    """Tolerance-matched profile -> plan cache on top of a :class:`PlanCache`."""
+
+    def __init__(self, cache: PlanCache, policies: dict[str, FieldPolicy] | None = None,
+                 template_version=None, metrics=None):
+        self.cache = cache
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        check_policies(self.policies)
+        self.template_version = template_version
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.approximate_hits = 0
+        self.misses = 0
+        self._staleness_total = 0.0
+        self._staleness_max = 0.0
+
+    def _split(self, user_data: dict) -> tuple[dict, dict[str, float]]:
+        """(answers that must match exactly, numeric answers matched within tolerance)."""
+        exact, numeric = {}, {}
+        for name, value in user_data.items():
+            policy = self.policies.get(name, EXACT)
+            if policy.mode == "ignore":
+                continue
+            number = _number(value) if policy.mode == "tolerance" else None
+            if number is None:
+                exact[name] = policy.normalize(value)
+            else:
+                numeric[name] = number
+        return exact, numeric
+
+    def _group_key(self, exact: dict) -> str:
+        return profile_hash(exact, f"similar-group:{self.template_version}")
+
+    def _plan_key(self, exact: dict, numeric: dict[str, float]) -> str:
+        return profile_hash({**exact, **numeric}, f"similar:{self.template_version}")
+
+    def _distance(self, numeric: dict[str, float], stored: dict[str, float]) -> float | None:
+        """Sum of tolerance-scaled differences, or None if any field is out of tolerance."""
+        if numeric.keys() != stored.keys():
+            return None
+        distance = 0.0
+        for name, value in numeric.items():
+            delta, tolerance = abs(value - stored[name]), self.policies[name].tolerance
+            if delta > tolerance:
+                return None
+            distance += delta / tolerance if tolerance else 0.0
+        return distance
+
+    def _members(self, group_key: str) -> list[dict]:
+        group = self.cache.get(group_key)
+        return json.loads(group.text) if group is not None else []
+
+    @staticmethod
+    def _name(user_data: dict) -> str:
+        return " ".join(str(user_data.get("name") or "").split())
+
+    @staticmethod
+    def _name_digests(name: str) -> list[str]:
+        # Stored with the plan instead of the name itself, to check it on the way out.
+        return sorted({hashlib.sha256(word.casefold().encode("utf-8")).hexdigest()[:16]
+                       for word in re.findall(r"\w+", name) if len(word) >= 2})
+
+    @classmethod
+    def _mentions(cls, text: str, digests) -> bool:
+        digests = set(digests)
+        return bool(digests) and not digests.isdisjoint(cls._name_digests(text))
+
+    def get(self, user_data: dict) -> SimilarPlan | None:
+        """The closest stored plan within tolerance, personalized for this user."""
+        exact, numeric = self._split(user_data)
+        scored = []
+        for member in self._members(self._group_key(exact)):
+            distance = self._distance(numeric, member["values"])
+            if distance is not None:
+                scored.append((distance, member))
+        for _, member in sorted(scored, key=lambda pair: pair[0]):
+            plan = self.cache.get(member["key"])
+            # Plans without name digests predate the check and are not trusted.
+            if plan is None or "name_digests" not in plan.meta or self._mentions(plan.text, plan.meta["name_digests"]):
+                continue
+            approximated = sorted(name for name, value in numeric.items() if member["values"][name] != value)
+            staleness_s = max(0.0, time.time() - plan.created_at)
+            self._record("approximate" if approximated else "exact", staleness_s)
+            return SimilarPlan(
+                plan=plan,
+                text=self.personalize(plan.text, user_data),
+                exact=not approximated,
+                approximated=approximated,
+                staleness_s=staleness_s,
+            )
+        self._record("miss")
+        return None
+
+    def depersonalize(self, text: str, user_data: dict) -> str:
+        """Replace every whole-word mention of the full and first name with a placeholder.
+
+        Matching ignores case, so a first name that is also a word ("Rose",
+        "Sage") is replaced in "rose water" too; that plan reads oddly for
+        the next user but never names this one.
+        """
+        name = self._name(user_data)
+        first = name.split(" ")[0]
+        for part, placeholder in ((name, NAME_PLACEHOLDER), (first, FIRST_NAME_PLACEHOLDER)):
+            if len(part) >= 2:
+                text = re.sub(rf"(?<!\w){re.escape(part)}(?!\w)", placeholder, text, flags=re.IGNORECASE)
+        return text
+
+    def personalize(self, text: str, user_data: dict) -> str:
+        name = self._name(user_data)
+        return text.replace(NAME_PLACEHOLDER, name or "there").replace(
+            FIRST_NAME_PLACEHOLDER, name.split(" ")[0] or "there"
+        )
+
+    def put(self, user_data: dict, plan: CachedPlan) -> bool:
+        """Store a depersonalized plan and add it to its group; False if it still mentions the name."""
+        exact, numeric = self._split(user_data)
+        plan_key, group_key = self._plan_key(exact, numeric), self._group_key(exact)
+        text, digests = self.depersonalize(plan.text, user_data), self._name_digests(self._name(user_data))
+        if self._mentions(text, digests):
+            return False
+        self.cache.put(plan_key, CachedPlan(
+            text=text,
+            model=plan.model,
+            created_at=plan.created_at,
+            meta={**plan.meta, "name_digests": digests},
+        ))
+        with self._lock:
+            members = [m for m in self._members(group_key) if m["key"] != plan_key]
+            members.insert(0, {"key": plan_key, "values": numeric})
+            self.cache.put(group_key, CachedPlan(text=json.dumps(members[:MAX_GROUP_SIZE]), model=None))
+        return True
+
+    def _record(self, result: str, staleness_s: float | None = None) -> None:
+        with self._lock:
+            if result == "miss":
+                self.misses += 1
+            else:
+                if result == "exact":
+                    self.exact_hits += 1
+                else:
+                    self.approximate_hits += 1
+                self._staleness_total += staleness_s
+                self._staleness_max = max(self._staleness_max, staleness_s)
+        if self.metrics is not None:
+            self.metrics.inc("ayurveda_similarity_cache_lookups_total", result=result)
+            if staleness_s is not None:
+                self.metrics.observe(
+                    "ayurveda_similarity_cache_staleness_seconds", staleness_s, buckets=STALENESS_BUCKETS, result=result
+                )
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.exact_hits + self.approximate_hits
+            lookups = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "approximate_hits": self.approximate_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "mean_staleness_s": self._staleness_total / hits if hits else 0.0,
+                "max_staleness_s": self._staleness_max,
+            }
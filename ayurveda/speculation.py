@@ -0,0 +1,120 @@
+"""Speculative plan generation while the user fills in the last wizard step.
+
+When a session reaches the final step, the app already knows every answer
+except the last step's, which arrive together when its form is submitted.
+For sectioned plans, the app uses :class:`Speculator` to write the sections
+that do not depend on the last step (see
+:func:`~ayurveda.sections.sections_independent_of`) on a background thread,
+keyed on those sections' cache keys. When the user presses "🎯 Generate AI
+Plan" the results page claims the run: if the key still matches it waits for
+the run and reuses its sections from the cache, and if earlier answers were
+edited since, the run is discarded and counted as wasted.
+``ayurveda_speculations_total`` by outcome gives the wasted ratio.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+
+
+@dataclass
+class _Run:
+    key: str
+    future: Future
+    on_cancel: Callable[[], None] | None = None
+    started_at: float = field(default_factory=time.monotonic)
+
+
+class Speculator:
+    """Per-session speculative runs on a small shared thread pool."""
+
+    def __init__(self, max_workers: int = 2, max_age_s: float = 900.0, metrics=None):
+        self.max_workers = max_workers
+        # Runs never claimed (the session left) are dropped after this long.
+        self.max_age_s = max_age_s
+        self.metrics = metrics
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculative-plan")
+        self._runs: dict[str, _Run] = {}
+        self._lock = threading.Lock()
+        self.outcomes = {"started": 0, "used": 0, "wasted": 0, "skipped": 0}
+
+    def _in_flight(self) -> int:
+        return sum(not run.future.done() for run in self._runs.values())
+
+    def has(self, session_id: str, key: str) -> bool:
+        with self._lock:
+            run = self._runs.get(session_id)
+            return run is not None and run.key == key
+
+    def start(
+        self,
+        session_id: str,
+        key: str,
+        generate: Callable[[], object],
+        on_cancel: Callable[[], None] | None = None,
+    ) -> bool:
+        """Speculate for ``key``, replacing this session's run for other answers; False if skipped.
+
+        ``on_cancel`` runs if the speculation is discarded before it started
+        (e.g. to release a queued scheduler ticket).
+        """
+        with self._lock:
+            now = time.monotonic()
+            for other, run in list(self._runs.items()):
+                if other == session_id and run.key == key:
+                    return True
+                if other == session_id or now - run.started_at > self.max_age_s:
+                    self._discard(other, run)
+            # Never queue behind other speculation: a late result is a wasted one.
+            if self._in_flight() >= self.max_workers:
+                self._record("skipped")
+                return False
+            self._runs[session_id] = _Run(key, self._executor.submit(generate), on_cancel=on_cancel)
+            self._record("started")
+            return True
+
+    def claim(self, session_id: str, key: str) -> Future | None:
+        """The speculative run for ``key``, or None (discarding a run for a different key)."""
+        with self._lock:
+            run = self._runs.pop(session_id, None)
+            if run is None:
+                return None
+            if run.key != key:
+                self._discard(session_id, run, pop=False)
+                return None
+            self._record("used")
+        if self.metrics is not None:
+            self.metrics.observe("ayurveda_speculation_head_start_seconds", time.monotonic() - run.started_at)
+        return run.future
+
+    def discard(self, session_id: str) -> None:
+        """Drop a session's run, e.g. when it starts a new assessment."""
+        with self._lock:
+            run = self._runs.get(session_id)
+            if run is not None:
+                self._discard(session_id, run)
+
+    def _discard(self, session_id: str, run: _Run, pop: bool = True) -> None:
+        if pop:
+            self._runs.pop(session_id, None)
+        # Only a run that has not started can be cancelled; a running one finishes unused.
+        if run.future.cancel() and run.on_cancel is not None:
+            run.on_cancel()
+        self._record("wasted")
+
+    def _record(self, outcome: str) -> None:
+        self.outcomes[outcome] += 1
+        if self.metrics is not None:
+            self.metrics.inc("ayurveda_speculations_total", outcome=outcome)
+
+    def stats(self) -> dict:
+        with self._lock:
+            settled = self.outcomes["used"] + self.outcomes["wasted"]
+            return {
+                **self.outcomes,
+                "in_flight": self._in_flight(),
+                "wasted_ratio": self.outcomes["wasted"] / settled if settled else 0.0,
+            }
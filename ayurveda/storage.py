@@ -0,0 +1,235 @@
+"""Permanent plan storage on SQLite (WAL mode).
+
+Saved plans keep the assessment, its profile hash, the model that wrote the
+plan, the plan text and generation timings. Lookups by user and by profile
+hash are indexed, so a returning user or an identical profile is served from
+storage instead of another Gemini call. Plans belong to an owner key from
+:func:`owner_key` (a signed-in user or a persisted session), never to
+anything typed into the assessment. Writes go through a single writer
+thread so the Streamlit script never waits on disk.
+
+    python -m ayurveda.storage export plans.jsonl
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import IO, Iterator
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    id INTEGER PRIMARY KEY,
+    user_key TEXT NOT NULL,
+    profile_hash TEXT NOT NULL,
+    model TEXT,
+    plan TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    timing TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plans_user ON plans (user_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_plans_profile_hash ON plans (profile_hash, created_at);
+"""
+
+_COLUMNS = "id, user_key, profile_hash, model, plan, profile, timing, created_at"
+_STOP = object()
+
+
+def owner_key(kind: str, identity: str) -> str:
+    """Key for "the same user": ``kind`` is ``user`` (authenticated) or ``session``.
+
+    The prefix keeps identities of different kinds, and rows saved before
+    owners existed (keyed by the entered name), from ever matching.
+    """
+    if kind not in ("user", "session") or not identity:
+        raise ValueError(f"invalid plan owner {kind}:{identity!r}")
+    return f"{kind}:{identity}"
+
+
+@dataclass
+class StoredPlan:
+    id: int | None
+    user_key: str
+    profile_hash: str
+    model: str | None
+    plan: str
+    profile: dict
+    timing: dict = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "StoredPlan":
+        id_, key, phash, model, plan, profile, timing, created_at = row
+        return cls(id_, key, phash, model, plan, json.loads(profile), json.loads(timing), created_at)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "user_key": self.user_key,
+            "profile_hash": self.profile_hash,
+            "model": self.model,
+            "plan": self.plan,
+            "profile": self.profile,
+            "timing": self.timing,
+            "created_at": self.created_at,
+        }
+
+
+class PlanStore:
+    """SQLite plan store; ``save`` is queued, reads use per-thread connections."""
+
+    def __init__(self, path: str, batch_size: int = 64):
+        self.path = path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._queue: queue.Queue = queue.Queue()
+        self.saved = 0
+        self.write_errors = 0
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        conn.close()
+        self._writer = threading.Thread(target=self._write_loop, name="plan-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # Drain whatever else is waiting so a burst commits as one transaction.
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [p for p in batch if isinstance(p, StoredPlan)]
+            if rows:
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT INTO plans (user_key, profile_hash, model, plan, profile, timing, created_at)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            [
+                                (p.user_key, p.profile_hash, p.model, p.plan,
+                                 json.dumps(p.profile, ensure_ascii=False, default=str),
+                                 json.dumps(p.timing, ensure_ascii=False, default=str), p.created_at)
+                                for p in rows
+                            ],
+                        )
+                    self.saved += len(rows)
+                except sqlite3.Error:
+                    self.write_errors += len(rows)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+                self._queue.task_done()
+            if any(item is _STOP for item in batch):
+                conn.close()
+                return
+
+    def save(self, owner: str, user_data: dict, profile_hash: str, plan: str, model: str | None = None,
+             timing: dict | None = None) -> None:
+        """Queue ``owner``'s plan for writing and return immediately."""
+        self._queue.put(StoredPlan(
+            id=None,
+            user_key=owner,
+            profile_hash=profile_hash,
+            model=model,
+            plan=plan,
+            profile=dict(user_data),
+            timing=dict(timing or {}),
+        ))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued plan is on disk."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._writer.join()
+
+    def latest_for_profile(self, profile_hash: str) -> StoredPlan | None:
+        row = self._reader().execute(
+            f"SELECT {_COLUMNS} FROM plans WHERE profile_hash = ? ORDER BY created_at DESC LIMIT 1",
+            (profile_hash,),
+        ).fetchone()
+        return StoredPlan.from_row(row) if row else None
+
+    def latest_for_user(self, owner: str) -> StoredPlan | None:
+        """The last plan saved by ``owner`` (an :func:`owner_key`)."""
+        row = self._reader().execute(
+            f"SELECT {_COLUMNS} FROM plans WHERE user_key = ? ORDER BY created_at DESC LIMIT 1",
+            (owner,),
+        ).fetchone()
+        return StoredPlan.from_row(row) if row else None
+
+    def iter_plans(self, since: float = 0.0, page_size: int = 500) -> Iterator[StoredPlan]:
+        """All plans in id order, fetched a page at a time (keyset pagination)."""
+        last_id = 0
+        conn = self._reader()
+        while True:
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM plans WHERE id > ? AND created_at >= ? ORDER BY id LIMIT ?",
+                (last_id, since, page_size),
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield StoredPlan.from_row(row)
+            last_id = rows[-1][0]
+
+    def export_jsonl(self, fh: IO[str], since: float = 0.0) -> int:
+        """Bulk export as JSON lines; returns the number of plans written."""
+        count = 0
+        for plan in self.iter_plans(since=since):
+            fh.write(json.dumps(plan.as_dict(), ensure_ascii=False) + "\n")
+            count += 1
+        return count
+
+    def stats(self) -> dict:
+        (total,) = self._reader().execute("SELECT COUNT(*) FROM plans").fetchone()
+        return {"plans": total, "pending_writes": self._queue.qsize(), "write_errors": self.write_errors}
+
+
+def main(argv: list[str] | None = None) -> None:
+    from ayurveda import config
+
+    parser = argparse.ArgumentParser(description="Export saved wellness plans.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write every saved plan as JSON lines")
+    export.add_argument("output", help="output file ('-' for stdout)")
+    export.add_argument("--db", help="database path (default: AYURVEDA_PLAN_DB)")
+    export.add_argument("--since", type=float, default=0.0, help="only plans created at or after this Unix time")
+    args = parser.parse_args(argv)
+
+    store = PlanStore(args.db) if args.db else config.plan_store_from_env()
+    if args.output == "-":
+        count = store.export_jsonl(sys.stdout, since=args.since)
+    else:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            count = store.export_jsonl(fh, since=args.since)
+    print(f"Exported {count} plans", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
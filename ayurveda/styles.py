@@ -0,0 +1,87 @@
+"""Stylesheet injected at the top of every page."""
+
+APP_CSS = """
+<style>
+    :root {
+        --primary: #2E8B57;
+        --secondary: #FF7F50;
+        --accent: #8B4513;
+        --light: #F5F5DC;
+        --dark: #2F4F4F;
+    }
+    
+    .main-header {
+        font-size: 3rem;
+        color: var(--primary);
+        text-align: center;
+        margin-bottom: 1rem;
+        font-weight: bold;
+        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
+    }
+    
+    .step-card {
+        background: linear-gradient(135deg, #ffffff 0%, #f8fff8 100%);
+        padding: 30px;
+        border-radius: 20px;
+        border-left: 6px solid var(--primary);
+        margin: 20px 0;
+        box-shadow: 0 8px 25px rgba(46, 139, 87, 0.15);
+    }
+    
+    .question-title {
+        color: var(--dark);
+        font-size: 1.3rem;
+        font-weight: 600;
+        margin-bottom: 15px;
+    }
+    
+    .recommendation-card {
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+        color: white;
+        padding: 30px;
+        border-radius: 20px;
+        margin: 25px 0;
+        box-shadow: 0 10px 30px rgba(102, 126, 234, 0.3);
+    }
+    
+    .herb-grid {
+        display: grid;
+        grid-template-columns: repeat(auto-fill, minmax(260px, 1fr));
+        gap: 0 20px;
+    }
+    
+    .herb-card {
+        background: rgba(255,255,255,0.15);
+        padding: 20px;
+        border-radius: 15px;
+        margin: 15px 0;
+        border: 1px solid rgba(255,255,255,0.3);
+    }
+    
+    .progress-bar {
+        background: linear-gradient(90deg, var(--primary), var(--secondary));
+        height: 8px;
+        border-radius: 10px;
+        margin: 20px 0;
+    }
+    
+    .sidebar-header {
+        background: linear-gradient(135deg, var(--primary), #3CB371);
+        color: white;
+        padding: 20px;
+        border-radius: 15px;
+        margin-bottom: 20px;
+        text-align: center;
+    }
+    
+    .health-tag {
+        background: var(--primary);
+        color: white;
+        padding: 5px 15px;
+        border-radius: 20px;
+        margin: 5px;
+        display: inline-block;
+        font-size: 0.9rem;
+    }
+</style>
+"""
@@ -0,0 +1,251 @@
+"""Concurrent-session load test of ``app.py`` against the fake Gemini backend.
+
+    python benchmarks/load_test.py --concurrency 1,4,16,32 --output load.json
+
+At each concurrency level N, N simulated sessions fill in the five wizard
+steps, press "🎯 Generate AI Plan" and then use the results-page buttons
+(save, view profile, regenerate, new assessment). Each session is Streamlit's
+AppTest in its own process: AppTest installs and tears down Streamlit's
+global runtime on every script run, so two of them cannot run concurrently
+in one process. The processes share the plan database and, if configured,
+the disk plan cache and session store, but not ``st.cache_resource``; each
+warms its own caches with one unmeasured run before the sessions start
+together. Every script run is timed. Each level reports p50/p95/p99 rerun
+latency, throughput (reruns and assessments per second of wall time), the
+mean growth in resident memory per session process, and errors: exceptions
+shown by the app, exceptions raised by AppTest itself (including script-run
+timeouts) and uncaught exceptions on any other thread. Capacity can be read
+off where the latency curve bends.
+
+The shared request scheduler is opened up (``AYURVEDA_RPM``/``AYURVEDA_TPM``)
+unless set in the environment, so the numbers measure the app rather than
+the Gemini quota; ``bench_quota_burst`` in ``run_benchmarks.py`` covers that.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+# Read when ayurveda.config is imported, so they are set before anything imports it.
+os.environ.setdefault("AYURVEDA_RPM", "1000000")
+os.environ.setdefault("AYURVEDA_TPM", "1000000000")
+
+from run_benchmarks import ROOT, WIZARD_WIDGETS, git_commit, summarize  # noqa: E402  (puts ROOT on sys.path)
+from ayurveda.data import QUESTIONS  # noqa: E402
+from profiles import sample_profile  # noqa: E402
+
+RESULT_BUTTONS = ("📄 Save This Plan", "📊 View My Profile", "🔁 Regenerate Plan", "🔄 New Assessment")
+
+
+def rss_bytes() -> int:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Session:
+    """One simulated browser session; every script run goes through :meth:`rerun`."""
+
+    def __init__(self, app_test, user_data: dict, timeout: float):
+        self.app = app_test.from_file(str(ROOT / "app.py"), default_timeout=timeout)
+        self.user_data = user_data
+        self.latencies: list[float] = []
+        self.errors: list[str] = []
+        # After AppTest itself fails (e.g. a timed-out run) the element tree is unusable.
+        self.failed = False
+
+    def rerun(self, action) -> None:
+        if self.failed:
+            return
+        start = time.perf_counter()
+        try:
+            action()
+        except Exception as error:
+            self.failed = True
+            self.errors.append(f"{type(error).__name__}: {error}")
+            return
+        self.latencies.append(time.perf_counter() - start)
+        self.errors += [str(element.value) for element in self.app.exception]
+
+    def click(self, label: str) -> None:
+        if self.failed:
+            return
+        button = next((b for b in self.app.button if b.label == label), None)
+        if button is None:
+            self.errors.append(f"no {label!r} button")
+        else:
+            self.rerun(lambda: button.click().run())
+
+    def assessment(self) -> None:
+        for step, question in enumerate(QUESTIONS):
+            for key in question["questions"]:
+                for kind in WIZARD_WIDGETS:
+                    try:
+                        getattr(self.app, kind)(key=f"{key}_{step}").set_value(self.user_data[key])
+                        break
+                    except KeyError:
+                        continue
+            self.click("🎯 Generate AI Plan" if step == len(QUESTIONS) - 1 else "Next Step →")
+        for label in RESULT_BUTTONS:
+            self.click(label)
+
+    def run(self, rounds: int) -> "Session":
+        self.rerun(self.app.run)
+        for _ in range(rounds):
+            if self.failed:
+                break
+            self.assessment()
+        return self
+
+
+def session_worker(user_data: dict, rounds: int, timeout: float, start_gate, results) -> None:
+    """One session process: warm up, wait for the others, run, report."""
+    from streamlit.testing.v1 import AppTest
+
+    thread_errors: list[str] = []
+
+    def record_thread_error(args) -> None:
+        thread_errors.append(f"{args.thread.name if args.thread else 'thread'}: {args.exc_type.__name__}: {args.exc_value}")
+
+    threading.excepthook = record_thread_error
+    session = Session(AppTest, user_data, timeout)
+    try:
+        # Unmeasured: pays for this process's imports, knowledge base and cached resources.
+        AppTest.from_file(str(ROOT / "app.py"), default_timeout=timeout).run()
+    except Exception as error:
+        session.failed = True
+        session.errors.append(f"warm-up: {type(error).__name__}: {error}")
+    gc.collect()
+    rss_before = rss_bytes()
+    start_gate.wait()
+    try:
+        session.run(rounds)
+    except Exception as error:
+        session.errors.append(f"{type(error).__name__}: {error}")
+    results.put({
+        "latencies": session.latencies,
+        "errors": session.errors + thread_errors,
+        "rss_growth": max(0, rss_bytes() - rss_before),
+    })
+
+
+def run_level(concurrency: int, rounds: int, rng: random.Random, ids, timeout: float) -> dict:
+    # Fresh interpreters: no state shared with this process or each other beyond files.
+    ctx = multiprocessing.get_context("spawn")
+    start_gate, results = ctx.Barrier(concurrency + 1), ctx.Queue()
+    # Fresh profiles every level, so plans come from the backend rather than the plan cache.
+    workers = [
+        ctx.Process(target=session_worker, args=(sample_profile(rng, next(ids)), rounds, timeout, start_gate, results))
+        for _ in range(concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+    reports, errors = [], []
+    try:
+        # Process start-up and warm-up are not measured.
+        start_gate.wait(timeout=2 * timeout)
+    except threading.BrokenBarrierError:
+        errors.append("session processes did not all start in time")
+    start = time.perf_counter()
+    # At most one script-run timeout per rerun: the initial run plus ~12 per assessment.
+    deadline = time.monotonic() + timeout * (rounds * 12 + 1)
+    while len(reports) < concurrency and not errors:
+        try:
+            reports.append(results.get(timeout=max(0.1, deadline - time.monotonic())))
+        except queue.Empty:
+            errors.append("timed out waiting for session processes")
+    wall_s = time.perf_counter() - start
+    for worker in workers:
+        worker.join(timeout=5)
+        if worker.is_alive():
+            worker.terminate()
+    crashed = concurrency - len(reports)
+    if crashed:
+        errors.append(f"{crashed} session process(es) exited without a report")
+    latencies = [latency for report in reports for latency in report["latencies"]]
+    errors = [error for report in reports for error in report["errors"]] + errors
+    growth = [report["rss_growth"] for report in reports]
+    return {
+        "concurrency": concurrency,
+        "wall_s": round(wall_s, 3),
+        "reruns": len(latencies),
+        "rerun_latency": summarize(latencies) if latencies else None,
+        "reruns_per_s": round(len(latencies) / wall_s, 2),
+        "assessments_per_s": round(len(reports) * rounds / wall_s, 3),
+        "rss_per_session_mb": round(sum(growth) / len(growth) / 2**20, 2) if growth else None,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="comma-separated concurrent session counts")
+    parser.add_argument("--rounds", type=int, default=1, help="assessments per session")
+    parser.add_argument("--latency", default="lognormal:0.05,0.3", help="fake backend latency distribution")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds allowed per script run")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        from streamlit.testing.v1 import AppTest  # noqa: F401  (imported again in each session process)
+    except ImportError:
+        sys.exit("the load test needs Streamlit's AppTest (pip install streamlit)")
+
+    os.environ["AYURVEDA_BACKEND"] = "fake"
+    os.environ["AYURVEDA_FAKE_LATENCY"] = args.latency
+    # "📄 Save This Plan" writes to a throwaway database, not the real one.
+    os.environ.setdefault("AYURVEDA_PLAN_DB", str(Path(tempfile.mkdtemp(prefix="ayurveda-load-")) / "plans.db"))
+
+    rng, ids = random.Random(args.seed), itertools.count()
+    levels = []
+    for concurrency in (int(n) for n in args.concurrency.split(",")):
+        level = run_level(concurrency, args.rounds, rng, ids, args.timeout)
+        levels.append(level)
+        latency = level["rerun_latency"] or {"p50_ms": float("nan"), "p95_ms": float("nan"), "p99_ms": float("nan")}
+        print(
+            f"{concurrency:>4} sessions: p50 {latency['p50_ms']:.0f} ms • p95 {latency['p95_ms']:.0f} ms • "
+            f"p99 {latency['p99_ms']:.0f} ms • {level['reruns_per_s']} reruns/s • "
+            f"{level['rss_per_session_mb']} MB/session • {level['errors']} errors"
+            + (f" (first: {level['first_error']})" if level["errors"] else ""),
+            file=sys.stderr,
+        )
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "params": vars(args),
+        },
+        "levels": levels,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Synthetic assessments shaped like the app's ``st.session_state.user_data``."""
+from __future__ import annotations
+
+import random
+
+from ayurveda.data import HEALTH_PROBLEMS
+
+
+def sample_profile(rng: random.Random, idx: int = 0) -> dict:
+    return {
+        "name": f"Benchmark User {idx}",
+        "age": rng.randint(18, 80),
+        "weight": rng.randint(45, 110),
+        "height": rng.randint(150, 195),
+        "gender": rng.choice(["Male", "Female", "Other", "Prefer not to say"]),
+        "main_health_concerns": rng.sample(HEALTH_PROBLEMS, rng.randint(1, 4)),
+        "symptom_severity": rng.randint(1, 10),
+        "duration": rng.choice(["2 weeks", "3 months", "over a year"]),
+        "previous_treatments": rng.choice(["None", "Yoga", "Allopathic medication", "Homeopathy"]),
+        "sleep_quality": rng.randint(1, 10),
+        "energy_level": rng.randint(1, 10),
+        "stress_level": rng.randint(1, 10),
+        "digestion": rng.choice(["Excellent", "Good", "Fair", "Poor", "Severe issues"]),
+        "exercise": rng.choice(["Daily", "3-4 times/week", "Weekly", "Rarely", "Never"]),
+        "diet_type": rng.choice(["Vegetarian", "Non-vegetarian", "Vegan", "Pescatarian", "Mixed"]),
+        "water_intake": rng.randint(2, 12),
+        "food_preferences": rng.choice(["None", "Lactose intolerant", "No nuts", "Gluten free"]),
+        "eating_pattern": rng.choice(["Regular", "Irregular", "Intermittent fasting"]),
+        "primary_goal": rng.choice(["Better sleep", "More energy", "Less stress", "Weight loss"]),
+        "time_commitment": rng.choice(["15 minutes", "30 minutes", "1 hour"]),
+        "budget": rng.choice(["Low", "Medium", "High", "Premium"]),
+        "expectations": rng.choice(["Improved health", "Fewer symptoms", "Calmer mind"]),
+    }
+
+
+def nearby_profile(rng: random.Random, base: dict, idx: int = 0) -> dict:
+    """A similar user's variant of ``base``: sliders within ±2, age/weight a few units apart."""
+    profile = dict(base, name=f"Nearby User {idx}")
+    for name in ("symptom_severity", "sleep_quality", "energy_level", "stress_level"):
+        profile[name] = min(10, max(1, base[name] + rng.choice((-2, -1, 0, 0, 0, 1, 2))))
+    profile["age"] = base["age"] + rng.randint(-2, 2)
+    profile["weight"] = base["weight"] + rng.randint(-2, 2)
+    profile["main_health_concerns"] = list(reversed(base["main_health_concerns"]))
+    return profile
+
+
+def synthetic_catalog(herbs: dict, size: int, rng: random.Random) -> dict:
+    """A catalog of ``size`` entries built by recombining the real herbs' fields."""
+    entries = list(herbs.values())
+    benefits = sorted({benefit for entry in entries for benefit in entry["benefits"]})
+    catalog = {}
+    for idx in range(size):
+        base = entries[idx % len(entries)]
+        catalog[f"Herb {idx:05d}"] = {
+            "benefits": rng.sample(benefits, rng.randint(2, 5)),
+            "dosage": base["dosage"],
+            "best_time": base["best_time"],
+            "safety": rng.choice(entries)["safety"],
+        }
+    return catalog
@@ -0,0 +1,556 @@
+"""Benchmark suite against the local fake Gemini backend (no API quota used).
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json
+
+Measures prompt build time, local planner time, knowledge-base load and
+query time on a synthetic catalog, reference-guide deltas and payload bytes
+(one markdown call per card field vs one grid payload), scalar vs columnar
+cohort scoring, exact vs approximate (tolerance-matched) plan cache hit rates on near-identical profiles,
+end-to-end plan latency, plain vs context-cached prompts (build time and
+billed input tokens), follow-up chat input tokens and latency per turn with
+the full history vs a rolling summary, sectioned regeneration after an edit, the cost of
+walking the model fallback chain, a burst of sessions against a request quota
+with and without the shared scheduler, time from "Generate AI Plan" to a plan
+with and without speculative generation, session checkpoint cost with
+synchronous vs write-behind writes, results-page render time and the
+reruns/CPU needed to complete the wizard (the last two need Streamlit's
+AppTest and are skipped without it). Results are written as JSON so runs can
+be compared across commits.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ayurveda.config import REFERENCE_GUIDE_LIMIT  # noqa: E402
+from ayurveda.consultation import Consultation, consultation_prefix  # noqa: E402
+from ayurveda.context_cache import ContextCache  # noqa: E402
+from ayurveda.data import HERBS_DATABASE, QUESTIONS, concern_index  # noqa: E402
+from ayurveda.fake_backend import FakeBackend  # noqa: E402
+from ayurveda.gemini_client import MODEL_NAMES  # noqa: E402
+from ayurveda.knowledge_base import KnowledgeBase  # noqa: E402
+from ayurveda.local_planner import build_local_plan  # noqa: E402
+from ayurveda.plan_cache import CachedPlan, PlanCache, profile_hash  # noqa: E402
+from ayurveda.prompts import PROMPT_TEMPLATE_VERSION, build_prompt, context_cache_prefix  # noqa: E402
+from ayurveda.rendering import herb_grid_html, payload_stats  # noqa: E402
+from ayurveda.router import AllModelsFailed, ModelRouter  # noqa: E402
+from ayurveda.scheduler import QuotaScheduler, SchedulerBusy  # noqa: E402
+from ayurveda.scoring import calculate_wellness_score  # noqa: E402
+from ayurveda.sections import SectionedPlanner, sections_independent_of  # noqa: E402
+from ayurveda.session_store import SQLiteSessionStore, encode_state  # noqa: E402
+from ayurveda.speculation import Speculator  # noqa: E402
+from ayurveda.similarity_cache import SimilarityCache  # noqa: E402
+from profiles import nearby_profile, sample_profile, synthetic_catalog  # noqa: E402
+
+
+def summarize(samples: list[float]) -> dict:
+    """Latency summary in milliseconds."""
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 3)
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def timed(fn, iterations: int) -> list[float]:
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_prompt_build(profiles: list[dict]) -> dict:
+    return summarize(timed(lambda i: build_prompt(profiles[i % len(profiles)]), len(profiles)))
+
+
+def bench_local_plan(profiles: list[dict]) -> dict:
+    index = concern_index()
+    return summarize(timed(lambda i: build_local_plan(profiles[i % len(profiles)], HERBS_DATABASE, index), len(profiles)))
+
+
+def bench_knowledge_base(profiles: list[dict], size: int, seed: int) -> dict:
+    """Load/index time and query latency for a synthetic catalog of ``size`` herbs."""
+    catalog = synthetic_catalog(HERBS_DATABASE, size, random.Random(seed))
+    start = time.perf_counter()
+    kb = KnowledgeBase(catalog)
+    load_ms = round((time.perf_counter() - start) * 1000, 3)
+    return {
+        "herbs": size,
+        "load_ms": load_ms,
+        "rank_for_concerns": summarize(
+            timed(lambda i: kb.rank_for_concerns(profiles[i % len(profiles)]["main_health_concerns"], limit=6), len(profiles))
+        ),
+        "search": summarize(timed(lambda i: kb.search("immun", avoid=("pregnan",)), len(profiles))),
+    }
+
+
+def _per_field_herb_markdown(names, herbs) -> list[str]:
+    """The six ``st.markdown`` payloads per herb the reference guide used to send."""
+    payloads = []
+    for name in names:
+        info = herbs[name]
+        payloads += [
+            '<div class="herb-card">',
+            f"**{name}**",
+            f"*Benefits:* {', '.join(info['benefits'][:3])}",
+            f"*Dosage:* {info['dosage']}",
+            f"*Safety:* {info['safety'][:50]}...",
+            "</div>",
+        ]
+    return payloads
+
+
+def bench_reference_guide(size: int, page_size: int, seed: int) -> dict:
+    """Herb reference guide deltas and bytes: one markdown per card field vs one grid payload."""
+    catalog = synthetic_catalog(HERBS_DATABASE, size, random.Random(seed))
+    names = sorted(catalog)
+    results = {"herbs": size, "page_size": page_size}
+    for label, shown in (("first_page", names[:page_size]), ("full_catalog", names)):
+        start = time.perf_counter()
+        grid = herb_grid_html(shown, catalog)
+        build_ms = round((time.perf_counter() - start) * 1000, 3)
+        results[label] = {
+            "per_field": payload_stats(_per_field_herb_markdown(shown, catalog)),
+            "grid": {**payload_stats([grid]), "build_ms": build_ms},
+        }
+    return results
+
+
+def bench_cohort_scoring(profiles: list[dict], size: int, seed: int) -> dict:
+    """Scalar vs columnar wellness scoring over ``size`` assessments."""
+    try:
+        from ayurveda.cohort import columns_from_records, wellness_scores
+    except ImportError:
+        return {"skipped": "numpy is not installed"}
+    rng = random.Random(seed)
+    records = [profiles[rng.randrange(len(profiles))] for _ in range(size)]
+    start = time.perf_counter()
+    for record in records:
+        calculate_wellness_score(record)
+    scalar_ms = (time.perf_counter() - start) * 1000
+    columns = columns_from_records(records)
+    start = time.perf_counter()
+    wellness_scores(columns["sleep_quality"], columns["energy_level"], columns["stress_level"], columns["digestion"])
+    columnar_ms = (time.perf_counter() - start) * 1000
+    return {"assessments": size, "scalar_ms": round(scalar_ms, 3), "columnar_ms": round(columnar_ms, 3)}
+
+
+def bench_similarity_cache(profiles: list[dict], seed: int) -> dict:
+    """Hit rates for near-identical follow-up profiles: exact hash vs tolerance matching."""
+    rng = random.Random(seed)
+    exact = PlanCache(max_entries=len(profiles))
+    # Groups and plans share the underlying cache.
+    similar = SimilarityCache(PlanCache(max_entries=2 * len(profiles)), template_version=PROMPT_TEMPLATE_VERSION)
+    for user_data in profiles:
+        plan = CachedPlan(text=f"Namaste {user_data['name']}!", model="fake")
+        exact.put(profile_hash(user_data, PROMPT_TEMPLATE_VERSION), plan)
+        similar.put(user_data, plan)
+    lookups = [nearby_profile(rng, rng.choice(profiles), i) for i in range(len(profiles))]
+    for user_data in lookups:
+        exact.get(profile_hash(user_data, PROMPT_TEMPLATE_VERSION))
+    samples = timed(lambda i: similar.get(lookups[i]), len(lookups))
+    stats = similar.stats()
+    return {
+        "exact_hit_rate": round(exact.stats()["hit_rate"], 3),
+        "similarity_hit_rate": round(stats["hit_rate"], 3),
+        "approximate_hits": stats["approximate_hits"],
+        "lookup": summarize(samples),
+    }
+
+
+def bench_end_to_end(profiles: list[dict], latency: str, stream: bool, seed: int) -> dict:
+    """Prompt build + routed generation + cache write, as on a cache miss."""
+    backend = FakeBackend(latency=latency, seed=seed)
+    router = ModelRouter(MODEL_NAMES, backend.create_model)
+    cache = PlanCache()
+    first_tokens = []
+
+    def run(i: int) -> None:
+        user_data = profiles[i % len(profiles)]
+        plan_prompt = build_prompt(user_data)
+        result = router.generate(plan_prompt.text, on_text=(lambda _: None) if stream else None)
+        first_tokens.append(result.timings.first_token_s)
+        cache.put(profile_hash(user_data, PROMPT_TEMPLATE_VERSION), CachedPlan(text=result.text, model=result.model))
+
+    summary = summarize(timed(run, len(profiles)))
+    summary["first_token"] = summarize(first_tokens)
+    return summary
+
+
+def bench_context_cache(profiles: list[dict], latency: str, seed: int) -> dict:
+    """Full prompts vs a cached static prefix: build time and billed (uncached) input tokens."""
+    results = {}
+    for mode, cached in (("plain", False), ("cached_prefix", True)):
+        backend = FakeBackend(latency=latency, seed=seed)
+        factory = ContextCache(backend, context_cache_prefix()).create_model if cached else backend.create_model
+        router = ModelRouter(MODEL_NAMES, factory)
+        build = timed(lambda i: build_prompt(profiles[i % len(profiles)], cached_prefix=cached), len(profiles))
+        billed = []
+        for user_data in profiles:
+            usage = router.generate(build_prompt(user_data, cached_prefix=cached).text).timings.usage or {}
+            billed.append(usage.get("prompt_tokens", 0) - usage.get("cached_tokens", 0))
+        results[mode] = {
+            "prompt_build": summarize(build),
+            "billed_input_tokens_mean": round(statistics.fmean(billed), 1),
+            "cache_uploads": backend.cache_uploads,
+        }
+    return results
+
+
+def bench_consultation(user_data: dict, latency: str, turns: int, seed: int, catalog_size: int,
+                       prefill_s_per_1k_tokens: float = 0.05) -> dict:
+    """Follow-up chat over ``turns`` questions: full history every turn vs rolling summary + cached prefix.
+
+    The fake backend adds ``prefill_s_per_1k_tokens`` of latency per 1k uncached
+    input tokens, so turn latency follows the prompt size as it does upstream.
+    The rolling summary runs again on a ``catalog_size``-herb catalog: its
+    ``max_prompt_tokens`` should not grow with the catalog.
+    """
+    plan = build_local_plan(user_data, HERBS_DATABASE, concern_index()).to_markdown()
+    large_kb = KnowledgeBase(synthetic_catalog(HERBS_DATABASE, catalog_size, random.Random(seed)))
+    checkpoints = sorted({1, turns // 4, turns // 2, turns} - {0})
+    results = {"turns": turns}
+    for mode, history_budget, cached, kb in (
+        ("full_history", 10**9, False, None),
+        ("rolling_summary", 800, True, None),
+        (f"rolling_summary_{catalog_size}_herbs", 800, True, large_kb),
+    ):
+        backend = FakeBackend(latency=latency, seed=seed, response_chars=800,
+                              prefill_s_per_1k_tokens=prefill_s_per_1k_tokens)
+        factory = ContextCache(backend, consultation_prefix()).create_model if cached else backend.create_model
+        router = ModelRouter(MODEL_NAMES, factory)
+        chat = Consultation(user_data, plan, history_budget=history_budget, knowledge_base=kb)
+        billed, latencies, prompt_tokens = [], [], []
+        for turn in range(turns):
+            question = f"Follow-up question {turn}: can I combine my herbs with my medication?"
+            prompt = chat.build_prompt(question, cached_prefix=cached)
+            prompt_tokens.append(prompt.tokens)
+            start = time.perf_counter()
+            result = router.generate(prompt.text)
+            latencies.append(time.perf_counter() - start)
+            usage = result.timings.usage or {}
+            billed.append(usage.get("prompt_tokens", 0) - usage.get("cached_tokens", 0))
+            chat.add_exchange(question, result.text)
+            # Synchronous here (the app runs it in the background) so every turn sees the same state.
+            if chat.needs_compaction():
+                chat.compact(lambda text: router.generate(text).text)
+        results[mode] = {
+            "billed_input_tokens_at_turn": {str(n): billed[n - 1] for n in checkpoints},
+            "latency_ms_at_turn": {str(n): round(latencies[n - 1] * 1000, 1) for n in checkpoints},
+            "latency": summarize(latencies),
+            "max_prompt_tokens": max(prompt_tokens),
+            "compactions": chat.compactions,
+        }
+    return results
+
+
+def bench_sectioned_edit(profiles: list[dict], latency: str, seed: int) -> dict:
+    """Sectioned plans: a cold profile vs the same profile after a diet edit."""
+    backend = FakeBackend(latency=latency, seed=seed)
+    planner = SectionedPlanner(ModelRouter(MODEL_NAMES, backend.create_model), PlanCache())
+    cold, edited, calls = [], [], []
+    for user_data in profiles:
+        start = time.perf_counter()
+        planner.generate(user_data)
+        cold.append(time.perf_counter() - start)
+        before = sum(backend.calls.values())
+        changed = dict(user_data, diet_type="Vegan" if user_data.get("diet_type") != "Vegan" else "Mixed")
+        start = time.perf_counter()
+        planner.generate(changed)
+        edited.append(time.perf_counter() - start)
+        calls.append(sum(backend.calls.values()) - before)
+    return {"cold": summarize(cold), "after_diet_edit": summarize(edited), "upstream_calls_per_edit": statistics.fmean(calls)}
+
+
+def bench_fallback_chain(latency: str, requests: int, seed: int) -> dict:
+    """Cost of retired models at the head of MODEL_NAMES, cold vs sticky router."""
+    results = {}
+    for missing in (0, 2, 4, 7):
+        backend = FakeBackend(latency=latency, missing_models=tuple(MODEL_NAMES[:missing]), seed=seed)
+        router = ModelRouter(MODEL_NAMES, backend.create_model)
+        samples = timed(lambda i: router.generate("benchmark prompt"), requests)
+        results[f"missing_{missing}"] = {
+            "cold": summarize(samples[:1]),
+            "warm": summarize(samples[1:] or samples),
+            "upstream_calls": sum(backend.calls.values()),
+        }
+    return results
+
+
+def bench_quota_burst(latency: str, sessions: int, seed: int) -> dict:
+    """A burst of sessions against a 10-requests-per-second quota: free-for-all vs the shared scheduler."""
+    results = {}
+    for mode in ("unscheduled", "scheduled"):
+        backend = FakeBackend(latency=latency, quota_limit=10, quota_window=1.0, seed=seed)
+        router = ModelRouter(MODEL_NAMES, backend.create_model, fallback_on_quota=mode == "unscheduled")
+        # Half the quota per second, so bucket refill plus burst stays inside any 1 s window.
+        scheduler = QuotaScheduler(rpm=300, tpm=1e9, max_wait_s=5.0, quota_backoff_s=1.0, burst_s=1.0)
+        outcomes, latencies = [], []
+        lock = threading.Lock()
+
+        def session(i: int) -> None:
+            start = time.perf_counter()
+            try:
+                if mode == "scheduled":
+                    scheduler.run(scheduler.submit(f"session-{i}", 1000), lambda: router.generate("benchmark prompt"))
+                else:
+                    router.generate("benchmark prompt")
+                outcome = "ai_plan"
+            except SchedulerBusy:
+                outcome = "local_plan_busy"
+            except AllModelsFailed:
+                outcome = "local_plan_failed"
+            with lock:
+                outcomes.append(outcome)
+                latencies.append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results[mode] = {
+            "latency": summarize(latencies),
+            **{outcome: outcomes.count(outcome) for outcome in ("ai_plan", "local_plan_busy", "local_plan_failed")},
+            "upstream_calls": sum(backend.calls.values()),
+            "quota_errors": backend.quota_errors,
+        }
+    return results
+
+
+def bench_session_store(profiles: list[dict], reruns_per_step: int = 4) -> dict:
+    """Checkpoint cost per script run: a synchronous write per checkpoint vs write-behind batching."""
+    results = {}
+    for mode in ("synchronous", "write_behind"):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteSessionStore(str(Path(tmp) / "sessions.db"), flush_interval_s=0.05)
+            samples = []
+            for i, user_data in enumerate(profiles):
+                session_id = f"bench{i:08d}"
+                for step in range(len(QUESTIONS)):
+                    for run in range(reruns_per_step):
+                        # Most reruns change nothing; the per-step counters do.
+                        state = {"user_data": user_data, "current_step": step, "show_results": False,
+                                 "assessment_runs": step * reruns_per_step + (run == 0)}
+                        start = time.perf_counter()
+                        store.save(session_id, state)
+                        if mode == "synchronous":
+                            store.flush()
+                        samples.append(time.perf_counter() - start)
+            store.flush()
+            stats = store.stats()
+            store.close()
+        results[mode] = {
+            "save": summarize(samples),
+            "checkpoints": stats["checkpoints"],
+            "rows_written": stats["writes"],
+            "transactions": stats["batches"],
+        }
+    state = {"user_data": profiles[0], "current_step": 4, "show_results": True}
+    results["bytes_per_checkpoint"] = {
+        "pretty_json": len(json.dumps(state, indent=2).encode("utf-8")),
+        "compact": len(encode_state(state)),
+    }
+    return results
+
+
+def bench_speculation(profiles: list[dict], latency: str, seed: int, think_s: float = 0.05) -> dict:
+    """Click-to-plan time for sectioned plans when the goal-independent sections are written on the last step."""
+    last_step = set(QUESTIONS[-1]["questions"])
+    speculative_sections = [spec.key for spec in sections_independent_of(last_step)]
+    results = {}
+    for mode in ("on_click", "speculative"):
+        backend = FakeBackend(latency=latency, seed=seed)
+        planner = SectionedPlanner(ModelRouter(MODEL_NAMES, backend.create_model), PlanCache(max_entries=10_000))
+        speculator = Speculator(max_workers=4)
+        waits = []
+        for i, user_data in enumerate(profiles):
+            # The last step is a form: until it is submitted only the earlier answers are known.
+            known = {key: value for key, value in user_data.items() if key not in last_step}
+            key = ",".join(sorted(speculative_sections))
+            if mode == "speculative":
+                speculator.start(f"s{i}", key, lambda u=known: planner.generate(u, only=speculative_sections))
+            time.sleep(think_s)  # the user reads and answers the last step
+            start = time.perf_counter()
+            # Speculative sections still being written are joined, not requested again.
+            speculator.claim(f"s{i}", key)
+            planner.generate(user_data)
+            waits.append(time.perf_counter() - start)
+        results[mode] = {
+            "click_to_plan": summarize(waits),
+            "upstream_calls": sum(backend.calls.values()),
+            "wasted_ratio": round(speculator.stats()["wasted_ratio"], 3),
+        }
+    results["speculative_sections"] = speculative_sections
+    return results
+
+
+def bench_results_page(profiles: list[dict], latency: str) -> dict:
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return {"skipped": "streamlit.testing is not installed"}
+    os.environ["AYURVEDA_BACKEND"] = "fake"
+    os.environ["AYURVEDA_FAKE_LATENCY"] = latency
+    cold, warm, markdown = [], [], []
+    for user_data in profiles:
+        app = AppTest.from_file(str(ROOT / "app.py"), default_timeout=120)
+        app.session_state["user_data"] = dict(user_data)
+        app.session_state["current_step"] = 4
+        app.session_state["show_results"] = True
+        start = time.perf_counter()
+        app.run()
+        cold.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        app.run()
+        warm.append(time.perf_counter() - start)
+        markdown.append(payload_stats(element.value for element in app.markdown))
+    return {
+        "cold": summarize(cold),
+        "warm_rerun": summarize(warm),
+        # Main-area markdown elements (deltas) and bytes per results page.
+        "markdown_elements": statistics.fmean(m["elements"] for m in markdown),
+        "markdown_bytes": statistics.fmean(m["bytes"] for m in markdown),
+    }
+
+
+WIZARD_WIDGETS = ("multiselect", "slider", "number_input", "selectbox", "text_input")
+
+
+def bench_wizard(profiles: list[dict], latency: str) -> dict:
+    """Full script runs and CPU spent filling in the five wizard steps."""
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return {"skipped": "streamlit.testing is not installed"}
+    os.environ["AYURVEDA_BACKEND"] = "fake"
+    os.environ["AYURVEDA_FAKE_LATENCY"] = latency
+    runs, cpu = [], []
+    for user_data in profiles:
+        app = AppTest.from_file(str(ROOT / "app.py"), default_timeout=120)
+        app.run()
+        for step, question in enumerate(QUESTIONS):
+            for key in question["questions"]:
+                for kind in WIZARD_WIDGETS:
+                    try:
+                        getattr(app, kind)(key=f"{key}_{step}").set_value(user_data[key])
+                        break
+                    except KeyError:
+                        continue
+            label = "🎯 Generate AI Plan" if step == len(QUESTIONS) - 1 else "Next Step →"
+            next(button for button in app.button if button.label == label).click().run()
+        runs.append(app.session_state["assessment_runs"])
+        cpu.append(app.session_state["assessment_cpu_s"])
+    return {
+        "reruns_per_assessment": statistics.fmean(runs),
+        "cpu_per_assessment": summarize(cpu),
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, prefix: str = "") -> list[str]:
+    """Lines describing p50 changes between two result trees."""
+    lines = []
+    for key, value in current.items():
+        other = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict) and isinstance(other, dict):
+            if "p50_ms" in value and "p50_ms" in other and other["p50_ms"]:
+                change = (value["p50_ms"] - other["p50_ms"]) / other["p50_ms"] * 100
+                lines.append(f"{prefix}{key}: p50 {other['p50_ms']:.3f} -> {value['p50_ms']:.3f} ms ({change:+.1f}%)")
+            else:
+                lines += compare(value, other, f"{prefix}{key}.")
+    return lines
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=200, help="synthetic profiles for CPU-bound benchmarks")
+    parser.add_argument("--catalog-size", type=int, default=5000, help="herbs in the synthetic knowledge-base catalog")
+    parser.add_argument("--cohort-size", type=int, default=100_000, help="assessments for the cohort scoring benchmark")
+    parser.add_argument("--requests", type=int, default=20, help="requests for latency benchmarks")
+    parser.add_argument("--sessions", type=int, default=40, help="concurrent sessions for the quota burst benchmark")
+    parser.add_argument("--chat-turns", type=int, default=40, help="questions in the follow-up chat benchmark")
+    parser.add_argument("--latency", default="lognormal:0.05,0.3", help="fake backend latency distribution")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--skip-render", action="store_true", help="skip the Streamlit results-page and wizard benchmarks")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    profiles = [sample_profile(rng, i) for i in range(args.profiles)]
+    latency_profiles = profiles[: args.requests]
+
+    results = {
+        "prompt_build": bench_prompt_build(profiles),
+        "local_plan": bench_local_plan(profiles),
+        "knowledge_base": bench_knowledge_base(profiles, args.catalog_size, args.seed),
+        "reference_guide": bench_reference_guide(args.catalog_size, REFERENCE_GUIDE_LIMIT, args.seed),
+        "cohort_scoring": bench_cohort_scoring(profiles, args.cohort_size, args.seed),
+        "similarity_cache": bench_similarity_cache(profiles, args.seed),
+        "end_to_end_blocking": bench_end_to_end(latency_profiles, args.latency, stream=False, seed=args.seed),
+        "end_to_end_streaming": bench_end_to_end(latency_profiles, args.latency, stream=True, seed=args.seed),
+        "context_cache": bench_context_cache(latency_profiles, args.latency, args.seed),
+        "consultation": bench_consultation(profiles[0], "fixed:0.02", args.chat_turns, args.seed, args.catalog_size),
+        "sectioned_edit": bench_sectioned_edit(latency_profiles, args.latency, args.seed),
+        "fallback_chain": bench_fallback_chain(args.latency, args.requests, args.seed),
+        "quota_burst": bench_quota_burst(args.latency, args.sessions, args.seed),
+        "speculation": bench_speculation(latency_profiles, args.latency, args.seed),
+        "session_store": bench_session_store(latency_profiles),
+    }
+    if not args.skip_render:
+        results["results_page_render"] = bench_results_page(latency_profiles[:5], args.latency)
+        results["wizard"] = bench_wizard(latency_profiles[:5], args.latency)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "params": vars(args),
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print("\n".join(compare(results, baseline.get("results", {}))), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# The ayurveda package is imported from the checkout, as app.py does.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def user_data():
+    """A completed assessment, as the wizard leaves it in ``st.session_state.user_data``."""
+    return {
+        "name": "Asha Rao",
+        "age": 34,
+        "weight": 60,
+        "height": 165,
+        "gender": "Female",
+        "main_health_concerns": ["Stress & Anxiety", "Poor Sleep"],
+        "symptom_severity": 6,
+        "duration": "3 months",
+        "previous_treatments": "None",
+        "sleep_quality": 4,
+        "energy_level": 5,
+        "stress_level": 8,
+        "digestion": "Fair",
+        "exercise": "Weekly",
+        "diet_type": "Vegetarian",
+        "water_intake": 6,
+        "food_preferences": "None",
+        "eating_pattern": "Irregular",
+        "primary_goal": "Better sleep",
+        "time_commitment": "30 minutes",
+        "budget": "Medium",
+        "expectations": "Calmer mind",
+    }
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("AYURVEDA_BACKEND", "fake")
+    monkeypatch.setenv("AYURVEDA_FAKE_LATENCY", "fixed:0")
+    monkeypatch.setenv("AYURVEDA_PLAN_DB", str(tmp_path / "plans.db"))
+    app = AppTest.from_file(APP, default_timeout=60)
+    app.run()
+    return app
+
+
+def test_step_answers_are_stored_only_on_submit(app):
+    app.text_input(key="name_0").set_value("Asha Rao")
+    app.number_input(key="age_0").set_value(34)
+    app.run()
+    # Editing inside the form does not commit the answers yet.
+    assert "name" not in app.session_state["user_data"]
+    assert app.session_state["current_step"] == 0
+
+    next(button for button in app.button if button.label == "Next Step →").click().run()
+    assert app.session_state["user_data"]["name"] == "Asha Rao"
+    assert app.session_state["user_data"]["age"] == 34
+    assert app.session_state["current_step"] == 1
+    assert app.session_state["assessment_runs"] == 3
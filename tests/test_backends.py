@@ -0,0 +1,55 @@
+import json
+import random
+
+import pytest
+
+from ayurveda.backends import GeminiBackend, backend_from_env
+from ayurveda.fake_backend import FakeBackend, LatencyModel, NotFound, ResourceExhausted
+
+
+@pytest.mark.parametrize("spec", ["fixed:0.5", "uniform:0.1,0.2", "normal:1,5", "lognormal:2,0.4"])
+def test_latency_samples_are_never_negative(spec):
+    model, rng = LatencyModel(spec), random.Random(1)
+    assert all(model.sample(rng) >= 0 for _ in range(200))
+
+
+def test_unknown_latency_distribution():
+    with pytest.raises(ValueError):
+        LatencyModel("pareto:1")
+
+
+def test_fake_model_is_deterministic_and_streams_the_same_text():
+    backend = FakeBackend(latency="fixed:0", chunk_chars=50)
+    model = backend.create_model("gemini-a")
+    text = model.generate_content("prompt").text
+    assert text == model.generate_content("prompt").text
+    assert "".join(chunk.text for chunk in model.generate_content("prompt", stream=True)) == text
+    assert backend.calls == {"gemini-a": 3}
+
+
+def test_json_mode_returns_section_points():
+    model = FakeBackend(latency="fixed:0").create_model("gemini-a")
+    response = model.generate_content("HERBAL PRESCRIPTION", generation_config={"response_mime_type": "application/json"})
+    assert json.loads(response.text)["points"]
+
+
+def test_missing_models_and_quota():
+    backend = FakeBackend(latency="fixed:0", missing_models=("gemini-a",), not_found_latency=0, quota_limit=1)
+    with pytest.raises(NotFound):
+        backend.create_model("gemini-a").generate_content("prompt")
+    backend.create_model("gemini-b").generate_content("prompt")
+    with pytest.raises(ResourceExhausted):
+        backend.create_model("gemini-b").generate_content("prompt")
+    assert backend.quota_errors == 1
+
+
+def test_backend_from_env(monkeypatch):
+    monkeypatch.setenv("AYURVEDA_BACKEND", "fake")
+    monkeypatch.setenv("AYURVEDA_FAKE_MISSING_MODELS", "gemini-a,gemini-b")
+    backend = backend_from_env()
+    assert isinstance(backend, FakeBackend) and backend.missing_models == {"gemini-a", "gemini-b"}
+    monkeypatch.setenv("AYURVEDA_BACKEND", "gemini")
+    assert isinstance(backend_from_env(), GeminiBackend)
+    monkeypatch.setenv("AYURVEDA_BACKEND", "other")
+    with pytest.raises(ValueError):
+        backend_from_env()
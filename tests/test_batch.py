@@ -0,0 +1,59 @@
+import argparse
+import json
+
+from ayurveda.batch import BatchRunner, Checkpoint, run
+from ayurveda.fake_backend import FakeBackend
+from ayurveda.metrics import MetricsRegistry
+from ayurveda.plan_cache import PlanCache
+from ayurveda.ratelimit import TokenBucket
+from ayurveda.router import ModelRouter
+
+
+def make_runner(**backend_options):
+    backend = FakeBackend(latency="fixed:0", **backend_options)
+    router = ModelRouter(["gemini-a"], backend.create_model, failure_threshold=100)
+    return BatchRunner(router, PlanCache(), TokenBucket(6000, burst=10), retries=1, backoff=0, metrics=MetricsRegistry())
+
+
+def test_checkpoint_tracks_out_of_order_lines(tmp_path):
+    path = str(tmp_path / "out.checkpoint")
+    checkpoint = Checkpoint(path)
+    for line_no in (0, 2, 3):
+        checkpoint.mark_done(line_no)
+    assert checkpoint.done_below == 1 and checkpoint.done_above == {2, 3}
+    checkpoint.save()
+    restored = Checkpoint(path)
+    assert [restored.is_done(n) for n in range(5)] == [True, False, True, True, False]
+
+
+def test_runner_caches_and_reports_errors(user_data):
+    runner = make_runner()
+    raw = json.dumps({"id": "a", **user_data})
+    first = runner.generate(0, raw)
+    assert first["id"] == "a" and first["attempts"] == 1 and "plan" in first
+    assert runner.generate(1, raw)["cached"] is True
+    assert "invalid JSON" in runner.generate(2, "{oops")["error"]
+
+    failing = make_runner(error_rate=1.0)
+    assert failing.generate(0, raw)["attempts"] == 2
+
+
+def test_run_resumes_from_the_checkpoint(tmp_path, monkeypatch, user_data):
+    monkeypatch.setenv("AYURVEDA_BACKEND", "fake")
+    monkeypatch.setenv("AYURVEDA_FAKE_LATENCY", "fixed:0")
+    monkeypatch.delenv("AYURVEDA_PLAN_CACHE_DIR", raising=False)
+    source = tmp_path / "in.jsonl"
+    records = [{**user_data, "id": n, "age": 20 + n} for n in range(5)]
+    source.write_text("\n".join(json.dumps(r) for r in records[:3]) + "\n\n", encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+    args = argparse.Namespace(
+        input=str(source), output=str(output), concurrency=2, rpm=6000, retries=0, backoff=0, checkpoint=None
+    )
+    assert run(args)["ok"] == 3
+
+    with source.open("a", encoding="utf-8") as fh:
+        fh.write("".join(json.dumps(r) + "\n" for r in records[3:]))
+    summary = run(args)
+    assert (summary["ok"], summary["skipped"]) == (2, 3)
+    lines = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(line["id"] for line in lines) == list(range(5))
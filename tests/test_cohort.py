@@ -0,0 +1,60 @@
+import json
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ayurveda.cohort import CohortAggregator, aggregate, main, score_records, wellness_scores  # noqa: E402
+from ayurveda.scoring import DIGESTION_SCORES, calculate_wellness_score  # noqa: E402
+
+
+def random_profiles(count, seed=7):
+    rng = random.Random(seed)
+    digestion = list(DIGESTION_SCORES) + ["Unknown"]
+    concerns = ["Stress & Anxiety", "Low Immunity", "Hair Loss"]
+    return [
+        {
+            "sleep_quality": rng.randint(1, 10),
+            "energy_level": rng.randint(1, 10),
+            "stress_level": rng.randint(1, 10),
+            "digestion": rng.choice(digestion),
+            "main_health_concerns": rng.sample(concerns, rng.randint(0, 2)),
+        }
+        for _ in range(count)
+    ]
+
+
+def test_vectorized_scores_match_the_scalar_scorer():
+    profiles = random_profiles(500) + [{}]
+    expected = [calculate_wellness_score(p) for p in profiles]
+    assert score_records(profiles).tolist() == expected
+    assert wellness_scores([10], [10], [1], ["Excellent"]).tolist() == [9.75]
+
+
+def test_chunked_aggregation_matches_a_single_pass_and_merges():
+    profiles = random_profiles(1000)
+    whole = aggregate(profiles, chunk_size=10_000).summary()
+    assert aggregate(profiles, chunk_size=37).summary() == whole
+
+    left, right = aggregate(profiles[:400]), aggregate(profiles[400:])
+    left.merge(right)
+    assert left.summary() == whole
+    scores = np.array([calculate_wellness_score(p) for p in profiles])
+    assert whole["count"] == 1000
+    assert whole["mean"] == pytest.approx(scores.mean())
+    assert whole["min"] == scores.min() and whole["max"] == scores.max()
+    stress = [calculate_wellness_score(p) for p in profiles if "Stress & Anxiety" in p["main_health_concerns"]]
+    assert whole["concerns"]["Stress & Anxiety"]["count"] == len(stress)
+
+
+def test_empty_cohort():
+    summary = CohortAggregator().summary()
+    assert summary["count"] == 0 and summary["p50"] is None and summary["concerns"] == {}
+
+
+def test_command_reads_plan_exports(tmp_path, capsys):
+    path = tmp_path / "plans.jsonl"
+    path.write_text("\n".join(json.dumps({"profile": p}) for p in random_profiles(20)) + "\n", encoding="utf-8")
+    main([str(path)])
+    assert json.loads(capsys.readouterr().out)["count"] == 20
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ayurveda.consultation import Consultation, consultation_prefix, truncate_tokens
+from ayurveda.data import HERBS_DATABASE
+from ayurveda.herb_index import estimate_tokens
+from ayurveda.knowledge_base import KnowledgeBase
+
+USER = {
+    "name": "Asha",
+    "age": 34,
+    "gender": "Female",
+    "main_health_concerns": ["Stress & Anxiety", "Poor Sleep"],
+    "sleep_quality": 4,
+    "energy_level": 5,
+    "stress_level": 8,
+}
+PLAN = "🌿 HERBAL PRESCRIPTION\n" + "Take Ashwagandha at night with warm milk. " * 400
+
+
+def large_catalog(size):
+    entries = list(HERBS_DATABASE.values())
+    return {f"Herb {idx:05d}": dict(entries[idx % len(entries)]) for idx in range(size)}
+
+
+def chat(turns, **kwargs):
+    consultation = Consultation(USER, PLAN, history_budget=300, summary_budget=100, plan_budget=400, **kwargs)
+    prompts = []
+    for turn in range(turns):
+        question = f"Question {turn}: can I combine my herbs with my medication? " * 3
+        prompts.append(consultation.build_prompt(question, cached_prefix=True))
+        consultation.add_exchange(question, "A detailed answer about herbs and timing. " * 20)
+        consultation.compact(lambda prompt: "Summary of the conversation so far. " * 10)
+    return consultation, prompts
+
+
+def test_prompt_size_is_bounded_over_a_long_chat():
+    _, prompts = chat(40)
+    sizes = [prompt.tokens for prompt in prompts]
+    # Profile, herbs, plan, summary and recent turns each have a budget.
+    assert max(sizes) < 1800
+    assert max(sizes[20:]) <= max(sizes[:10]) + 50
+
+
+def test_prompt_size_does_not_grow_with_the_catalog():
+    consultation, small = chat(5, knowledge_base=KnowledgeBase(large_catalog(500)))
+    _, large = chat(5, knowledge_base=KnowledgeBase(large_catalog(5000)))
+    assert [p.tokens for p in large] == [p.tokens for p in small]
+    assert estimate_tokens(consultation._herbs) <= 400
+    # The static prefix holds no herbs at all.
+    assert "Herb 0" not in consultation_prefix()
+
+
+def test_cached_prefix_is_left_out_of_the_text():
+    consultation = Consultation(USER, PLAN)
+    full = consultation.build_prompt("Hi?")
+    suffix = consultation.build_prompt("Hi?", cached_prefix=True)
+    assert full.text == consultation_prefix() + suffix.text
+    assert suffix.prefix_tokens == estimate_tokens(consultation_prefix())
+
+
+def test_compaction_keeps_the_latest_exchange_and_falls_back_without_the_model():
+    consultation, _ = chat(1)
+    for turn in range(6):
+        consultation.add_exchange(f"question {turn}", "answer " * 200)
+
+    def failing(prompt):
+        raise RuntimeError("quota")
+
+    assert consultation.compact(failing)
+    stats = consultation.stats()
+    assert stats["summary_failures"] == 1
+    assert stats["summarized_turns"] <= stats["turns"] - 2
+    assert estimate_tokens(consultation.summary) <= consultation.summary_budget + 1
+
+
+def test_compact_in_background_folds_older_turns():
+    consultation = Consultation(USER, PLAN, history_budget=50)
+    consultation.add_exchange("q", "answer " * 100)
+    consultation.add_exchange("q", "answer " * 100)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = consultation.compact_in_background(executor, lambda prompt: "summary")
+        assert future is not None and future.result()
+    # The first exchange is folded; the latest always stays verbatim.
+    assert consultation.stats()["summarized_turns"] == 2
+    assert consultation.summary == "summary"
+
+
+def test_matches_only_the_same_answers_and_plan():
+    consultation = Consultation(USER, PLAN)
+    assert consultation.matches(dict(USER), PLAN)
+    assert not consultation.matches({**USER, "age": 35}, PLAN)
+    assert not consultation.matches(USER, PLAN + " ")
+
+
+@pytest.mark.parametrize("budget", [5, 50])
+def test_truncate_tokens(budget):
+    assert estimate_tokens(truncate_tokens("word " * 500, budget)) <= budget + 1
@@ -0,0 +1,51 @@
+from ayurveda.fake_backend import FakeBackend
+from ayurveda.generation import (
+    GenerationStats,
+    GenerationTimings,
+    chunk_text,
+    generate_plan,
+    request_kwargs,
+    usage_from_response,
+)
+from ayurveda.router import ModelRouter
+
+
+class MetadataOnlyChunk:
+    @property
+    def text(self):
+        raise ValueError("no text parts")
+
+
+def test_generate_plan_reports_usage():
+    model = FakeBackend(latency="fixed:0").create_model("gemini-a")
+    text, timings = generate_plan(model, "prompt")
+    assert text.startswith("🌿")
+    assert not timings.streamed and timings.chunks == 1
+    assert timings.first_token_s == timings.total_s
+    assert timings.usage["response_tokens"] == len(text) // 4
+
+
+def test_streamed_chunks_join_into_the_plan():
+    backend = FakeBackend(latency="fixed:0", chunk_chars=40)
+    blocking = ModelRouter(["gemini-a"], backend.create_model).generate("prompt")
+    partials = []
+    streamed = ModelRouter(["gemini-a"], backend.create_model).generate("prompt", on_text=partials.append)
+    assert streamed.text == blocking.text == partials[-1]
+    assert all(later.startswith(earlier) for earlier, later in zip(partials, partials[1:]))
+    assert streamed.timings.usage is not None
+
+
+def test_chunk_helpers():
+    assert chunk_text(MetadataOnlyChunk()) == ""
+    assert usage_from_response(MetadataOnlyChunk()) is None
+    assert request_kwargs(None) == {}
+    assert request_kwargs({"temperature": 0}) == {"generation_config": {"temperature": 0}}
+
+
+def test_stats_split_streamed_and_blocking():
+    stats = GenerationStats(window=2)
+    for total in (1.0, 3.0, 5.0):
+        stats.record(GenerationTimings(first_token_s=total / 10, total_s=total, chunks=4, streamed=True))
+    stats.record(GenerationTimings(first_token_s=2.0, total_s=2.0, chunks=1, streamed=False))
+    assert stats.summary(True) == {"count": 2, "first_token_p50_s": 0.4, "total_p50_s": 4.0}
+    assert stats.summary(False)["total_p50_s"] == 2.0
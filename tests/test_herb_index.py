@@ -0,0 +1,40 @@
+import json
+
+from ayurveda.data import HERBS_DATABASE
+from ayurveda.herb_index import build_herb_context, concern_keywords, estimate_tokens, score_herbs
+from ayurveda.prompts import build_prompt
+
+HERBS = {
+    "Ashwagandha": {"benefits": ["Stress relief", "Energy"], "dosage": "500mg", "safety": "Avoid in pregnancy"},
+    "Triphala": {"benefits": ["Digestion", "Detox"], "dosage": "1 tsp", "safety": "Generally safe"},
+    "Tulsi": {"benefits": ["Immunity", "Calm"], "dosage": "2 cups", "safety": "Generally safe"},
+}
+
+
+def test_unknown_concerns_fall_back_to_their_own_words():
+    assert concern_keywords("Stress & Anxiety")[0] == "stress"
+    assert concern_keywords("Dry cough at night") == ["cough", "night"]
+
+
+def test_no_concerns_scores_for_general_wellness():
+    assert set(score_herbs({}, [], HERBS)) == {"Ashwagandha", "Triphala", "Tulsi"}
+    assert score_herbs({}, ["Stress & Anxiety"], HERBS) == {"Ashwagandha": 2.0, "Tulsi": 1.0}
+
+
+def test_context_keeps_top_k_and_requested_fields():
+    context = build_herb_context(["Tulsi", "Triphala", "Ashwagandha"], HERBS, top_k=2, fields=("dosage",))
+    assert context.herbs == ["Tulsi", "Triphala"]
+    assert json.loads(context.json) == {"Tulsi": {"dosage": "2 cups"}, "Triphala": {"dosage": "1 tsp"}}
+    assert context.tokens == estimate_tokens(context.json)
+
+
+def test_best_match_survives_a_tiny_budget():
+    context = build_herb_context(["Tulsi", "Triphala"], HERBS, token_budget=1)
+    assert context.herbs == ["Tulsi"] and context.dropped_for_budget == 1
+
+
+def test_relevant_prompt_is_smaller_than_the_full_catalog(user_data):
+    prompt = build_prompt(user_data, cached_prefix=False)
+    full_catalog = json.dumps(dict(HERBS_DATABASE.items()), separators=(",", ":"), ensure_ascii=False)
+    assert len(prompt.herb_context.herbs) < len(HERBS_DATABASE)
+    assert prompt.herb_context.tokens < estimate_tokens(full_catalog)
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from ayurveda.herb_index import benefit_score, build_herb_context, concern_keywords, score_herbs
+from ayurveda.knowledge_base import CatalogError, KnowledgeBase, contraindication_terms
+
+CATALOG = {
+    "Ashwagandha": {
+        "benefits": ["Stress relief", "Better sleep", "Energy"],
+        "dosage": "300-500mg",
+        "best_time": "Evening",
+        "safety": "Avoid in pregnancy, thyroid issues",
+    },
+    "Brahmi": {
+        "benefits": ["Memory", "Calm mind"],
+        "dosage": "300mg",
+        "best_time": "Morning",
+        "safety": "Generally safe",
+    },
+    "Tulsi": {
+        "benefits": ["Immunity", "Stress adaptation"],
+        "dosage": "2 cups tea",
+        "best_time": "Morning",
+        "safety": "Avoid with blood thinners",
+        "type": "herb",
+    },
+}
+
+
+@pytest.fixture
+def kb():
+    return KnowledgeBase(CATALOG)
+
+
+def test_benefit_score_prefers_the_concern_keyword():
+    keywords = concern_keywords("Stress & Anxiety")
+    assert benefit_score(keywords, "Stress relief") == 2.0
+    assert benefit_score(keywords, "Calm mind") == 1.0
+    assert benefit_score(keywords, "Immunity") == 0.0
+
+
+def test_index_ranking_matches_the_scan(kb):
+    concerns = ["Stress & Anxiety", "Low Immunity"]
+    scanned = score_herbs({}, concerns, CATALOG)
+    indexed = score_herbs(kb.concern_index, concerns, CATALOG)
+    assert scanned == indexed
+    assert kb.rank_for_concerns(concerns) == sorted(scanned, key=lambda name: (-scanned[name], kb.position(name)))
+
+
+def test_rank_for_concerns_limit_and_exclude(kb):
+    assert kb.rank_for_concerns(["Stress & Anxiety"], limit=1) == ["Ashwagandha"]
+    assert "Ashwagandha" not in kb.rank_for_concerns(["Stress & Anxiety"], exclude={"Ashwagandha"})
+    # Unknown concerns are scored from their own words.
+    assert kb.rank_for_concerns(["Memory loss"]) == ["Brahmi"]
+
+
+def test_lookups(kb):
+    assert kb.herbs_for_benefit("immun") == ["Tulsi"]
+    assert kb.herbs_contraindicated_by("pregnan") == ["Ashwagandha"]
+    assert kb.search(benefit="stress", avoid=("blood thinner",)) == ["Ashwagandha"]
+    assert kb.herbs["Tulsi"]["type"] == "herb"
+    assert len(kb) == 3
+
+
+def test_contraindication_terms():
+    assert {"pregnancy", "thyroid issues", "thyroid"} <= contraindication_terms("Avoid in pregnancy, thyroid issues")
+    assert contraindication_terms("Generally safe") == set()
+
+
+@pytest.mark.parametrize("catalog", [{}, {"X": {"benefits": []}}, {"X": {**CATALOG["Brahmi"], "dosage": 3}}])
+def test_invalid_catalogs_are_rejected(catalog):
+    with pytest.raises(CatalogError):
+        KnowledgeBase(catalog)
+
+
+def test_load_reports_bad_files(tmp_path):
+    path = tmp_path / "herbs.json"
+    path.write_text("{not json", encoding="utf-8")
+    with pytest.raises(CatalogError):
+        KnowledgeBase.load(str(path))
+    path.write_text(json.dumps(CATALOG), encoding="utf-8")
+    assert KnowledgeBase.load(str(path)).source == str(path)
+
+
+def test_herb_context_respects_the_budget(kb):
+    ranked = kb.rank_for_concerns(["Stress & Anxiety"])
+    context = build_herb_context(ranked, kb.herbs, top_k=3, token_budget=60)
+    assert context.herbs[0] == ranked[0]
+    assert context.tokens <= 60 or len(context.herbs) == 1
+    assert context.dropped_for_budget == len(ranked[:3]) - len(context.herbs)
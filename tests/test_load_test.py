@@ -0,0 +1,32 @@
+import importlib
+import itertools
+import os
+import random
+
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
+
+@pytest.fixture
+def load_test(monkeypatch, tmp_path):
+    # The load test opens up the scheduler quota at import; keep that out of os.environ for other tests.
+    monkeypatch.setenv("AYURVEDA_RPM", "1000000")
+    monkeypatch.setenv("AYURVEDA_TPM", "1000000000")
+    monkeypatch.setenv("AYURVEDA_BACKEND", "fake")
+    monkeypatch.setenv("AYURVEDA_FAKE_LATENCY", "fixed:0")
+    monkeypatch.setenv("AYURVEDA_PLAN_DB", str(tmp_path / "plans.db"))
+    monkeypatch.syspath_prepend(BENCHMARKS)
+    return importlib.import_module("load_test")
+
+
+def test_rss_is_measured(load_test):
+    assert load_test.rss_bytes() > 2**20
+
+
+def test_single_session_level_runs_cleanly(load_test):
+    pytest.importorskip("streamlit.testing.v1")
+    level = load_test.run_level(1, 1, random.Random(1), itertools.count(), timeout=60)
+    assert level["errors"] == 0, level["first_error"]
+    # The initial run, five wizard steps and the four results-page buttons.
+    assert level["reruns"] == 10 and level["rerun_latency"]["p50_ms"] > 0
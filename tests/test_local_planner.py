@@ -0,0 +1,51 @@
+from ayurveda.data import HERBS_DATABASE, concern_index
+from ayurveda.local_planner import _slots, build_local_plan, safety_conflict
+
+HERBS = {
+    "Ashwagandha": {
+        "benefits": ["Stress relief", "Sleep quality"],
+        "dosage": "500mg twice daily",
+        "best_time": "Morning",
+        "safety": "Avoid in pregnancy, thyroid issues",
+    },
+    "Brahmi": {
+        "benefits": ["Calm mind", "Memory"],
+        "dosage": "300mg",
+        "best_time": "Evening",
+        "safety": "Generally safe",
+    },
+}
+
+
+def test_plan_is_deterministic_and_fast(user_data):
+    first = build_local_plan(user_data, HERBS_DATABASE, concern_index())
+    second = build_local_plan(user_data, HERBS_DATABASE, concern_index())
+    assert first.to_markdown() == second.to_markdown()
+    assert 0 < len(first.herbs) <= 4
+    assert first.build_ms < 100
+
+
+def test_unsafe_herbs_are_excluded_with_a_reason(user_data):
+    user_data["previous_treatments"] = "Levothyroxine for thyroid"
+    plan = build_local_plan(user_data, HERBS, {})
+    assert [herb.name for herb in plan.herbs] == ["Brahmi"]
+    assert plan.excluded["Ashwagandha"].endswith("(your answers mention 'thyroid')")
+    assert "Skipped **Ashwagandha**" in plan.to_markdown()
+
+
+def test_safety_conflict_from_selected_concern():
+    assert safety_conflict("Avoid with thyroid issues", ["Thyroid Issues"], "") is not None
+    assert safety_conflict("Generally safe", ["Thyroid Issues"], "pregnant") is None
+
+
+def test_schedule_slots():
+    assert _slots("Morning", "500mg twice daily") == ["morning", "evening"]
+    assert _slots("After meals", "1 tsp") == ["afternoon"]
+    assert _slots("Any time", "1 cup at bedtime") == ["bedtime"]
+
+
+def test_no_concerns_falls_back_to_general_wellness(user_data):
+    user_data["main_health_concerns"] = []
+    plan = build_local_plan(user_data, HERBS_DATABASE, concern_index())
+    assert plan.herbs and plan.concerns == []
+    assert "LIFESTYLE RECOMMENDATIONS" in plan.to_markdown()
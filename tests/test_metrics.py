@@ -0,0 +1,75 @@
+import json
+import urllib.request
+
+import pytest
+
+from ayurveda.metrics import MetricsRegistry, start_http_server
+
+
+class RerunException(Exception):
+    """Same class name as Streamlit's st.rerun() control-flow exception."""
+
+
+def stage_outcomes(registry):
+    return registry.snapshot()["histograms"]["ayurveda_stage_seconds"]
+
+
+def test_span_records_ok_error_and_interrupted():
+    registry = MetricsRegistry()
+    with registry.span("generation"):
+        pass
+    with pytest.raises(ValueError):
+        with registry.span("generation"):
+            raise ValueError("boom")
+    with pytest.raises(RerunException):
+        with registry.span("generation"):
+            raise RerunException()
+    outcomes = stage_outcomes(registry)
+    assert outcomes["outcome=ok,stage=generation"]["count"] == 1
+    assert outcomes["outcome=error,stage=generation"]["count"] == 1
+    assert outcomes["outcome=interrupted,stage=generation"]["count"] == 1
+
+
+def test_model_attempts_and_usage():
+    registry = MetricsRegistry()
+    registry.record_model_attempt("gemini-a", 0.2)
+    registry.record_model_attempt("gemini-a", 45.0, TimeoutError())
+    registry.record_usage("gemini-a", {"prompt_tokens": 100, "response_tokens": 50, "cached_tokens": 80})
+    counters = registry.snapshot()["counters"]
+    assert counters["ayurveda_model_attempts_total"] == {
+        "error_class=,model=gemini-a,outcome=ok": 1.0,
+        "error_class=TimeoutError,model=gemini-a,outcome=timeout": 1.0,
+    }
+    assert counters["ayurveda_cached_prompt_tokens_total"] == {"model=gemini-a": 80.0}
+
+
+def test_prometheus_text():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("ayurveda_plan_cache_hits_total", note='say "hi"')
+    registry.observe("ayurveda_stage_seconds", 0.5, stage="x")
+    text = registry.render_prometheus()
+    assert '# TYPE ayurveda_stage_seconds histogram' in text
+    assert 'ayurveda_stage_seconds_bucket{stage="x",le="0.1"} 0' in text
+    assert 'ayurveda_stage_seconds_bucket{stage="x",le="1"} 1' in text
+    assert 'ayurveda_stage_seconds_bucket{stage="x",le="+Inf"} 1' in text
+    assert 'note="say \\"hi\\""' in text
+
+
+def test_events_are_logged_as_json_lines(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    registry = MetricsRegistry(log_path=str(path))
+    with registry.span("prompt_build"):
+        pass
+    event = json.loads(path.read_text(encoding="utf-8"))
+    assert event["event"] == "span" and event["stage"] == "prompt_build"
+
+
+def test_exporter_serves_metrics():
+    registry = MetricsRegistry()
+    registry.inc("ayurveda_script_runs_total", page="wizard")
+    server = start_http_server(0, registry, host="127.0.0.1")
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            assert 'ayurveda_script_runs_total{page="wizard"} 1' in response.read().decode()
+    finally:
+        server.shutdown()
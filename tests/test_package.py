@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ayurveda.data import QUESTIONS, concern_index
+from ayurveda.prompts import PROFILE_DEFAULTS
+from ayurveda.scoring import calculate_wellness_score
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORE_MODULES = ["config", "data", "prompts", "scoring", "styles", "gemini_client", "service", "batch"]
+
+
+def test_core_imports_without_ui_or_sdk():
+    # A fresh interpreter, so modules imported by other tests don't mask a regression.
+    code = (
+        "import sys\n"
+        + "".join(f"import ayurveda.{name}\n" for name in CORE_MODULES)
+        + "print(sorted({'streamlit', 'google.generativeai'} & set(sys.modules)))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT)
+    assert result.stdout.strip() == "[]"
+
+
+def test_concern_index_is_built_once():
+    assert concern_index() is concern_index()
+
+
+def test_questionnaire_covers_the_prompt_profile():
+    asked = {key for step in QUESTIONS for key in step["questions"]}
+    assert set(PROFILE_DEFAULTS) <= asked
+
+
+@pytest.mark.parametrize("answers, expected", [
+    ({}, 5.25),
+    ({"sleep_quality": 10, "energy_level": 10, "stress_level": 1, "digestion": "Excellent"}, 9.75),
+    ({"sleep_quality": 1, "energy_level": 1, "stress_level": 10, "digestion": "Severe issues"}, 1),
+])
+def test_wellness_score(answers, expected):
+    assert calculate_wellness_score(answers) == expected
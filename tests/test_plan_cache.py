@@ -0,0 +1,48 @@
+import os
+import time
+
+from ayurveda.plan_cache import CachedPlan, PlanCache, profile_hash
+
+
+def test_profile_hash_ignores_cosmetic_differences(user_data):
+    shuffled = {**dict(reversed(list(user_data.items()))), "name": "  Asha   Rao "}
+    shuffled["main_health_concerns"] = list(reversed(user_data["main_health_concerns"]))
+    assert profile_hash(shuffled, 1) == profile_hash(user_data, 1)
+    assert profile_hash(user_data, 2) != profile_hash(user_data, 1)
+    assert profile_hash({**user_data, "age": 35}, 1) != profile_hash(user_data, 1)
+
+
+def test_lru_eviction_and_stats():
+    cache = PlanCache(max_entries=2)
+    for key in "abc":
+        cache.put(key, CachedPlan(text=key))
+    assert cache.get("a") is None
+    assert cache.get("c").text == "c"
+    assert cache.stats() == {
+        "hits": 1, "misses": 1, "memory_hits": 1, "disk_hits": 0, "hit_rate": 0.5, "entries": 2,
+    }
+
+
+def test_expired_plans_are_dropped():
+    cache = PlanCache(ttl_seconds=60)
+    cache.put("old", CachedPlan(text="plan", created_at=time.time() - 120))
+    assert "old" not in cache
+    assert cache.get("old") is None
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    writer, reader = PlanCache(disk_dir=str(tmp_path)), PlanCache(disk_dir=str(tmp_path))
+    writer.put("key", CachedPlan(text="plan", model="gemini-a"))
+    assert "key" in reader
+    assert reader.get("key").model == "gemini-a"
+    assert reader.stats()["disk_hits"] == 1
+    assert [name for name in os.listdir(tmp_path)] == ["key.json"]
+
+
+def test_memory_tier_notices_another_workers_rewrite(tmp_path):
+    first, second = PlanCache(disk_dir=str(tmp_path)), PlanCache(disk_dir=str(tmp_path))
+    first.put("key", CachedPlan(text="v1"))
+    second.put("key", CachedPlan(text="v2"))
+    assert first.get("key").text == "v2"
+    second.invalidate("key")
+    assert first.get("key") is None
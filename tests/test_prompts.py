@@ -0,0 +1,47 @@
+from ayurveda.context_cache import ContextCache
+from ayurveda.fake_backend import FakeBackend
+from ayurveda.herb_index import estimate_tokens
+from ayurveda.knowledge_base import get_knowledge_base
+from ayurveda.prompts import _catalog_prefix, build_prompt, context_cache_prefix, static_prefix
+
+
+def test_prompt_embeds_only_relevant_herbs_within_budget(user_data):
+    prompt = build_prompt(user_data, top_k=4, token_budget=1500, cached_prefix=False)
+    kb = get_knowledge_base()
+    assert prompt.text.startswith(static_prefix())
+    assert prompt.herb_context.herbs == kb.rank_for_concerns(user_data["main_health_concerns"], limit=4)[
+        :len(prompt.herb_context.herbs)
+    ]
+    assert prompt.tokens <= 1500 or len(prompt.herb_context.herbs) == 1
+    assert not any(name in prompt.text for name in kb.names if name not in prompt.herb_context.herbs)
+
+
+def test_cached_prompt_sends_only_the_suffix(user_data):
+    full = build_prompt(user_data, cached_prefix=False)
+    suffix = build_prompt(user_data, cached_prefix=True)
+    assert suffix.cached_prefix and not suffix.text.startswith(static_prefix())
+    assert suffix.tokens < full.tokens
+    assert suffix.prefix_tokens == estimate_tokens(context_cache_prefix())
+
+
+def test_catalog_prefix_is_built_once_per_knowledge_base():
+    kb = get_knowledge_base()
+    assert context_cache_prefix() is context_cache_prefix()
+    assert all(name in context_cache_prefix() for name in kb.names)
+    assert _catalog_prefix.cache_info().currsize >= 1
+
+
+def test_context_cache_uploads_once_and_falls_back_when_too_small(user_data):
+    backend = FakeBackend(latency="fixed:0")
+    cache = ContextCache(backend, context_cache_prefix())
+    prompt = build_prompt(user_data, cached_prefix=True).text
+    cache.create_model("gemini-a").generate_content(prompt)
+    cache.create_model("gemini-a").generate_content(prompt)
+    assert cache.uploads == 1 and cache.stats()["cached_models"] == ["gemini-a"]
+
+    strict = FakeBackend(latency="fixed:0", min_cache_tokens=10**6)
+    fallback = ContextCache(strict, context_cache_prefix())
+    response = fallback.create_model("gemini-a").generate_content(prompt)
+    assert fallback.fallbacks == 1 and fallback.uploads == 0
+    # The fallback sends prefix + suffix, so the provider still sees the catalog.
+    assert response.usage_metadata.prompt_token_count >= estimate_tokens(context_cache_prefix()) - 1
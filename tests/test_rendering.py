@@ -0,0 +1,35 @@
+from ayurveda.rendering import PLAN_TITLE, herb_card_html, herb_grid_html, payload_stats, plan_card_markdown
+
+HERBS = {
+    "Ashwagandha": {
+        "benefits": ["Stress", "Sleep", "Energy", "Immunity"],
+        "dosage": "300-500mg",
+        "safety": "Avoid in pregnancy, thyroid issues and with sedatives or other nervous-system depressants",
+    },
+    "<Tulsi>": {"benefits": ["Immunity"], "dosage": "2 cups", "safety": "Generally safe"},
+}
+
+
+def test_herb_card_is_escaped_and_trimmed():
+    card = herb_card_html("<Tulsi>", HERBS["<Tulsi>"])
+    assert "<b>&lt;Tulsi&gt;</b>" in card
+    long_card = herb_card_html("Ashwagandha", HERBS["Ashwagandha"])
+    assert "Immunity" not in long_card and long_card.count("...") == 1
+
+
+def test_grid_is_one_nested_payload():
+    grid = herb_grid_html(HERBS, HERBS)
+    assert grid.startswith('<div class="herb-grid">') and grid.endswith("</div></div>")
+    assert grid.count('<div class="herb-card">') == len(HERBS)
+    assert grid.count("<div") == grid.count("</div>")
+
+
+def test_plan_card_wraps_markdown_and_escapes_html():
+    card = plan_card_markdown("🌿 **HERBS**\n\n- <script>alert(1)</script>")
+    assert card.startswith('<div class="recommendation-card">\n\n' + PLAN_TITLE)
+    assert "<script>" not in card and "&lt;script>" in card
+    assert "**HERBS**" in card and card.endswith("\n\n</div>")
+
+
+def test_payload_stats_counts_utf8_bytes():
+    assert payload_stats(["🌿", "ab"]) == {"elements": 2, "bytes": 6}
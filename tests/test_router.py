@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from ayurveda.fake_backend import FakeBackend
+from ayurveda.router import AllModelsFailed, ModelRouter, RouterBusy
+
+MODELS = ["gemini-a", "gemini-b"]
+
+
+def run_concurrently(router, count, **kwargs):
+    results = [None] * count
+
+    def call(idx):
+        try:
+            results[idx] = router.generate("prompt", **kwargs).model
+        except AllModelsFailed as error:
+            results[idx] = error
+
+    threads = [threading.Thread(target=call, args=(idx,)) for idx in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_falls_back_and_sticks_to_the_healthy_model():
+    backend = FakeBackend(latency="fixed:0", missing_models=("gemini-a",))
+    router = ModelRouter(MODELS, backend.create_model)
+    assert router.generate("prompt").model == "gemini-b"
+    assert router.preferred_model == "gemini-b"
+    router.generate("prompt")
+    assert backend.calls == {"gemini-a": 1, "gemini-b": 2}
+    # NotFound opens the breaker for the long cooldown straight away.
+    assert router.stats()[0]["state"] == "open"
+
+
+def test_breaker_opens_after_repeated_failures():
+    backend = FakeBackend(latency="fixed:0", error_rate=1.0)
+    router = ModelRouter(MODELS, backend.create_model, failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(AllModelsFailed):
+            router.generate("prompt")
+    assert [row["state"] for row in router.stats()] == ["open", "open"]
+
+
+def test_slow_model_times_out():
+    backend = FakeBackend(latency="fixed:0.3")
+    router = ModelRouter(MODELS[:1], backend.create_model, attempt_timeout=0.05)
+    with pytest.raises(AllModelsFailed) as raised:
+        router.generate("prompt")
+    assert isinstance(raised.value.errors[0][1], TimeoutError)
+    assert router.stats()[0]["timeouts"] == 1
+
+
+def test_hedge_goes_to_the_next_model():
+    slow = FakeBackend(latency="fixed:0.5")
+    fast = FakeBackend(latency="fixed:0")
+    router = ModelRouter(
+        MODELS, lambda name: (slow if name == "gemini-a" else fast).create_model(name), hedge_after=0.05
+    )
+    result = router.generate("prompt")
+    assert result.hedged and result.model == "gemini-b"
+
+
+def test_queueing_behind_other_calls_is_not_a_model_timeout():
+    backend = FakeBackend(latency="fixed:0.3")
+    router = ModelRouter(MODELS, backend.create_model, attempt_timeout=0.45, queue_timeout=5, max_workers=1)
+    assert run_concurrently(router, 3) == ["gemini-a"] * 3
+    assert all(row["failures"] == 0 for row in router.stats())
+
+
+def test_queue_timeout_is_busy_not_a_model_failure():
+    backend = FakeBackend(latency="fixed:0.3")
+    router = ModelRouter(MODELS, backend.create_model, attempt_timeout=5, queue_timeout=0.1, max_workers=1)
+    results = run_concurrently(router, 2)
+    busy = [r for r in results if isinstance(r, AllModelsFailed)]
+    assert len(busy) == 1 and isinstance(busy[0].errors[0][1], RouterBusy)
+    assert router.busy == 1
+    assert all(row["failures"] == 0 for row in router.stats())
+
+
+def test_abandoned_attempts_give_their_slot_back():
+    hung = FakeBackend(latency="fixed:0.5")
+    fast = FakeBackend(latency="fixed:0")
+    router = ModelRouter(
+        MODELS, lambda name: (hung if name == "gemini-a" else fast).create_model(name),
+        attempt_timeout=0.05, queue_timeout=0.2, max_workers=1,
+    )
+    start = time.monotonic()
+    # gemini-a times out but keeps its worker; gemini-b must still start at once.
+    assert router.generate("prompt").model == "gemini-b"
+    assert time.monotonic() - start < 0.3
+
+
+def test_streaming_reports_partial_text():
+    backend = FakeBackend(latency="fixed:0.01", response_chars=600, chunk_chars=50)
+    router = ModelRouter(MODELS, backend.create_model)
+    seen = []
+    result = router.generate("prompt", on_text=seen.append)
+    assert result.timings.streamed and result.timings.chunks > 1
+    assert seen[-1] == result.text and len(seen) == result.timings.chunks
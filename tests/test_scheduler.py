@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from ayurveda.fake_backend import ResourceExhausted
+from ayurveda.scheduler import QuotaScheduler, SchedulerBusy
+
+
+def test_requests_within_the_burst_are_granted_at_once():
+    scheduler = QuotaScheduler(rpm=60, tpm=100_000)
+    assert scheduler.run(scheduler.submit("a", tokens=1000), lambda: "plan") == "plan"
+    assert scheduler.stats()["granted"] == 1 and scheduler.stats()["queued"] == 0
+
+
+def test_request_over_the_wait_limit_is_refused_up_front():
+    scheduler = QuotaScheduler(rpm=60, tpm=100_000, max_wait_s=0.5, burst_s=1)
+    scheduler.wait(scheduler.submit("a", tokens=10))
+    with pytest.raises(SchedulerBusy) as error:
+        scheduler.submit("b", tokens=10)
+    assert error.value.reason == "queue" and error.value.wait_s > 0.5
+    assert scheduler.stats()["rejected"] == 1
+
+
+def test_sessions_take_turns():
+    scheduler = QuotaScheduler(rpm=600, tpm=1_000_000, burst_s=0.1)
+    tickets = [scheduler.submit(session, tokens=1) for session in ("a", "a", "a", "b")]
+    assert [ticket.ahead for ticket in tickets] == [0, 1, 2, 1]
+    order, lock = [], threading.Lock()
+
+    def wait(ticket):
+        scheduler.wait(ticket, timeout=5)
+        with lock:
+            order.append(ticket)
+
+    threads = [threading.Thread(target=wait, args=(ticket,)) for ticket in tickets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert order == [tickets[0], tickets[3], tickets[1], tickets[2]]
+
+
+def test_quota_error_pauses_the_queue():
+    scheduler = QuotaScheduler(rpm=60, tpm=100_000, max_wait_s=1, quota_backoff_s=5)
+
+    def exhausted():
+        raise ResourceExhausted("429")
+
+    with pytest.raises(ResourceExhausted):
+        scheduler.run(scheduler.submit("a", tokens=1), exhausted)
+    assert scheduler.stats()["quota_errors"] == 1 and scheduler.stats()["paused_s"] > 4
+    with pytest.raises(SchedulerBusy) as error:
+        scheduler.submit("b", tokens=1)
+    assert error.value.reason == "paused after quota error"
+
+
+def test_abandoned_ticket_expires_instead_of_blocking_the_queue():
+    scheduler = QuotaScheduler(rpm=60, tpm=100_000, lease_s=0.05)
+    abandoned = scheduler.submit("a", tokens=1)
+    scheduler.wait(scheduler.submit("b", tokens=1), timeout=2)
+    assert scheduler.stats()["expired"] == 1
+    with pytest.raises(SchedulerBusy):
+        scheduler.wait(abandoned)
+
+
+def test_cancelled_ticket_leaves_the_queue():
+    scheduler = QuotaScheduler(rpm=60, tpm=100_000)
+    ticket = scheduler.submit("a", tokens=1)
+    scheduler.cancel(ticket)
+    assert scheduler.stats()["queued"] == 0
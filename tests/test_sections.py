@@ -0,0 +1,134 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from ayurveda.data import QUESTIONS
+from ayurveda.fake_backend import FakeBackend
+from ayurveda.plan_cache import PlanCache
+from ayurveda.router import AllModelsFailed, ModelRouter
+from ayurveda.sections import (
+    GENERATION_CONFIG,
+    SECTIONS,
+    SectionedPlan,
+    SectionedPlanner,
+    build_section_prompt,
+    parse_section,
+    section_key,
+    sections_independent_of,
+)
+
+LAST_STEP = QUESTIONS[-1]["questions"]
+
+
+def planner(latency="fixed:0", **kwargs):
+    backend = FakeBackend(latency=latency, response_chars=900, **kwargs)
+    return SectionedPlanner(ModelRouter(["gemini-a"], backend.create_model), PlanCache()), backend
+
+
+def test_only_changed_sections_are_regenerated(user_data):
+    sections, backend = planner()
+    first = sections.generate(user_data)
+    assert first.complete and sorted(first.regenerated) == sorted(spec.key for spec in SECTIONS)
+    second = sections.generate({**user_data, "diet_type": "Vegan"})
+    assert second.regenerated == ["lifestyle"]
+    assert backend.calls["gemini-a"] == len(SECTIONS) + 1
+
+
+
+def test_section_requests_are_schema_constrained(user_data):
+    backend, configs = FakeBackend(latency="fixed:0", response_chars=900), []
+
+    def create_model(name):
+        model = backend.create_model(name)
+
+        def generate_content(prompt, **kwargs):
+            configs.append(kwargs.get("generation_config"))
+            return model.generate_content(prompt, **kwargs)
+
+        return SimpleNamespace(generate_content=generate_content)
+
+    plan = SectionedPlanner(ModelRouter(["gemini-a"], create_model), PlanCache()).generate(user_data)
+    assert plan.complete and configs == [GENERATION_CONFIG] * len(SECTIONS)
+
+
+def test_section_prompt_holds_only_its_answers(user_data):
+    lifestyle = next(spec for spec in SECTIONS if spec.key == "lifestyle")
+    prompt = build_section_prompt(lifestyle, user_data)
+    assert "- Diet Type: Vegetarian" in prompt and "Wellness Score" in prompt
+    assert user_data["name"] not in prompt and "Primary Goal" not in prompt
+    assert "AVAILABLE HERBS DATABASE" not in prompt
+
+
+def test_pending_sections_render_a_placeholder():
+    plan = SectionedPlan(sections={spec.key: None for spec in SECTIONS}, regenerated=[], reused=[])
+    assert plan.to_markdown(pending="...").count("...") == len(SECTIONS)
+    assert not plan.complete and plan.model is None
+
+def test_sections_independent_of_the_last_step():
+    keys = [spec.key for spec in sections_independent_of(LAST_STEP)]
+    assert keys == ["herbal_prescription", "safety"]
+    assert not any(set(LAST_STEP) & set(spec.depends_on) for spec in sections_independent_of(LAST_STEP))
+
+
+def test_failed_sections_make_a_partial_plan(user_data):
+    sections, _ = planner()
+    sections.generate(user_data, only=["safety"])
+    sections.router = ModelRouter(["gemini-a"], FakeBackend(latency="fixed:0", error_rate=1.0).create_model)
+    plan = sections.generate(user_data)
+    assert plan.reused == ["safety"] and not plan.complete
+    assert "Regenerate Plan" in plan.to_markdown()
+    sections.cache = PlanCache()
+    with pytest.raises(AllModelsFailed):
+        sections.generate(user_data)
+
+
+def test_reserved_sections_are_joined_not_requested_again(user_data):
+    sections, backend = planner(latency="fixed:0.05")
+    reservation = sections.reserve(user_data, only=["herbal_prescription", "safety"])
+    assert sorted(reservation.keys) == ["herbal_prescription", "safety"]
+    assert {spec.key for spec in sections.missing(user_data)} == {"daily_schedule", "four_week_plan", "lifestyle"}
+
+    joined = {}
+    results_page = threading.Thread(target=lambda: joined.setdefault("plan", sections.generate(user_data)))
+    results_page.start()
+    # The speculative run gets its quota only now, after the results page asked for everything.
+    sections.generate(user_data, reserved=reservation)
+    sections.release(reservation)
+    results_page.join()
+    assert joined["plan"].complete
+    assert backend.calls["gemini-a"] == len(SECTIONS)
+
+
+def test_released_reservation_is_written_by_the_joiner(user_data):
+    sections, backend = planner()
+    reservation = sections.reserve(user_data, only=["safety"])
+    joined = {}
+    results_page = threading.Thread(target=lambda: joined.setdefault("plan", sections.generate(user_data)))
+    results_page.start()
+    # The speculation never got its ticket.
+    sections.release(reservation)
+    results_page.join(timeout=5)
+    assert joined["plan"].complete
+    assert backend.calls["gemini-a"] == len(SECTIONS)
+    assert sections.missing(user_data) == []
+
+
+def test_section_keys_only_follow_their_own_answers(user_data):
+    safety = next(spec for spec in SECTIONS if spec.key == "safety")
+    assert section_key(safety, user_data) == section_key(safety, {**user_data, "budget": "High"})
+    assert section_key(safety, user_data) != section_key(safety, {**user_data, "age": 50})
+
+
+@pytest.mark.parametrize("text", [
+    '{"points": ["Rest", "Walk"], "note": "Be gentle"}',
+    '```json\n["Rest", "Walk"]\n```',
+    "- Rest\n- Walk",
+])
+def test_parse_section(text):
+    assert parse_section("lifestyle", text).points == ["Rest", "Walk"]
+
+
+def test_parse_empty_section():
+    with pytest.raises(ValueError):
+        parse_section("lifestyle", '{"points": []}')
@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+
+from ayurveda.fake_backend import FakeBackend
+from ayurveda.metrics import MetricsRegistry
+from ayurveda.plan_cache import PlanCache
+from ayurveda.router import ModelRouter
+from ayurveda.service import PlanService, SingleFlight, handle_connection
+
+
+class BrokenCache(PlanCache):
+    def get(self, key):
+        raise OSError("disk tier unavailable")
+
+
+def make_service(cache=None, **backend_options):
+    backend = FakeBackend(latency="fixed:0.05", **backend_options)
+    return PlanService(ModelRouter(["gemini-a"], backend.create_model), cache or PlanCache(), metrics=MetricsRegistry())
+
+
+def exchange(service, raw: bytes) -> tuple[int, dict]:
+    async def run():
+        server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), "127.0.0.1", 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(raw)
+            writer.write_eof()
+            response = await reader.read()
+            writer.close()
+            return response
+
+    head, _, body = asyncio.run(run()).partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def post(body: bytes, headers: str = None) -> bytes:
+    headers = f"Content-Length: {len(body)}\r\n" if headers is None else headers
+    return f"POST /plan HTTP/1.1\r\nHost: x\r\n{headers}\r\n".encode() + body
+
+
+def test_plan_then_cache(user_data):
+    service = make_service()
+    status, first = exchange(service, post(json.dumps(user_data).encode()))
+    assert status == 200 and first["source"] == "gemini"
+    status, second = exchange(service, post(json.dumps(user_data).encode()))
+    assert second["source"] == "cache" and second["plan"] == first["plan"]
+
+
+def test_all_models_failed_falls_back_to_the_local_plan(user_data):
+    status, result = exchange(make_service(error_rate=1.0), post(json.dumps(user_data).encode()))
+    assert status == 200 and result["source"] == "local"
+
+
+def test_unexpected_error_is_a_500(user_data):
+    service = make_service(cache=BrokenCache())
+    status, result = exchange(service, post(json.dumps(user_data).encode()))
+    assert status == 500 and "OSError" in result["error"]
+    assert service.stats()["errors"] == 1
+
+
+@pytest.mark.parametrize("raw", [
+    post(b"{}", headers=""),
+    post(b"{}", headers="Content-Length: two\r\n"),
+    post(b"{}", headers="Content-Length: -2\r\n"),
+    post(b"{}", headers="Content-Length: 10\r\n"),
+    post(b"{not json"),
+    post(b"[1, 2]"),
+])
+def test_malformed_requests_are_400(raw):
+    status, result = exchange(make_service(), raw)
+    assert status == 400 and result["error"]
+
+
+def test_routes():
+    service = make_service()
+    assert exchange(service, b"GET /healthz HTTP/1.1\r\n\r\n") == (200, {"status": "ok"})
+    assert exchange(service, b"GET /nope HTTP/1.1\r\n\r\n")[0] == 404
+
+
+def test_single_flight_coalesces_identical_calls():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "plan"
+
+    async def run():
+        return await asyncio.gather(*(flights.do("same", work) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["plan"] * 5
+    assert len(calls) == 1 and flights.coalesced == 4
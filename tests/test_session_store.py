@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from ayurveda.session_store import (
+    COMPRESS_MIN_BYTES,
+    FileSessionStore,
+    SQLiteSessionStore,
+    decode_state,
+    encode_state,
+    valid_session_id,
+)
+
+SID = "session-0001"
+
+
+def open_store(kind, tmp_path, **kwargs):
+    kwargs.setdefault("flush_interval_s", 60)
+    if kind == "sqlite":
+        return SQLiteSessionStore(str(tmp_path / "sessions.db"), **kwargs)
+    return FileSessionStore(str(tmp_path / "sessions"), **kwargs)
+
+
+@pytest.fixture(params=["sqlite", "file"])
+def kind(request):
+    return request.param
+
+
+def test_encoding_round_trips(user_data):
+    small = {"current_step": 2}
+    assert encode_state(small).startswith(b"j") and decode_state(encode_state(small)) == small
+    large = {"user_data": {**user_data, "expectations": "x" * COMPRESS_MIN_BYTES}}
+    assert encode_state(large).startswith(b"z") and decode_state(encode_state(large)) == large
+
+
+def test_session_ids_from_the_url_are_validated(kind, tmp_path):
+    assert not valid_session_id("../../etc/passwd") and not valid_session_id("short")
+    store = open_store(kind, tmp_path)
+    with pytest.raises(ValueError):
+        store.save("../x", {})
+    assert store.load("../x") is None
+    store.close()
+
+
+def test_checkpoints_coalesce_and_resume_on_another_worker(kind, tmp_path, user_data):
+    store = open_store(kind, tmp_path)
+    for step in range(3):
+        store.save(SID, {"user_data": user_data, "current_step": step})
+    # Not written yet, but this worker already serves the latest checkpoint.
+    assert store.load(SID)["current_step"] == 2
+    assert store.save(SID, {"user_data": user_data, "current_step": 2}) is False
+    assert store.flush(timeout=5)
+    assert (store.stats()["writes"], store.stats()["batches"]) == (1, 1)
+    store.close()
+
+    other = open_store(kind, tmp_path)
+    assert other.load(SID) == {"user_data": user_data, "current_step": 2}
+    assert other.load("session-9999") is None
+    assert other.stats()["rehydrated"] == 1 and other.stats()["not_found"] == 1
+    other.close()
+
+
+def test_expired_sessions_are_not_resumed(kind, tmp_path):
+    store = open_store(kind, tmp_path, ttl_seconds=0.05)
+    store.save(SID, {"current_step": 1})
+    store.flush(timeout=5)
+    time.sleep(0.1)
+    assert store.load(SID) is None
+    store.close()
+
+
+class FlakyFileStore(FileSessionStore):
+    failures = 1
+
+    def _write(self, items):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        super()._write(items)
+
+
+def test_failed_batch_is_written_with_the_next_flush(tmp_path):
+    store = FlakyFileStore(str(tmp_path / "sessions"), flush_interval_s=60)
+    store.save(SID, {"current_step": 1})
+    store.flush(timeout=5)
+    assert store.stats()["write_errors"] == 1 and store.stats()["pending"] == 1
+    store.flush(timeout=5)
+    store.close()
+    other = FileSessionStore(str(tmp_path / "sessions"))
+    assert other.load(SID) == {"current_step": 1}
+    other.close()
@@ -0,0 +1,83 @@
+from ayurveda.plan_cache import CachedPlan, PlanCache
+from ayurveda.similarity_cache import (
+    IGNORE,
+    SimilarityCache,
+    check_policies,
+    policies_from_spec,
+    within,
+)
+import pytest
+
+
+def profile(**overrides):
+    data = {
+        "name": "Asha Rao",
+        "age": 34,
+        "weight": 60,
+        "gender": "Female",
+        "main_health_concerns": ["Stress & Anxiety", "Poor Sleep"],
+        "sleep_quality": 5,
+        "food_preferences": "Vegetarian",
+    }
+    data.update(overrides)
+    return data
+
+
+@pytest.fixture
+def cache():
+    return SimilarityCache(PlanCache(), template_version="v1")
+
+
+def test_exact_and_approximate_hits(cache):
+    cache.put(profile(), CachedPlan(text="plan", model="m"))
+    assert cache.get(profile(name="Ben")).exact
+    hit = cache.get(profile(name="Ben", age=36))
+    assert hit.approximated == ["age"]
+    assert cache.get(profile(age=40)) is None
+    assert cache.get(profile(food_preferences="Vegan")) is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_closest_profile_wins(cache):
+    cache.put(profile(age=31), CachedPlan(text="far"))
+    cache.put(profile(age=35), CachedPlan(text="near"))
+    assert cache.get(profile(age=34)).text == "near"
+
+
+def test_every_mention_of_the_name_is_replaced(cache):
+    text = "Namaste Asha Rao! This plan for Asha keeps ASHA calm. Asha, at 60 kg, sleep early. Ashaka stays."
+    assert cache.put(profile(), CachedPlan(text=text))
+    served = cache.get(profile(name="Ben Smith")).text
+    assert "asha" not in served.replace("Ashaka", "").casefold()
+    assert served == (
+        "Namaste Ben Smith! This plan for Ben keeps Ben calm. Ben, at 60 kg, sleep early. Ashaka stays."
+    )
+
+
+def test_plan_still_naming_the_user_is_not_stored(cache):
+    assert not cache.put(profile(), CachedPlan(text="Dear Asha, Ms. Rao should rest."))
+    assert cache.get(profile(name="Ben")) is None
+
+
+def test_leaky_entry_is_not_served(cache):
+    cache.put(profile(), CachedPlan(text="Rest well."))
+    # Something outside put() wrote the surname into the stored plan.
+    key = cache._plan_key(*cache._split(profile()))
+    stored = cache.cache.get(key)
+    cache.cache.put(key, CachedPlan(text="Rest well, Rao.", meta=stored.meta))
+    assert cache.get(profile(name="Ben")) is None
+
+
+def test_anonymous_profile(cache):
+    cache.put(profile(name=""), CachedPlan(text="Namaste {{name}}"))
+    assert cache.get(profile(name="")).text == "Namaste there"
+
+
+def test_policies():
+    policies = policies_from_spec("age=10,gender=ignore")
+    assert policies["age"] == within(10)
+    assert policies["gender"] == IGNORE
+    with pytest.raises(ValueError):
+        policies_from_spec("food_preferences=5")
+    with pytest.raises(ValueError):
+        check_policies({"previous_treatments": IGNORE})
@@ -0,0 +1,55 @@
+import io
+import json
+
+import pytest
+
+from ayurveda.storage import PlanStore, main, owner_key
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PlanStore(str(tmp_path / "plans.db"), batch_size=2)
+    yield store
+    store.close()
+
+
+def test_owner_key_rejects_unknown_kinds():
+    assert owner_key("session", "abc") == "session:abc"
+    for kind, identity in (("name", "Asha Rao"), ("user", "")):
+        with pytest.raises(ValueError):
+            owner_key(kind, identity)
+
+
+def test_lookups_by_owner_and_profile(store, user_data):
+    owner = owner_key("user", "u1")
+    store.save(owner, user_data, "hash-1", "plan one", model="gemini-a", timing={"total_s": 1.5})
+    store.save(owner, user_data, "hash-2", "plan two")
+    store.save(owner_key("session", "s1"), user_data, "hash-1", "plan three")
+    assert store.flush(timeout=5)
+
+    assert store.latest_for_user(owner).plan == "plan two"
+    latest = store.latest_for_profile("hash-1")
+    assert latest.plan == "plan three" and latest.profile == user_data
+    # Typing someone else's name into the assessment never finds their plans.
+    assert store.latest_for_user(user_data["name"]) is None
+    assert store.stats() == {"plans": 3, "pending_writes": 0, "write_errors": 0}
+
+
+def test_export_pages_through_every_plan(store, user_data):
+    for n in range(5):
+        store.save(owner_key("user", "u1"), user_data, f"hash-{n}", f"plan {n}")
+    store.flush(timeout=5)
+    assert [plan.plan for plan in store.iter_plans(page_size=2)] == [f"plan {n}" for n in range(5)]
+    out = io.StringIO()
+    assert store.export_jsonl(out) == 5
+    assert json.loads(out.getvalue().splitlines()[0])["timing"] == {}
+
+
+def test_export_command(tmp_path, user_data):
+    db = str(tmp_path / "plans.db")
+    store = PlanStore(db)
+    store.save(owner_key("user", "u1"), user_data, "hash", "plan")
+    store.close()
+    output = tmp_path / "plans.jsonl"
+    main(["export", str(output), "--db", db])
+    assert json.loads(output.read_text(encoding="utf-8"))["plan"] == "plan"